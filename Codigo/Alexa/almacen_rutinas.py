@@ -0,0 +1,460 @@
+# Almacén de rutinas guardadas con backend intercambiable
+#
+# Los handlers solo usan las funciones de abajo (listar_rutinas, leer_rutina,
+# agregar_rutina, borrar_rutina, indice_rutinas, atributos_rutinas); cuál
+# almacén hay detrás se decide por configuración:
+#   memoria   dict en el proceso (pruebas y benchmarks)
+#   archivos  la misma estructura que en S3, en una carpeta local
+#   sqlite    una tabla con índice por usuario y nombre
+#   s3        persistencia_s3 (lo que usa la Lambda)
+# Todos guardan el mismo cuerpo (codec_rutinas) y las mismas entradas de
+# manifiesto, así una rutina se lee igual venga de donde venga.
+#
+# Variables de entorno:
+#   RUTINAS_BACKEND   memoria / archivos / sqlite / s3 (default s3 si hay
+#                     S3_PERSISTENCE_BUCKET; si no, archivos fuera de Lambda.
+#                     En Lambda sin bucket es un error: /tmp es de cada
+#                     contenedor y se pierde, así que un almacén local solo se
+#                     usa si se pide con RUTINAS_BACKEND)
+#   RUTINAS_DIR       carpeta del backend de archivos (default /tmp/entrenador_fit_rutinas)
+#   RUTINAS_SQLITE    archivo del backend sqlite (default /tmp/entrenador_fit_rutinas.sqlite3)
+#   PRECARGA_RUTINAS  rutinas más recientes que se bajan al precargar (default 10)
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from codec_rutinas import a_json, de_json, codificar_rutina, decodificar_rutina, entrada_manifiesto, nuevo_id
+from indice_nombres import indice_para
+from indice_atributos import atributos_para
+from precarga_rutinas import PRECARGA
+
+PRECARGA_RUTINAS = int(os.environ.get("PRECARGA_RUTINAS", "10"))
+
+
+class RoutineStore:
+    # Operaciones de un almacén. Las entradas son las del manifiesto
+    # ({"id", "nombre", "bytes", "creado", ...}) y las rutinas {"nombre", "texto"}.
+    nombre = "base"
+    # Si cada operación sale a la red (para las respuestas progresivas)
+    remoto = False
+
+    def listar(self, user_id):
+        raise NotImplementedError
+
+    def leer(self, user_id, rutina_id):
+        raise NotImplementedError
+
+    def agregar(self, user_id, rutina):
+        raise NotImplementedError
+
+    def borrar(self, user_id, rutina_id):
+        raise NotImplementedError
+
+    def version(self, user_id):
+        # Cambia cada vez que cambia la biblioteca del usuario (para los índices)
+        raise NotImplementedError
+
+    def indice_nombres(self, user_id):
+        return indice_para((self.nombre, user_id), self.version(user_id), lambda: self.listar(user_id))
+
+    def indice_atributos(self, user_id):
+        return atributos_para((self.nombre, user_id), self.version(user_id), lambda: self.listar(user_id))
+
+    def cargar_todas(self, user_id):
+        # Lista completa [{"id", "nombre", "texto"}] del usuario
+        out = []
+        for e in self.listar(user_id):
+            r = self.leer(user_id, e["id"])
+            if r is not None:
+                out.append(dict(r, id=e["id"]))
+        return out
+
+
+class MemoryRoutineStore(RoutineStore):
+    nombre = "memoria"
+
+    def __init__(self):
+        self._datos = {}       # user_id -> OrderedDict id -> (entrada, cuerpo)
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def listar(self, user_id):
+        with self._lock:
+            return [dict(e) for e, _ in self._datos.get(user_id, {}).values()]
+
+    def leer(self, user_id, rutina_id):
+        with self._lock:
+            guardada = self._datos.get(user_id, {}).get(rutina_id)
+        return decodificar_rutina(guardada[1]) if guardada else None
+
+    def agregar(self, user_id, rutina):
+        rid = nuevo_id()
+        cuerpo, _ = codificar_rutina(rutina)
+        entrada = entrada_manifiesto(rid, rutina, cuerpo)
+        with self._lock:
+            self._datos.setdefault(user_id, OrderedDict())[rid] = (entrada, cuerpo)
+            self._versiones[user_id] = self._versiones.get(user_id, 0) + 1
+        return rid
+
+    def borrar(self, user_id, rutina_id):
+        with self._lock:
+            if self._datos.get(user_id, {}).pop(rutina_id, None) is None:
+                return False
+            self._versiones[user_id] = self._versiones.get(user_id, 0) + 1
+        return True
+
+    def version(self, user_id):
+        with self._lock:
+            return self._versiones.get(user_id, 0) + 1
+
+
+class FileRoutineStore(RoutineStore):
+    # {carpeta}/{user_id}/rutinas/manifiesto.json y {id}.json, como en S3.
+    # Cada archivo se escribe completo en un .tmp y se renombra, así nunca
+    # queda uno a medias; un lock por usuario ordena las escrituras del proceso.
+    nombre = "archivos"
+
+    def __init__(self, carpeta):
+        self.carpeta = Path(carpeta)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _lock_usuario(self, user_id):
+        with self._lock:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def _dir(self, user_id):
+        # El user_id de Alexa trae caracteres que no queremos en una ruta
+        seguro = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(user_id or "anonimo"))
+        return self.carpeta / seguro / "rutinas"
+
+    def _escribir(self, ruta, cuerpo):
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ruta.with_name(ruta.name + f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(cuerpo)
+        tmp.replace(ruta)
+
+    def _manifiesto(self, user_id):
+        try:
+            data = de_json((self._dir(user_id) / "manifiesto.json").read_bytes())
+        except FileNotFoundError:
+            return []
+        return list((data or {}).get("rutinas") or [])
+
+    def _guardar_manifiesto(self, user_id, entradas):
+        self._escribir(self._dir(user_id) / "manifiesto.json", a_json({"v": 1, "rutinas": entradas}))
+
+    def listar(self, user_id):
+        return self._manifiesto(user_id)
+
+    def leer(self, user_id, rutina_id):
+        try:
+            return decodificar_rutina((self._dir(user_id) / f"{rutina_id}.json").read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def agregar(self, user_id, rutina):
+        rid = nuevo_id()
+        cuerpo, _ = codificar_rutina(rutina)
+        self._escribir(self._dir(user_id) / f"{rid}.json", cuerpo)
+        with self._lock_usuario(user_id):
+            entradas = self._manifiesto(user_id)
+            entradas.append(entrada_manifiesto(rid, rutina, cuerpo))
+            self._guardar_manifiesto(user_id, entradas)
+        return rid
+
+    def borrar(self, user_id, rutina_id):
+        with self._lock_usuario(user_id):
+            entradas = self._manifiesto(user_id)
+            nuevas = [e for e in entradas if e.get("id") != rutina_id]
+            if len(nuevas) == len(entradas):
+                return False
+            self._guardar_manifiesto(user_id, nuevas)
+        try:
+            (self._dir(user_id) / f"{rutina_id}.json").unlink()
+        except FileNotFoundError:
+            pass
+        return True
+
+    def version(self, user_id):
+        try:
+            st = (self._dir(user_id) / "manifiesto.json").stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class SQLiteRoutineStore(RoutineStore):
+    # Una fila por rutina; el orden de inserción (rowid) es el orden del manifiesto
+    nombre = "sqlite"
+
+    _ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS rutinas (
+            user_id TEXT NOT NULL,
+            id      TEXT NOT NULL,
+            nombre  TEXT NOT NULL,
+            cuerpo  BLOB NOT NULL,
+            entrada TEXT NOT NULL,
+            PRIMARY KEY (user_id, id)
+        );
+        CREATE INDEX IF NOT EXISTS rutinas_usuario_nombre ON rutinas (user_id, nombre);
+        CREATE TABLE IF NOT EXISTS versiones (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, ruta):
+        import sqlite3
+        self.ruta = str(ruta)
+        if self.ruta != ":memory:":
+            Path(self.ruta).parent.mkdir(parents=True, exist_ok=True)
+        # Una conexión compartida por los hilos del proceso, protegida con lock
+        self._con = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            if self.ruta != ":memory:":
+                self._con.execute("PRAGMA journal_mode=WAL")
+                self._con.execute("PRAGMA synchronous=NORMAL")
+            self._con.executescript(self._ESQUEMA)
+
+    def _subir_version(self, user_id):
+        self._con.execute("INSERT INTO versiones (user_id, version) VALUES (?, 1) "
+                          "ON CONFLICT(user_id) DO UPDATE SET version = version + 1", (user_id,))
+
+    def listar(self, user_id):
+        with self._lock:
+            filas = self._con.execute("SELECT entrada FROM rutinas WHERE user_id = ? ORDER BY rowid",
+                                      (str(user_id),)).fetchall()
+        return [json.loads(f[0]) for f in filas]
+
+    def leer(self, user_id, rutina_id):
+        with self._lock:
+            fila = self._con.execute("SELECT cuerpo FROM rutinas WHERE user_id = ? AND id = ?",
+                                     (str(user_id), rutina_id)).fetchone()
+        return decodificar_rutina(bytes(fila[0])) if fila else None
+
+    def agregar(self, user_id, rutina):
+        rid = nuevo_id()
+        cuerpo, _ = codificar_rutina(rutina)
+        entrada = entrada_manifiesto(rid, rutina, cuerpo)
+        with self._lock:
+            self._con.execute("BEGIN")
+            try:
+                self._con.execute("INSERT INTO rutinas (user_id, id, nombre, cuerpo, entrada) "
+                                  "VALUES (?, ?, ?, ?, ?)",
+                                  (str(user_id), rid, entrada["nombre"], cuerpo,
+                                   json.dumps(entrada, ensure_ascii=False)))
+                self._subir_version(str(user_id))
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return rid
+
+    def borrar(self, user_id, rutina_id):
+        with self._lock:
+            self._con.execute("BEGIN")
+            try:
+                n = self._con.execute("DELETE FROM rutinas WHERE user_id = ? AND id = ?",
+                                      (str(user_id), rutina_id)).rowcount
+                if n:
+                    self._subir_version(str(user_id))
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return bool(n)
+
+    def version(self, user_id):
+        with self._lock:
+            fila = self._con.execute("SELECT version FROM versiones WHERE user_id = ?",
+                                     (str(user_id),)).fetchone()
+        return fila[0] if fila else None
+
+    def buscar_por_nombre(self, user_id, nombre):
+        # Coincidencia exacta usando el índice (user_id, nombre)
+        with self._lock:
+            filas = self._con.execute("SELECT entrada FROM rutinas WHERE user_id = ? AND nombre = ? "
+                                      "ORDER BY rowid", (str(user_id), nombre)).fetchall()
+        return [json.loads(f[0]) for f in filas]
+
+
+class S3RoutineStore(RoutineStore):
+    # Lo de persistencia_s3: manifiesto y un objeto por rutina, con cache,
+    # escrituras condicionales e índices por ETag
+    nombre = "s3"
+    remoto = True
+
+    def __init__(self):
+        import persistencia_s3
+        self._s3 = persistencia_s3
+
+    def listar(self, user_id):
+        return self._s3.listar_rutinas(user_id)
+
+    def leer(self, user_id, rutina_id):
+        return self._s3.leer_rutina(user_id, rutina_id)
+
+    def agregar(self, user_id, rutina):
+        return self._s3.agregar_rutina(user_id, rutina)
+
+    def borrar(self, user_id, rutina_id):
+        return self._s3.borrar_rutina(user_id, rutina_id)
+
+    def indice_nombres(self, user_id):
+        return self._s3.indice_rutinas(user_id)
+
+    def indice_atributos(self, user_id):
+        return self._s3.atributos_rutinas(user_id)
+
+
+class AlmacenNoConfigurado(ValueError):
+    # Falta configurar dónde se guardan las rutinas (Lambda sin bucket). Solo
+    # fallan las operaciones con rutinas guardadas; crear rutinas sigue igual
+    pass
+
+
+def crear_almacen(backend=None):
+    # Arma el almacén pedido (o el de la configuración)
+    backend = (backend or os.environ.get("RUTINAS_BACKEND") or "").strip().lower()
+    en_lambda = bool(os.environ.get("AWS_LAMBDA_FUNCTION_NAME"))
+    hay_bucket = bool(os.environ.get("S3_PERSISTENCE_BUCKET"))
+    if not backend:
+        if hay_bucket:
+            backend = "s3"
+        elif en_lambda:
+            # Guardar en /tmp en la Lambda parece funcionar, pero cada
+            # contenedor tiene su copia y se pierde al reciclarlo
+            raise AlmacenNoConfigurado("Falta S3_PERSISTENCE_BUCKET: en Lambda las rutinas no se pueden "
+                             "guardar en /tmp (para usarlo de todos modos, RUTINAS_BACKEND=archivos)")
+        else:
+            backend = "archivos"
+            logging.warning("Sin S3_PERSISTENCE_BUCKET: las rutinas se guardan en %s",
+                            os.environ.get("RUTINAS_DIR", "/tmp/entrenador_fit_rutinas"))
+    elif en_lambda and backend != "s3":
+        logging.warning("RUTINAS_BACKEND=%s en Lambda: las rutinas solo viven en este contenedor", backend)
+    if backend == "s3" and not hay_bucket:
+        raise AlmacenNoConfigurado("RUTINAS_BACKEND=s3 necesita S3_PERSISTENCE_BUCKET")
+    if backend == "memoria":
+        return MemoryRoutineStore()
+    if backend == "archivos":
+        return FileRoutineStore(os.environ.get("RUTINAS_DIR", "/tmp/entrenador_fit_rutinas"))
+    if backend == "sqlite":
+        return SQLiteRoutineStore(os.environ.get("RUTINAS_SQLITE", "/tmp/entrenador_fit_rutinas.sqlite3"))
+    if backend == "s3":
+        return S3RoutineStore()
+    raise ValueError(f"RUTINAS_BACKEND desconocido: {backend!r}")
+
+
+_almacen = None
+_lock_almacen = threading.Lock()
+
+
+def obtener_almacen():
+    # Almacén compartido por el contenedor; se crea la primera vez que se usa
+    global _almacen
+    if _almacen is None:
+        with _lock_almacen:
+            if _almacen is None:
+                _almacen = crear_almacen()
+    return _almacen
+
+
+def precargar_biblioteca(user_id):
+    # Se llama al abrir la skill: manifiesto e índices, y después las rutinas
+    # más recientes, se leen en segundo plano (precarga_rutinas)
+    if user_id is None:
+        return
+    try:
+        almacen = obtener_almacen()
+    except AlmacenNoConfigurado as e:
+        # Sin almacén no hay nada que precargar; abrir la skill sigue igual
+        logging.warning("Sin precarga de rutinas: %s", e)
+        return
+
+    def cargar():
+        entradas = almacen.listar(user_id)
+        pre = {"rutinas": {},
+               "manifiesto": {"entradas": entradas,
+                              "nombres": almacen.indice_nombres(user_id),
+                              "atributos": almacen.indice_atributos(user_id)}}
+        # Las rutinas van aparte: "ver rutinas" no tiene que esperarlas y
+        # leer_rutina usa las que ya estén
+        recientes = sorted(entradas, key=lambda e: e.get("creado") or 0, reverse=True)
+        PRECARGA.lanzar(lambda: bajar(pre["rutinas"], recientes[:PRECARGA_RUTINAS]))
+        return pre
+
+    def bajar(rutinas, entradas):
+        for e in entradas:
+            r = almacen.leer(user_id, e["id"])
+            if r is not None:
+                rutinas[e["id"]] = r
+
+    PRECARGA.iniciar(user_id, cargar)
+
+
+def almacen_remoto():
+    # Sin almacén configurado la operación falla al empezar: no hay a quién esperar
+    try:
+        return obtener_almacen().remoto
+    except AlmacenNoConfigurado:
+        return False
+
+
+# --- Lo que usan los handlers ---
+# Si hay precarga la usan; si no llegó a tiempo o falló, leen como siempre.
+# Las rutinas precargadas no cambian (cada una tiene su id), pero el
+# manifiesto sí: otro dispositivo, o esta misma sesión, puede guardar o borrar.
+# Por eso la lista y los índices precargados solo se usan una vez, en el
+# primer turno que los pide; después se leen del almacén, que revalida el
+# manifiesto (ETag) en cada lectura.
+def _manifiesto_precargado(user_id):
+    pre = PRECARGA.resultado(user_id)
+    return pre.pop("manifiesto", None) if pre is not None else None
+
+
+def listar_rutinas(user_id):
+    man = _manifiesto_precargado(user_id)
+    if man is not None:
+        return list(man["entradas"])
+    return obtener_almacen().listar(user_id)
+
+
+def leer_rutina(user_id, rutina_id):
+    pre = PRECARGA.resultado(user_id)
+    if pre is not None and rutina_id in pre["rutinas"]:
+        return pre["rutinas"][rutina_id]
+    return obtener_almacen().leer(user_id, rutina_id)
+
+
+def agregar_rutina(user_id, rutina):
+    try:
+        return obtener_almacen().agregar(user_id, rutina)
+    finally:
+        PRECARGA.olvidar(user_id)
+
+
+def borrar_rutina(user_id, rutina_id):
+    try:
+        return obtener_almacen().borrar(user_id, rutina_id)
+    finally:
+        PRECARGA.olvidar(user_id)
+
+
+def indice_rutinas(user_id):
+    man = _manifiesto_precargado(user_id)
+    if man is not None:
+        return man["nombres"]
+    return obtener_almacen().indice_nombres(user_id)
+
+
+def atributos_rutinas(user_id):
+    man = _manifiesto_precargado(user_id)
+    if man is not None:
+        return man["atributos"]
+    return obtener_almacen().indice_atributos(user_id)
@@ -0,0 +1,64 @@
+# Cache LRU de rutinas ya generadas (vive mientras el contenedor esté caliente)
+#
+# En modo manual la rutina solo depende de tipo, nivel y la categoría de IMC,
+# así que guardamos la rutina terminada y su texto para no volver a correr
+# toda la generación para cada usuario. Si el catálogo cambia de versión, la
+# cache se vacía sola.
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    def __init__(self, capacidad=64):
+        self.capacidad = max(1, int(capacidad))
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidaciones = 0
+
+    def _revisar_version(self, version):
+        # Si el catálogo cambió, lo guardado ya no sirve
+        if version != self.version:
+            if self._datos:
+                self.invalidaciones += 1
+            self._datos.clear()
+            self.version = version
+
+    def obtener(self, clave, version=None):
+        with self._lock:
+            self._revisar_version(version)
+            valor = self._datos.get(clave)
+            if valor is None:
+                self.misses += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def guardar(self, clave, valor, version=None):
+        with self._lock:
+            self._revisar_version(version)
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+                self.evictions += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self):
+        return {"tamano": len(self._datos), "capacidad": self.capacidad,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "invalidaciones": self.invalidaciones}
+
+
+# Cache compartida por el contenedor: (modo, tipo, nivel, categoría IMC, sobrepeso)
+# -> (rutina, texto)
+CACHE_RUTINAS = CacheLRU(int(os.environ.get("CACHE_RUTINAS_MAX", "64")))
@@ -0,0 +1,186 @@
+# Cache de lectura de objetos de S3 en el contenedor caliente
+#
+# Dos niveles: un LRU en memoria y una copia en /tmp limitada por tamaño (el
+# /tmp sobrevive mientras el contenedor siga vivo, aunque el proceso se
+# reinicie). Cada entrada guarda el ETag para revalidar con un GET
+# condicional (If-None-Match), y las escrituras actualizan la cache para que
+# un "ver rutinas" justo después de guardar no tenga que ir a S3.
+#
+# Lo que puede cambiar desde otro dispositivo (el manifiesto) se revalida en
+# cada lectura: si no cambió, S3 contesta 304 sin cuerpo. Solo los objetos
+# que nunca se reescriben (cada rutina guardada tiene su propio id) se usan
+# sin preguntar mientras sean recientes (S3_CACHE_TTL).
+#
+# El tamaño del nivel en disco se lleva en memoria: la carpeta se recorre una
+# sola vez por proceso y después cada escritura solo suma y resta.
+#
+# Variables de entorno:
+#   S3_CACHE_MAX            entradas en memoria (default 256)
+#   S3_CACHE_TTL            segundos que un objeto inmutable se usa sin revalidar (default 60)
+#   S3_CACHE_DIR            carpeta del nivel en disco (default /tmp/entrenador_fit_s3)
+#   S3_CACHE_DISCO_MAX      bytes máximos en disco (default 20 MB, 0 lo apaga)
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class EntradaCache:
+    __slots__ = ("etag", "cuerpo", "validado")
+
+    def __init__(self, etag, cuerpo, validado):
+        self.etag = etag          # None si el objeto no existe en S3
+        self.cuerpo = cuerpo      # bytes, o None si no existe
+        self.validado = validado  # time.monotonic() de la última validación
+
+
+class CacheS3:
+    def __init__(self, capacidad=256, ttl=60.0, carpeta=None, disco_max=20 * 1024 * 1024):
+        self.capacidad = max(1, int(capacidad))
+        self.ttl = float(ttl)
+        self.carpeta = Path(carpeta) if carpeta else None
+        self.disco_max = int(disco_max)
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        # Archivos del nivel en disco (ruta -> bytes), del más viejo al más
+        # nuevo, y su total; None hasta la primera escritura
+        self._disco = None
+        self._disco_total = 0
+        self._lock_disco = threading.Lock()
+        self.stats = {"hits_memoria": 0, "hits_disco": 0, "misses": 0,
+                      "revalidaciones": 0, "no_modificados": 0, "escrituras": 0}
+
+    # --- memoria ---
+    def obtener(self, key):
+        # Regresa la EntradaCache (de memoria o de disco) o None
+        with self._lock:
+            entrada = self._mem.get(key)
+            if entrada is not None:
+                self._mem.move_to_end(key)
+                self.stats["hits_memoria"] += 1
+                return entrada
+        entrada = self._leer_disco(key)
+        if entrada is not None:
+            self.stats["hits_disco"] += 1
+            self._poner_memoria(key, entrada)
+            return entrada
+        self.stats["misses"] += 1
+        return None
+
+    def fresca(self, entrada):
+        # Solo para objetos inmutables: los demás se revalidan siempre
+        return entrada is not None and (time.monotonic() - entrada.validado) < self.ttl
+
+    def guardar(self, key, etag, cuerpo, escritura=False):
+        entrada = EntradaCache(etag, cuerpo, time.monotonic())
+        self._poner_memoria(key, entrada)
+        self._escribir_disco(key, entrada)
+        if escritura:
+            self.stats["escrituras"] += 1
+        return entrada
+
+    def revalidada(self, key, entrada):
+        # S3 contestó 304: el contenido sigue igual, solo renovamos la marca
+        entrada.validado = time.monotonic()
+        self.stats["no_modificados"] += 1
+        self._poner_memoria(key, entrada)
+
+    def olvidar(self, key):
+        with self._lock:
+            self._mem.pop(key, None)
+        ruta = self._ruta_disco(key)
+        if ruta is not None:
+            try:
+                ruta.unlink()
+            except OSError:
+                pass
+            with self._lock_disco:
+                if self._disco is not None:
+                    self._disco_total -= self._disco.pop(ruta, 0)
+
+    def limpiar(self):
+        with self._lock:
+            self._mem.clear()
+
+    def _poner_memoria(self, key, entrada):
+        with self._lock:
+            self._mem[key] = entrada
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.capacidad:
+                self._mem.popitem(last=False)
+
+    # --- disco (/tmp) ---
+    def _ruta_disco(self, key):
+        if self.carpeta is None or self.disco_max <= 0:
+            return None
+        import hashlib
+        return self.carpeta / hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _leer_disco(self, key):
+        ruta = self._ruta_disco(key)
+        if ruta is None:
+            return None
+        try:
+            datos = ruta.read_bytes()
+        except OSError:
+            return None
+        etag, _, cuerpo = datos.partition(b"\n")
+        # El tiempo de validación no sobrevive al proceso: se revalida con S3
+        if etag == b"-":
+            return EntradaCache(None, None, float("-inf"))
+        return EntradaCache(etag.decode("utf-8"), cuerpo, float("-inf"))
+
+    def _escribir_disco(self, key, entrada):
+        ruta = self._ruta_disco(key)
+        if ruta is None:
+            return
+        cuerpo = entrada.cuerpo or b""
+        if len(cuerpo) > self.disco_max:
+            return
+        try:
+            self.carpeta.mkdir(parents=True, exist_ok=True)
+            datos = (entrada.etag or "-").encode("utf-8") + b"\n" + cuerpo
+            tmp = ruta.with_suffix(".tmp")
+            tmp.write_bytes(datos)
+            tmp.replace(ruta)
+            self._registrar_disco(ruta, len(datos))
+        except OSError:
+            pass
+
+    def _cargar_disco(self):
+        # Lo que ya había en la carpeta (de un proceso anterior del mismo
+        # contenedor), ordenado por fecha; solo se recorre una vez
+        archivos = []
+        for f in self.carpeta.iterdir():
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            archivos.append((st.st_mtime, f, st.st_size))
+        self._disco = OrderedDict((f, tam) for _, f, tam in sorted(archivos))
+        self._disco_total = sum(self._disco.values())
+
+    def _registrar_disco(self, ruta, tam):
+        # Suma el archivo escrito y borra los más viejos hasta quedar bajo el límite
+        with self._lock_disco:
+            if self._disco is None:
+                self._cargar_disco()
+            self._disco_total += tam - self._disco.pop(ruta, 0)
+            self._disco[ruta] = tam
+            while self._disco_total > self.disco_max and len(self._disco) > 1:
+                f, viejo = self._disco.popitem(last=False)
+                self._disco_total -= viejo
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+
+
+CACHE_S3 = CacheS3(
+    capacidad=int(os.environ.get("S3_CACHE_MAX", "256")),
+    ttl=float(os.environ.get("S3_CACHE_TTL", "60")),
+    carpeta=os.environ.get("S3_CACHE_DIR", "/tmp/entrenador_fit_s3"),
+    disco_max=int(os.environ.get("S3_CACHE_DISCO_MAX", str(20 * 1024 * 1024))),
+)
@@ -0,0 +1,190 @@
+# Catálogo de rutinas (routines.json) compartido por todo el contenedor
+#
+# Antes cada generación volvía a leer y parsear routines.json. Aquí lo
+# cargamos una sola vez por contenedor y lo congelamos para que nadie pueda
+# modificar los pasos compartidos; solo se vuelve a cargar si el archivo
+# cambia (mtime o tamaño).
+
+import json
+import threading
+import time
+from collections.abc import Mapping
+from enum import IntEnum
+from pathlib import Path
+from types import MappingProxyType
+
+HERE = Path(__file__).parent
+RUTA_CATALOGO = HERE / "routines.json"
+# Versión precompilada de routines.json (ver catalogo_binario.py)
+RUTA_BINARIO = HERE / "routines.bin"
+
+
+class TipoPaso(IntEnum):
+    # Tipo de cada paso; se calcula una sola vez al cargar/compilar el catálogo
+    CALENTAMIENTO = 0
+    EJERCICIO = 1
+    DESCANSO = 2
+    VUELTA_CALMA = 3
+
+
+def es_titulo_descanso(titulo):
+    # Misma regla de siempre: el título menciona descanso, pausa o rest
+    t = str(titulo or "").lower()
+    return ("descanso" in t) or ("pausa" in t) or ("rest" in t)
+
+
+def clasificar_paso(paso, seccion):
+    # seccion: "warmup", "cooldown" o "sets". Un título que parece descanso
+    # gana sobre la sección para que los ajustes lo sigan tratando igual.
+    if es_titulo_descanso(paso.get("title", "")):
+        return TipoPaso.DESCANSO
+    if seccion == "warmup":
+        return TipoPaso.CALENTAMIENTO
+    if seccion == "cooldown":
+        return TipoPaso.VUELTA_CALMA
+    return TipoPaso.EJERCICIO
+
+
+class PasoCongelado(dict):
+    # Un paso del catálogo: se lee como dict normal pero no se puede modificar.
+    # dict(paso) regresa una copia normal que sí se puede editar.
+    __slots__ = ()
+
+    def _solo_lectura(self, *args, **kwargs):
+        raise TypeError("Los pasos del catálogo son de solo lectura; usa dict(paso) para copiarlo")
+
+    __setitem__ = __delitem__ = _solo_lectura
+    clear = pop = popitem = setdefault = update = _solo_lectura
+    __ior__ = _solo_lectura
+
+    def __reduce__(self):
+        # copy/pickle regresan un dict normal
+        return (dict, (dict(self),))
+
+
+def _congelar_pasos(pasos, seccion):
+    out = []
+    for p in (pasos or []):
+        if not isinstance(p, dict):
+            continue
+        paso = dict(p)
+        paso["tipo_paso"] = int(clasificar_paso(p, seccion))
+        out.append(PasoCongelado(paso))
+    return tuple(out)
+
+
+class CatalogoRutinas(Mapping):
+    # Vista de solo lectura del catálogo. Se usa igual que el dict de
+    # routines.json (data.get("sets"), data["warmup"], ...), así que
+    # RoutineFacade, elegir_set y crear_rutina_desde_data no cambian.
+    # Si data ya viene congelado (por ejemplo del archivo binario), se usa tal cual.
+    def __init__(self, data, version=0, huella=None, congelado=False, ruta=None, firma=None):
+        data = data if isinstance(data, Mapping) else {}
+        if congelado:
+            contenido = dict(data)
+        else:
+            sets = data.get("sets") or {}
+            contenido = dict(data)
+            contenido["warmup"] = _congelar_pasos(data.get("warmup"), "warmup")
+            contenido["cooldown"] = _congelar_pasos(data.get("cooldown"), "cooldown")
+            contenido["sets"] = MappingProxyType({str(k): _congelar_pasos(v, "sets") for k, v in sets.items()})
+        self._data = MappingProxyType(contenido)
+        self.version = version
+        self.huella = huella
+        self.ruta = ruta
+        self._firma = firma
+
+    @property
+    def firma(self):
+        # sha256 de routines.json; identifica el contenido aunque cambie la fecha
+        if self._firma is None:
+            import hashlib
+            try:
+                self._firma = hashlib.sha256(Path(self.ruta).read_bytes()).hexdigest()
+            except (OSError, TypeError):
+                self._firma = ""
+        return self._firma
+
+    def __getitem__(self, clave):
+        return self._data[clave]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"CatalogoRutinas(version={self.version}, sets={len(self._data.get('sets', {}))})"
+
+
+# --- Instancia compartida por el proceso ---
+_lock = threading.Lock()
+_catalogo = None
+_huella = None
+_stats = {"cargas": 0, "cargas_binario": 0, "segundos_carga": 0.0, "consultas": 0,
+          "recargas_por_cambio": 0}
+
+
+def _huella_archivo(ruta):
+    # (mtime, tamaño) del archivo, o None si no existe
+    try:
+        st = ruta.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _leer_json(ruta):
+    if not ruta.exists():
+        return {"rutinas": []}
+    return json.loads(ruta.read_text(encoding="utf-8"))
+
+
+def _cargar(ruta, ruta_binario, version, huella):
+    # Preferimos el binario precompilado (mmap, sin parsear JSON); si falta o
+    # no corresponde al JSON actual, leemos routines.json como siempre.
+    if ruta_binario is not None and huella[3] is not None:
+        try:
+            import catalogo_binario
+            data = catalogo_binario.abrir(ruta_binario, ruta_json=ruta)
+            if data is not None:
+                _stats["cargas_binario"] += 1
+                firma = data.pop("sha256", None)
+                return CatalogoRutinas(data, version=version, huella=huella, congelado=True,
+                                       ruta=ruta, firma=firma)
+        except Exception as e:
+            print("WARN catálogo binario:", repr(e))
+    return CatalogoRutinas(_leer_json(ruta), version=version, huella=huella, ruta=ruta)
+
+
+def obtener_catalogo(ruta=None, ruta_binario=None):
+    # Regresa el catálogo compartido; lo recarga solo si el archivo cambió
+    global _catalogo, _huella
+    if ruta:
+        ruta = Path(ruta)
+        ruta_binario = Path(ruta_binario) if ruta_binario else ruta.with_suffix(".bin")
+    else:
+        ruta, ruta_binario = RUTA_CATALOGO, (Path(ruta_binario) if ruta_binario else RUTA_BINARIO)
+    huella = (str(ruta), _huella_archivo(ruta), str(ruta_binario), _huella_archivo(ruta_binario))
+    _stats["consultas"] += 1
+    actual = _catalogo
+    if actual is not None and huella == _huella:
+        return actual
+    with _lock:
+        if _catalogo is not None and huella == _huella:
+            return _catalogo
+        t0 = time.perf_counter()
+        version = (_catalogo.version + 1) if _catalogo is not None else 1
+        nuevo = _cargar(ruta, ruta_binario, version, huella)
+        _stats["segundos_carga"] += time.perf_counter() - t0
+        if _catalogo is not None:
+            _stats["recargas_por_cambio"] += 1
+        _stats["cargas"] += 1
+        _catalogo, _huella = nuevo, huella
+        return nuevo
+
+
+def estadisticas_catalogo():
+    # Copia de los contadores (cargas, tiempo de carga, consultas, recargas)
+    return dict(_stats)
@@ -0,0 +1,244 @@
+# Catálogo precompilado en binario (routines.bin)
+#
+# routines.json se compila una vez (en el build) a un archivo binario compacto:
+#   - cada texto (títulos, frases, claves) se guarda una sola vez,
+#   - cada paso distinto se guarda una sola vez con su TipoPaso ya calculado;
+#     title, decir y segundos van en la tabla de pasos y cualquier otra clave
+#     del paso (las que se agreguen después a routines.json) va como un texto
+#     JSON aparte, así el paso sale igual que leído del JSON,
+#   - el índice de sets {TIPO}_{NIVEL}_{SOBREPESO} va ordenado para buscar
+#     con búsqueda binaria.
+# En la Lambda el archivo se abre con mmap y solo se decodifican los sets que
+# se piden. Si el binario no existe o no corresponde a routines.json, catalogo.py
+# sigue usando el JSON.
+#
+# Para saber si corresponde no se vuelve a leer el JSON en cada arranque: el
+# tamaño tiene que ser el mismo y routines.json no puede ser más nuevo que
+# routines.bin (el binario se compiló después del último cambio al JSON). Solo
+# si el JSON es más nuevo se compara el sha256 guardado al compilar. Por eso
+# routines.bin se compila en el build, después de copiar routines.json.
+#
+# Compilar: python catalogo_binario.py [routines.json] [routines.bin]
+
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+
+from catalogo import PasoCongelado, TipoPaso, clasificar_paso
+
+MAGIA = b"RTNC"
+VERSION_FORMATO = 2
+
+# magia, versión, mtime_ns y tamaño del JSON fuente, sha256 del JSON,
+# número de textos/pasos/sets y offsets de cada tabla
+_CABECERA = struct.Struct("<4sHHqQ32sIIIIIIII")
+_TEXTO = struct.Struct("<II")       # offset, largo (en el bloque de textos)
+_PASO = struct.Struct("<IIIHBx")    # título, frase, claves extra (JSON), segundos, tipo
+_SET = struct.Struct("<III")        # clave, primer ref, cantidad
+_REF = struct.Struct("<I")          # índice de paso
+
+# Claves del paso que van en su propia columna; las demás van en "extra"
+CLAVES_PASO = ("title", "decir", "segundos", "tipo_paso")
+
+# Claves reservadas para calentamiento y vuelta a la calma dentro del índice
+CLAVE_WARMUP = "#warmup"
+CLAVE_COOLDOWN = "#cooldown"
+
+
+def _sha256(ruta):
+    # hashlib carga OpenSSL; solo lo importamos si de verdad hay que comparar
+    import hashlib
+    return hashlib.sha256(Path(ruta).read_bytes()).digest()
+
+
+def compilar(ruta_json, ruta_bin):
+    # Lee routines.json y escribe el binario; regresa el tamaño en bytes
+    ruta_json, ruta_bin = Path(ruta_json), Path(ruta_bin)
+    data = json.loads(ruta_json.read_text(encoding="utf-8"))
+
+    textos, idx_textos = [], {}
+    pasos, idx_pasos = [], {}
+
+    def texto(s):
+        s = str(s or "")
+        if s not in idx_textos:
+            idx_textos[s] = len(textos)
+            textos.append(s)
+        return idx_textos[s]
+
+    def paso(p, seccion):
+        extra = {k: v for k, v in p.items() if k not in CLAVES_PASO}
+        extra = json.dumps(extra, ensure_ascii=False, sort_keys=True) if extra else ""
+        clave = (texto(p.get("title", "")), texto(p.get("decir", "")), texto(extra),
+                 int(p.get("segundos", 0) or 0), int(clasificar_paso(p, seccion)))
+        if clave not in idx_pasos:
+            idx_pasos[clave] = len(pasos)
+            pasos.append(clave)
+        return idx_pasos[clave]
+
+    grupos = {CLAVE_WARMUP: [paso(p, "warmup") for p in data.get("warmup", [])],
+              CLAVE_COOLDOWN: [paso(p, "cooldown") for p in data.get("cooldown", [])]}
+    for clave, lista in (data.get("sets") or {}).items():
+        grupos[str(clave)] = [paso(p, "sets") for p in lista]
+
+    refs, sets = [], []
+    for clave in sorted(grupos):
+        sets.append((texto(clave), len(refs), len(grupos[clave])))
+        refs.extend(grupos[clave])
+    # las claves de sets se buscan ordenadas por texto, no por índice
+    sets.sort(key=lambda s: textos[s[0]])
+
+    blob = bytearray()
+    tabla_textos = bytearray()
+    for s in textos:
+        b = s.encode("utf-8")
+        tabla_textos += _TEXTO.pack(len(blob), len(b))
+        blob += b
+
+    cuerpo = bytearray()
+    off_textos = _CABECERA.size
+    cuerpo += tabla_textos
+    off_blob = off_textos + len(cuerpo)
+    cuerpo += blob
+    cuerpo += b"\0" * (-len(cuerpo) % 4)
+    off_pasos = _CABECERA.size + len(cuerpo)
+    for t, d, x, s, k in pasos:
+        cuerpo += _PASO.pack(t, d, x, s, k)
+    off_sets = _CABECERA.size + len(cuerpo)
+    for c, i, n in sets:
+        cuerpo += _SET.pack(c, i, n)
+    off_refs = _CABECERA.size + len(cuerpo)
+    for r in refs:
+        cuerpo += _REF.pack(r)
+
+    st = ruta_json.stat()
+    cabecera = _CABECERA.pack(MAGIA, VERSION_FORMATO, 0, st.st_mtime_ns, st.st_size,
+                              _sha256(ruta_json), len(textos), len(pasos), len(sets),
+                              off_textos, off_blob, off_pasos, off_sets, off_refs)
+    tmp = ruta_bin.with_suffix(ruta_bin.suffix + ".tmp")
+    tmp.write_bytes(cabecera + bytes(cuerpo))
+    tmp.replace(ruta_bin)
+    return _CABECERA.size + len(cuerpo)
+
+
+class _ArchivoBinario:
+    # Lectura directa sobre el mmap; los textos y pasos se decodifican al
+    # pedirlos y se guardan para que pasos iguales sean el mismo objeto.
+    def __init__(self, mm):
+        self.mm = mm
+        (magia, version, _, self.mtime_ns, self.tamano, self.sha, self.n_textos,
+         self.n_pasos, self.n_sets, self.off_textos, self.off_blob, self.off_pasos,
+         self.off_sets, self.off_refs) = _CABECERA.unpack_from(mm, 0)
+        if magia != MAGIA or version != VERSION_FORMATO:
+            raise ValueError("routines.bin no tiene el formato esperado")
+        self._textos = {}
+        self._pasos = {}
+
+    def texto(self, i):
+        s = self._textos.get(i)
+        if s is None:
+            off, largo = _TEXTO.unpack_from(self.mm, self.off_textos + i * _TEXTO.size)
+            inicio = self.off_blob + off
+            s = sys.intern(str(self.mm[inicio:inicio + largo], "utf-8"))
+            self._textos[i] = s
+        return s
+
+    def paso(self, i):
+        p = self._pasos.get(i)
+        if p is None:
+            t, d, x, s, k = _PASO.unpack_from(self.mm, self.off_pasos + i * _PASO.size)
+            extra = self.texto(x)
+            paso = json.loads(extra) if extra else {}
+            paso.update({"title": self.texto(t), "segundos": s,
+                         "decir": self.texto(d), "tipo_paso": TipoPaso(k).value})
+            p = PasoCongelado(paso)
+            self._pasos[i] = p
+        return p
+
+    def entrada_set(self, j):
+        return _SET.unpack_from(self.mm, self.off_sets + j * _SET.size)
+
+    def buscar(self, clave):
+        # Búsqueda binaria sobre el índice ordenado de claves
+        lo, hi = 0, self.n_sets
+        while lo < hi:
+            mid = (lo + hi) // 2
+            c, i, n = self.entrada_set(mid)
+            k = self.texto(c)
+            if k == clave:
+                return i, n
+            if k < clave:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def pasos_de(self, inicio, cantidad):
+        base = self.off_refs
+        return tuple(self.paso(_REF.unpack_from(self.mm, base + (inicio + j) * _REF.size)[0])
+                     for j in range(cantidad))
+
+
+class _SetsBinarios(Mapping):
+    # Mapping de sets que decodifica cada set la primera vez que se pide
+    def __init__(self, archivo):
+        self._a = archivo
+        self._cache = {}
+
+    def __getitem__(self, clave):
+        pasos = self._cache.get(clave)
+        if pasos is None:
+            if not isinstance(clave, str) or clave.startswith("#"):
+                raise KeyError(clave)
+            pos = self._a.buscar(clave)
+            if pos is None:
+                raise KeyError(clave)
+            pasos = self._a.pasos_de(*pos)
+            self._cache[clave] = pasos
+        return pasos
+
+    def __iter__(self):
+        for j in range(self._a.n_sets):
+            clave = self._a.texto(self._a.entrada_set(j)[0])
+            if not clave.startswith("#"):
+                yield clave
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def abrir(ruta_bin, ruta_json=None):
+    # Abre routines.bin con mmap. Regresa el contenido del catálogo (warmup,
+    # cooldown, sets perezosos y el sha256 del JSON fuente) o None si el
+    # binario no corresponde al JSON.
+    ruta_bin = Path(ruta_bin)
+    with open(ruta_bin, "rb") as f:
+        mtime_bin = os.fstat(f.fileno()).st_mtime_ns
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    archivo = _ArchivoBinario(mm)
+    if ruta_json is not None and Path(ruta_json).exists():
+        st = Path(ruta_json).stat()
+        if st.st_size != archivo.tamano:
+            return None
+        # Solo si el JSON se modificó después de compilar revisamos el contenido;
+        # al descomprimir el zip de la Lambda cambian las fechas pero no el orden
+        if st.st_mtime_ns > mtime_bin and _sha256(ruta_json) != archivo.sha:
+            return None
+    grupos = {}
+    for clave in (CLAVE_WARMUP, CLAVE_COOLDOWN):
+        pos = archivo.buscar(clave)
+        grupos[clave] = archivo.pasos_de(*pos) if pos else ()
+    return {"warmup": grupos[CLAVE_WARMUP], "cooldown": grupos[CLAVE_COOLDOWN],
+            "sets": _SetsBinarios(archivo), "sha256": archivo.sha.hex()}
+
+
+if __name__ == "__main__":
+    aqui = Path(__file__).parent
+    origen = Path(sys.argv[1]) if len(sys.argv) > 1 else aqui / "routines.json"
+    destino = Path(sys.argv[2]) if len(sys.argv) > 2 else origen.with_suffix(".bin")
+    n = compilar(origen, destino)
+    print(f"{destino}: {n} bytes")
@@ -0,0 +1,179 @@
+# Formato con el que se guardan las rutinas en S3
+#
+# Cuerpos que se pueden leer de {user_id}/rutinas/{id}.json:
+#   sin "v"   {"nombre", "texto"}  como se guardaba antes (incluso con indent=2)
+#   "v": 2    {"v", "nombre", "texto"}             texto completo
+#   "v": 2    {"v", "nombre", "p", "t", "s"}       parámetros y pasos, sin prosa
+#
+# En la forma estructurada "p" son los parámetros con que se generó (modo,
+# tipo, nivel y, si salió de un sorteo, semilla y variante), "t" el título y "s" los pasos como [título, segundos]. La
+# frase "decir" sale del catálogo y solo se guarda ([título, segundos, decir])
+# cuando no es la de siempre para ese título. Al leer, el texto se vuelve a
+# armar con render_ssml (lo mismo que lee Alexa). Antes de guardar en esta forma revisamos que el
+# texto armado sea idéntico al que escuchó el usuario; si no, guardamos el texto.
+#
+# Si el JSON pasa de COMPRIMIR_DESDE bytes y gzip lo achica, se guarda
+# comprimido (Content-Encoding: gzip). Al leer reconocemos gzip por sus bytes
+# mágicos, así da igual si el cuerpo viene de S3 o de la cache en /tmp.
+# Si orjson está instalado lo usamos para codificar y decodificar.
+#
+# Variables de entorno:
+#   RUTINAS_GZIP_DESDE   bytes a partir de los cuales se intenta gzip (default 256, 0 lo apaga)
+
+import os
+import json
+import gzip
+import time
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+VERSION_FORMATO = 2
+COMPRIMIR_DESDE = int(os.environ.get("RUTINAS_GZIP_DESDE", "256"))
+_MAGIA_GZIP = b"\x1f\x8b"
+
+
+def a_json(data):
+    # JSON compacto en UTF-8
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def de_json(cuerpo):
+    # Bytes (JSON o JSON en gzip) -> objeto; None si viene vacío
+    if not cuerpo:
+        return None
+    if cuerpo[:2] == _MAGIA_GZIP:
+        cuerpo = gzip.decompress(cuerpo)
+    if not cuerpo.strip():
+        return None
+    if orjson is not None:
+        return orjson.loads(cuerpo)
+    return json.loads(cuerpo.decode("utf-8"))
+
+
+# --- Frases de cada paso ---
+_frases = None
+_version_frases = None
+
+
+def _frases_por_titulo():
+    # título -> "decir" de siempre: la primera frase con ese título recorriendo
+    # los descansos fijos, el catálogo (warmup, cooldown y los sets por clave)
+    # y los pools, en ese orden. El orden no se cambia: las rutinas guardadas
+    # omiten la frase cuando es esta. Se arma una vez por versión del catálogo.
+    global _frases, _version_frases
+    from catalogo import obtener_catalogo
+    cat = obtener_catalogo()
+    if _frases is not None and _version_frases == cat.version:
+        return _frases
+    from compilador_rutinas import POOL_UPPER, POOL_LOWER, FRASE_DESCANSO
+    frases = {"Descanso": FRASE_DESCANSO,
+              "Calentamiento": "Movilidad articular suave."}
+    fuentes = [cat.get("warmup", []), cat.get("cooldown", [])]
+    fuentes += [cat["sets"][k] for k in sorted(cat.get("sets", {}))]
+    fuentes += [POOL_UPPER, POOL_LOWER]
+    for pasos in fuentes:
+        for p in pasos:
+            frases.setdefault(str(p.get("title", "")), str(p.get("decir", "") or ""))
+    _frases, _version_frases = frases, cat.version
+    return frases
+
+
+def estructura_rutina(rutina, params=None):
+    # Rutina generada -> forma compacta {"p", "t", "s"} (la que se guarda en S3)
+    if not isinstance(rutina, dict):
+        return None
+    from compilador_rutinas import Paso
+    frases = _frases_por_titulo()
+    pasos = []
+    for p in rutina.get("pasos", []) or []:
+        if isinstance(p, Paso):
+            t, s, d = p.title, p.segundos, p.decir
+        elif isinstance(p, dict):
+            t = str(p.get("title", ""))
+            s = int(p.get("segundos", 0) or 0)
+            d = str(p.get("decir", "") or "")
+        else:
+            return None
+        pasos.append([t, s] if frases.get(t) == d else [t, s, d])
+    p = {k: params[k] for k in ("modo", "tipo", "nivel", "semilla", "variante")
+         if params and params.get(k) not in (None, "")}
+    return {"p": p, "t": rutina.get("titulo") or "", "s": pasos}
+
+
+def texto_de_estructura(est):
+    # Vuelve a armar el texto que escuchó el usuario. Se usa el renderer
+    # directo: importar lambda_function arma toda la skill (SkillBuilder,
+    # handler, gc.freeze) y este módulo también corre en la precarga
+    from render_ssml import RENDER_SSML
+    from compilador_rutinas import crear_paso
+    frases = _frases_por_titulo()
+    pasos = [crear_paso(s[0], s[1], s[2] if len(s) > 2 else frases.get(s[0], ""))
+             for s in est.get("s", [])]
+    rutina = {"pasos": pasos}
+    if est.get("t"):
+        rutina["titulo"] = est["t"]
+    return RENDER_SSML.texto(rutina)
+
+
+def metadatos_rutina(est):
+    # Lo que el manifiesto guarda de cada rutina para buscar sin bajarla:
+    # tipo, nivel, segundos totales y cuántos ejercicios tiene
+    from catalogo import obtener_catalogo
+    from compilador_rutinas import es_ejercicio
+    from rutina_servicio import RoutineFacade
+    cat = obtener_catalogo()
+    pasos = [{"title": s[0], "segundos": s[1]} for s in est.get("s", [])]
+    meta = {k: v for k, v in (est.get("p") or {}).items() if k in ("tipo", "nivel")}
+    meta["segundos"] = int(RoutineFacade(cat).duracion_estimada_seg({"pasos": pasos}))
+    # Se cuentan igual que en el compilador (es_ejercicio), así el número es
+    # el del nivel con que se armó la rutina
+    meta["ejercicios"] = sum(1 for p in pasos if es_ejercicio(p))
+    return meta
+
+
+def nuevo_id():
+    return uuid.uuid4().hex[:16]
+
+
+def entrada_manifiesto(rid, rutina, cuerpo, creado=None):
+    # Lo que "ver rutinas" y "buscar rutinas" necesitan saber sin bajar la
+    # rutina. Las rutinas guardadas solo como texto no traen tipo, nivel,
+    # segundos ni ejercicios.
+    entrada = {"id": rid, "nombre": rutina.get("nombre") or "", "bytes": len(cuerpo),
+               "creado": int(creado if creado is not None else time.time())}
+    if rutina.get("estructura"):
+        entrada.update(metadatos_rutina(rutina["estructura"]))
+    return entrada
+
+
+def codificar_rutina(rutina):
+    # {"nombre", "texto", "estructura"?} -> (bytes, content_encoding o None)
+    doc = {"v": VERSION_FORMATO, "nombre": rutina.get("nombre") or ""}
+    est = rutina.get("estructura")
+    if est and texto_de_estructura(est) == (rutina.get("texto") or ""):
+        doc.update(est)
+    else:
+        doc["texto"] = rutina.get("texto") or ""
+    cuerpo = a_json(doc)
+    if COMPRIMIR_DESDE and len(cuerpo) >= COMPRIMIR_DESDE:
+        comprimido = gzip.compress(cuerpo, compresslevel=6, mtime=0)
+        if len(comprimido) < len(cuerpo):
+            return comprimido, "gzip"
+    return cuerpo, None
+
+
+def decodificar_rutina(cuerpo):
+    # Bytes de S3 (cualquier versión) -> {"nombre", "texto"} (+ "params"), o None
+    data = de_json(cuerpo)
+    if not isinstance(data, dict):
+        return None
+    if "s" in data:
+        return {"nombre": data.get("nombre") or "", "texto": texto_de_estructura(data),
+                "params": data.get("p") or {}}
+    return {"nombre": data.get("nombre") or "", "texto": data.get("texto") or ""}
@@ -0,0 +1,244 @@
+# Compilador de rutinas: del catálogo a los pasos finales en una pasada
+#
+# Antes una rutina pasaba por varias etapas: RoutineFacade intercalaba
+# descansos, ajustar_por_nivel_y_tipo los volvía a separar (tres listas),
+# recortaba o rellenaba, copiaba cada paso y volvía a intercalar descansos, y
+# ajustar_descansos_por_imc recorría todo otra vez para cambiar los segundos
+# de los descansos. Aquí se recorre warmup + set + cooldown una sola vez, con
+# todas las reglas en REGLAS_NIVEL y REGLAS_IMC, y la rutina sale igual que
+# con las etapas (bench_compilador.py lo revisa).
+#
+# Los pasos de la rutina son Paso: una tupla inmutable (título, segundos,
+# frase, tipo) en lugar de un dict. Como no se pueden modificar, el mismo
+# Paso se comparte entre rutinas: crear_paso regresa siempre el mismo objeto
+# para los mismos valores, así todos los descansos de 20 s son uno solo y una
+# rutina en cache es una lista de referencias. Los dicts de antes solo se
+# arman al guardar (rutina_a_dict) y se vuelven Paso al leer (rutina_de_dict).
+
+import sys
+from functools import lru_cache
+from typing import NamedTuple
+
+from catalogo import TipoPaso, es_titulo_descanso
+from imc import calc_imc_cm, es_sobrepeso
+
+# Reglas por nivel:
+#   ejercicios  cuántos ejercicios lleva la rutina
+#   factor      multiplica los segundos de cada ejercicio...
+#   minimo      ...sin bajar de este mínimo
+#   descanso    segundos de descanso entre pasos (+ SOBREPESO_EXTRA con sobrepeso)
+# MEDIO descansa 15 s, que es lo que siempre han tenido sus rutinas.
+REGLAS_NIVEL = {
+    "FACIL":   {"ejercicios": 4, "factor": 0.8, "minimo": 20, "descanso": 15},
+    "MEDIO":   {"ejercicios": 6, "factor": 1.0, "minimo": 25, "descanso": 15},
+    "DIFICIL": {"ejercicios": 8, "factor": 1.2, "minimo": 35, "descanso": 25},
+}
+# Otros nombres del mismo nivel: INTERMEDIO es como se llama MEDIO en
+# routines.json (selector_sets.py) y usa la misma regla
+ALIAS_NIVEL = {"INTERMEDIO": "MEDIO"}
+REGLA_DEFAULT = {"ejercicios": 6, "factor": None, "minimo": None, "descanso": 15}
+SOBREPESO_EXTRA = 5
+
+# Descansos según la categoría de IMC: segundos + suma, sin bajar de minimo
+REGLAS_IMC = {
+    "SOBREPESO": {"suma": 15, "minimo": 30},
+    "OBESIDAD":  {"suma": 15, "minimo": 30},
+    "NORMAL":    {"suma": -5, "minimo": 10},
+}
+
+# Pool de ejercicios base por tipo (para rellenar si falta)
+POOL_UPPER = [
+    {"title":"Flexiones", "segundos":30, "decir":"Espalda recta."},
+    {"title":"Remo invertido", "segundos":30, "decir":"Escápulas atrás."},
+    {"title":"Fondos en banco", "segundos":30, "decir":"Codos hacia atrás."},
+    {"title":"Pike push up", "segundos":30, "decir":"Cadera arriba."}
+]
+POOL_LOWER = [
+    {"title":"Sentadillas", "segundos":30, "decir":"Talones al suelo."},
+    {"title":"Zancadas", "segundos":30, "decir":"Alterna piernas."},
+    {"title":"Puente de glúteo", "segundos":30, "decir":"Aprieta al subir."},
+    {"title":"Elevación de talones", "segundos":30, "decir":"Sube y baja controlado."}
+]
+
+FRASE_DESCANSO = "Hidrátate y respira."
+# Descanso cuando no hay ninguno de dónde copiar
+DESCANSO_DEFAULT = {"title":"Descanso", "segundos":20, "decir":""}
+
+
+class Paso(NamedTuple):
+    title: str
+    segundos: int
+    decir: str = ""
+    tipo_paso: int = TipoPaso.EJERCICIO
+
+    def get(self, clave, default=None):
+        # Para el código que todavía lee los pasos como dict (p.get("title"))
+        return getattr(self, clave) if clave in self._fields else default
+
+    def a_dict(self):
+        return {"title": self.title, "segundos": self.segundos, "decir": self.decir}
+
+
+@lru_cache(maxsize=4096)
+def crear_paso(title, segundos, decir="", tipo_paso=TipoPaso.EJERCICIO):
+    # Un solo objeto por combinación de valores; los textos quedan internados
+    return Paso(sys.intern(title), segundos, sys.intern(decir), int(tipo_paso))
+
+
+def paso_de_dict(p, tipo_paso=None):
+    # Paso a partir de un dict (catálogo, pool, JSON guardado)
+    if isinstance(p, Paso):
+        return p
+    if tipo_paso is None:
+        tipo_paso = p.get("tipo_paso")
+    if tipo_paso is None:
+        tipo_paso = TipoPaso.DESCANSO if es_titulo_descanso(p.get("title", "")) else TipoPaso.EJERCICIO
+    return crear_paso(str(p.get("title", p.get("nombre", "Paso"))),
+                      _safe_int(p.get("segundos", p.get("duracion", 0)) or 0, 0),
+                      str(p.get("decir", p.get("descripcion", "")) or ""), tipo_paso)
+
+
+def rutina_a_dict(rutina):
+    # Para guardar en JSON: los pasos como {"title", "segundos", "decir"}
+    out = dict(rutina)
+    out["pasos"] = [p.a_dict() if isinstance(p, Paso) else p for p in rutina.get("pasos", [])]
+    return out
+
+
+def rutina_de_dict(rutina):
+    # Al leer de JSON: los pasos vuelven a ser Paso compartidos
+    out = dict(rutina)
+    out["pasos"] = [paso_de_dict(p) for p in rutina.get("pasos", []) if isinstance(p, dict)]
+    return out
+
+
+def regla_nivel(nivel):
+    return REGLAS_NIVEL.get(ALIAS_NIVEL.get(nivel, nivel), REGLA_DEFAULT)
+
+
+def segundos_descanso(nivel, sobrepeso):
+    # Descanso entre pasos al armar la rutina (fachada y crear_rutina_desde_data)
+    base = regla_nivel((nivel or "").upper())["descanso"]
+    return base + SOBREPESO_EXTRA if sobrepeso else base
+
+
+def _safe_int(x, default=0):
+    try:
+        return int(float(x))
+    except Exception:
+        return default
+
+
+def es_descanso(p):
+    # Revisa si el paso es un descanso; los pasos del catálogo ya traen su tipo
+    tp = p.get("tipo_paso")
+    if tp is not None:
+        return tp == TipoPaso.DESCANSO
+    return es_titulo_descanso(p.get("title", ""))
+
+
+def es_calentamiento(p):
+    # Revisa si el paso es calentamiento
+    return "calent" in str(p.get("title","")).lower()
+
+
+def es_ejercicio(p):
+    # Lo que el compilador cuenta como ejercicio (y recorta al número del
+    # nivel): todo lo que no es descanso ni dice "calent". El warmup del
+    # catálogo que no dice "calent" (p. ej. "Movilidad articular") cuenta.
+    return not es_descanso(p) and not es_calentamiento(p)
+
+
+def ajustar_descanso(p, categoria):
+    # El descanso con los segundos ajustados por la categoría de IMC
+    s = _safe_int(p.get("segundos", 0), 0)
+    regla = REGLAS_IMC.get((categoria or "").upper())
+    if regla is not None:
+        s = max(regla["minimo"], s + regla["suma"])
+    return crear_paso(str(p.get("title", "Descanso")), int(s), str(p.get("decir", "") or ""),
+                      TipoPaso.DESCANSO)
+
+
+def ajustar_ejercicio(p, regla):
+    # El ejercicio con los segundos del nivel
+    base = _safe_int(p.get("segundos", p.get("duracion", 30)), 30)
+    if regla["factor"] is not None:
+        base = max(regla["minimo"], int(round(base * regla["factor"])))
+    tipo = p.get("tipo_paso")
+    return crear_paso(str(p.get("title", p.get("nombre", "Paso"))), base,
+                      str(p.get("decir", p.get("descripcion", "")) or ""),
+                      TipoPaso.EJERCICIO if tipo is None else tipo)
+
+
+def _pasos_fallback(tipo, nivel):
+    # Rutina de respaldo por si la generación falla: calentamiento y el pool
+    regla = regla_nivel(nivel)
+    pool = POOL_UPPER if tipo == "UPPER" else POOL_LOWER
+    base = [crear_paso("Calentamiento", 60, "Movilidad articular suave.", TipoPaso.CALENTAMIENTO)]
+    return base + [ajustar_ejercicio(pool[i % len(pool)], regla) for i in range(regla["ejercicios"])]
+
+
+def compilar_pasos(pasos, descanso, nivel, tipo, categoria):
+    """Pasos finales a partir de los pasos sin descansos intercalados.
+
+    descanso es el que se hubiera intercalado entre ellos; como antes, el
+    descanso de la rutina se copia del primero que aparezca.
+    """
+    regla = regla_nivel(nivel)
+    objetivo = regla["ejercicios"]
+    plantilla = None
+    calent = None
+    exs = []
+    for i, p in enumerate(pasos):
+        if es_calentamiento(p):
+            # Solo se queda el primer calentamiento (y va al principio)
+            if calent is None:
+                calent = ajustar_descanso(p, categoria) if es_descanso(p) else paso_de_dict(p)
+            if i == 0 and es_descanso(p):
+                plantilla = p
+        elif es_descanso(p):
+            if i == 0:
+                plantilla = p
+        elif len(exs) < objetivo:
+            exs.append(ajustar_ejercicio(p, regla))
+    if not pasos:
+        return []
+    if plantilla is None:
+        plantilla = descanso if (len(pasos) > 1 and descanso is not None) else DESCANSO_DEFAULT
+
+    # Si faltan ejercicios rellenamos con el pool del tipo
+    if len(exs) < objetivo:
+        pool = POOL_UPPER if tipo == "UPPER" else POOL_LOWER
+        i = 0
+        while len(exs) < objetivo and i < len(pool)*2:
+            exs.append(ajustar_ejercicio(pool[i % len(pool)], regla))
+            i += 1
+
+    # Todos los descansos son el mismo Paso
+    rest = ajustar_descanso(plantilla, categoria)
+    out = [calent] if calent is not None else []
+    for idx, e in enumerate(exs, 1):
+        out.append(e)
+        if idx < len(exs):
+            out.append(rest)
+    return out
+
+
+def compilar_rutina(data, nivel, tipo, peso, estatura_cm, categoria, strategy):
+    """Rutina final {"titulo", "pasos"} para (catálogo, tipo, nivel, IMC, strategy).
+
+    Si elegir el set falla se usa la rutina de respaldo, como antes.
+    """
+    tipo_base = tipo or "UPPER"
+    try:
+        sobre = es_sobrepeso(calc_imc_cm(peso, estatura_cm))
+        set_main = strategy.elegir(data, nivel=nivel, tipo=tipo, sobrepeso=sobre)
+        fuente = list(data.get("warmup", [])) + list(set_main) + list(data.get("cooldown", []))
+        descanso = {"title": "Descanso", "segundos": int(segundos_descanso(nivel, sobre)),
+                    "decir": FRASE_DESCANSO}
+        titulo = f"Rutina {tipo} {nivel}"
+    except Exception:
+        fuente = _pasos_fallback(tipo_base, nivel)
+        descanso = DESCANSO_DEFAULT
+        titulo = f"Rutina {tipo_base.title()} - {nivel.title()}"
+    return {"titulo": titulo, "pasos": compilar_pasos(fuente, descanso, nivel, tipo_base, categoria)}
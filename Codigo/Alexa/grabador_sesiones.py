@@ -0,0 +1,241 @@
+# Grabación anónima de sesiones reales para reproducirlas después
+#
+# Con TRAZAS_ARCHIVO o TRAZAS_LOG, cada request que llega a lambda_handler se
+# guarda como una línea JSON (JSONL) con el sobre anonimizado, el intent y
+# cuánto tardó. Benchmarks/replay_sesiones.py las vuelve a mandar, sesión por
+# sesión, para reproducir el tráfico real (p. ej. cadenas largas de "no,
+# otra") con un almacén local.
+#
+# Lo que se quita o se cambia del sobre:
+#   userId, sessionId, deviceId, personId, requestId  sha256 con TRAZAS_SAL;
+#                          el mismo id da siempre el mismo hash, así las
+#                          sesiones y las bibliotecas de cada usuario se
+#                          siguen agrupando
+#   apiAccessToken, accessToken, permisos             se quitan
+#   peso_kg / estatura_cm  redondeados a 5 kg / 5 cm (también en los
+#                          params de la sesión); la estatura siempre en cm
+#   edad                   la década
+#   nombre (rutina)        un hash corto, igual en todas las sesiones del
+#                          usuario, así "ver rutina" sigue encontrando la guardada;
+#                          también el de borrar_pendiente en la sesión
+#   atributos de sesión    solo se quedan los de ATRIBUTOS_SESION; los de
+#                          texto libre (last_routine, last_estructura de
+#                          sesiones viejas) pueden traer el nombre y se quitan
+#
+# Se graban sesiones completas: si una sesión entra en la muestra
+# (TRAZAS_MUESTREO) se decide con el hash de su sessionId, así todos sus
+# turnos quedan dentro aunque lleguen a contenedores distintos.
+#
+# Variables de entorno:
+#   TRAZAS_ARCHIVO   archivo JSONL donde se agregan las líneas
+#   TRAZAS_LOG       "1": cada línea va al log con el prefijo "TRAZA " (CloudWatch)
+#   TRAZAS_MUESTREO  fracción de sesiones que se graban (default 1.0)
+#   TRAZAS_SAL       sal para los hashes (default vacía)
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+PREFIJO_LOG = "TRAZA "
+VERSION_TRAZA = 1
+
+# Atributos de sesión que se graban: los que necesita la reproducción y que
+# no llevan texto del usuario (salvo borrar_pendiente.nombre, que se cambia)
+ATRIBUTOS_SESION = ("awaiting", "params", "rutina", "variantes", "reproduccion",
+                    "pagina_rutinas", "borrar_pendiente")
+
+
+def _hash(valor, sal):
+    return hashlib.sha256((sal + str(valor)).encode("utf-8")).hexdigest()
+
+
+def _anon_id(valor, sal, prefijo):
+    # Conserva la forma de los ids de Alexa para que el SDK los acepte igual
+    if not valor:
+        return valor
+    return f"{prefijo}anon-{_hash(valor, sal)[:24]}"
+
+
+def redondear(valor, paso):
+    return int(round(valor / paso) * paso)
+
+
+def cubeta_peso(v):
+    try:
+        return str(redondear(float(v), 5))
+    except (TypeError, ValueError):
+        return None
+
+
+def cubeta_estatura(v):
+    # Metros o centímetros, como parse_estatura_cm; sale en cm
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return str(redondear(f * 100 if f < 3.0 else f, 5))
+
+
+def cubeta_edad(v):
+    try:
+        return str(int(float(v)) // 10 * 10)
+    except (TypeError, ValueError):
+        return None
+
+
+class GrabadorSesiones:
+    def __init__(self, archivo=None, log=False, muestreo=1.0, sal=""):
+        self.archivo = archivo
+        self.log = log
+        self.muestreo = float(muestreo)
+        self.sal = sal
+        self._lock = threading.Lock()
+        self.stats = {"grabadas": 0, "omitidas": 0, "fallidas": 0}
+
+    @property
+    def activo(self):
+        return bool(self.archivo or self.log) and self.muestreo > 0
+
+    def en_muestra(self, session_id):
+        if self.muestreo >= 1:
+            return True
+        return int(_hash(session_id, self.sal)[:8], 16) / 0xFFFFFFFF < self.muestreo
+
+    def _nombre(self, user_id, nombre):
+        # Mismo nombre del mismo usuario -> mismo hash
+        return f"rutina {_hash(f'{user_id}|{str(nombre).strip().lower()}', self.sal)[:8]}"
+
+    def anonimizar(self, evento):
+        ev = copy.deepcopy(evento)
+        sal = self.sal
+        sesion = ev.get("session") or {}
+        sistema = (ev.get("context") or {}).get("System") or {}
+        user_id = (sesion.get("user") or sistema.get("user") or {}).get("userId")
+
+        for usuario in (sesion.get("user"), sistema.get("user")):
+            if usuario:
+                usuario["userId"] = _anon_id(usuario.get("userId"), sal, "amzn1.ask.account.")
+                usuario.pop("accessToken", None)
+                usuario.pop("permissions", None)
+        if sesion.get("sessionId"):
+            sesion["sessionId"] = _anon_id(sesion["sessionId"], sal, "amzn1.echo-api.session.")
+        if (sistema.get("device") or {}).get("deviceId"):
+            sistema["device"]["deviceId"] = _anon_id(sistema["device"]["deviceId"], sal, "amzn1.ask.device.")
+        if (sistema.get("person") or {}).get("personId"):
+            sistema["person"]["personId"] = _anon_id(sistema["person"]["personId"], sal, "amzn1.ask.person.")
+        sistema.pop("apiAccessToken", None)
+
+        atributos = sesion.get("attributes")
+        if isinstance(atributos, dict):
+            for clave in [k for k in atributos if k not in ATRIBUTOS_SESION]:
+                del atributos[clave]
+        else:
+            atributos = {}
+        params = atributos.get("params")
+        if isinstance(params, dict):
+            if params.get("peso") is not None:
+                params["peso"] = float(cubeta_peso(params["peso"]) or 0) or None
+            if params.get("estatura") is not None:
+                params["estatura"] = int(cubeta_estatura(params["estatura"]) or 0) or None
+        pendiente = atributos.get("borrar_pendiente")
+        if isinstance(pendiente, dict) and pendiente.get("nombre"):
+            # Mismo hash que el slot, así la traza sigue siendo coherente
+            pendiente["nombre"] = self._nombre(user_id, pendiente["nombre"])
+
+        req = ev.get("request") or {}
+        if req.get("requestId"):
+            req["requestId"] = _anon_id(req["requestId"], sal, "amzn1.echo-api.request.")
+        for slot in ((req.get("intent") or {}).get("slots") or {}).values():
+            if not isinstance(slot, dict) or slot.get("value") is None:
+                continue
+            nombre = slot.get("name")
+            if nombre == "peso_kg":
+                slot["value"] = cubeta_peso(slot["value"])
+            elif nombre == "estatura_cm":
+                slot["value"] = cubeta_estatura(slot["value"])
+            elif nombre == "edad":
+                slot["value"] = cubeta_edad(slot["value"])
+            elif nombre == "nombre":
+                slot["value"] = self._nombre(user_id, slot["value"])
+            # Lo que Alexa resolvió (entity resolution) puede traer el texto original
+            slot.pop("resolutions", None)
+            slot.pop("slotValue", None)
+            if slot["value"] is None:
+                slot.pop("value")
+        return ev
+
+    def grabar(self, evento, ms):
+        try:
+            sesion = (evento.get("session") or {}).get("sessionId") or ""
+            if not self.en_muestra(sesion):
+                self.stats["omitidas"] += 1
+                return
+            req = evento.get("request") or {}
+            anonimo = self.anonimizar(evento)
+            linea = json.dumps({
+                "v": VERSION_TRAZA,
+                "sesion": anonimo.get("session", {}).get("sessionId"),
+                "ts": req.get("timestamp"),
+                "recibido": round(time.time(), 3),
+                "tipo": req.get("type"),
+                "intent": (req.get("intent") or {}).get("name"),
+                "ms": round(ms, 3),
+                "sobre": anonimo,
+            }, ensure_ascii=False, separators=(",", ":"))
+            with self._lock:
+                if self.archivo:
+                    with open(self.archivo, "a", encoding="utf-8") as f:
+                        f.write(linea + "\n")
+                if self.log:
+                    print(PREFIJO_LOG + linea, flush=True)
+            self.stats["grabadas"] += 1
+        except Exception as e:
+            # Grabar nunca debe tumbar la respuesta
+            self.stats["fallidas"] += 1
+            logging.warning("No se pudo grabar la traza: %r", e)
+
+    def envolver(self, handler):
+        """lambda_handler que además graba cada request (o el mismo, si no hay destino)."""
+        if not self.activo:
+            return handler
+
+        def lambda_handler(event, context):
+            t0 = time.perf_counter()
+            try:
+                return handler(event, context)
+            finally:
+                self.grabar(event, (time.perf_counter() - t0) * 1000)
+
+        return lambda_handler
+
+
+def leer_trazas(lineas):
+    # Líneas de un JSONL o de un log (con el prefijo "TRAZA ") -> dicts
+    for linea in lineas:
+        i = linea.find(PREFIJO_LOG)
+        if i >= 0:
+            linea = linea[i + len(PREFIJO_LOG):]
+        linea = linea.strip()
+        if not linea.startswith("{"):
+            continue
+        try:
+            traza = json.loads(linea)
+        except ValueError:
+            continue
+        if isinstance(traza, dict) and "sobre" in traza:
+            yield traza
+
+
+def grabador_de_entorno():
+    return GrabadorSesiones(archivo=os.environ.get("TRAZAS_ARCHIVO") or None,
+                            log=os.environ.get("TRAZAS_LOG", "") == "1",
+                            muestreo=os.environ.get("TRAZAS_MUESTREO", "1.0"),
+                            sal=os.environ.get("TRAZAS_SAL", ""))
+
+
+# Uno por contenedor, con la configuración del entorno
+GRABADOR = grabador_de_entorno()
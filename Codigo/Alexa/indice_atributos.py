@@ -0,0 +1,98 @@
+# Índice secundario de las rutinas guardadas para "buscar rutinas"
+#
+# Con los datos que ya trae cada entrada del manifiesto (tipo, nivel,
+# segundos, ejercicios y creado) contestamos cosas como "mis rutinas de
+# piernas de menos de diez minutos" sin bajar ninguna rutina:
+#   - por tipo y por nivel: dict valor -> conjunto de posiciones
+#   - por duración: lista ordenada por segundos, para rangos con bisect
+#   - por fecha: posiciones de la más nueva a la más vieja
+# Igual que el índice de nombres, se arma una vez por versión del manifiesto.
+#
+# Variables de entorno:
+#   INDICE_ATRIBUTOS_MAX   índices en memoria (default 32)
+
+import os
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+from cache_rutinas import CacheLRU
+
+ORDENES = ("RECIENTES", "CORTAS", "LARGAS")
+
+
+class IndiceAtributos:
+    def __init__(self, entradas, version=None):
+        self.version = version
+        self.entradas = [e for e in entradas if isinstance(e, dict)]
+        self.por_tipo = {}
+        self.por_nivel = {}
+        con_duracion = []
+        for i, e in enumerate(self.entradas):
+            if e.get("tipo"):
+                self.por_tipo.setdefault(e["tipo"], set()).add(i)
+            if e.get("nivel"):
+                self.por_nivel.setdefault(e["nivel"], set()).add(i)
+            if isinstance(e.get("segundos"), int):
+                con_duracion.append((e["segundos"], i))
+        con_duracion.sort()
+        self.segundos = [s for s, _ in con_duracion]
+        self.por_duracion = [i for _, i in con_duracion]
+        # Las guardadas solo como texto no tienen duración: van al final
+        con = set(self.por_duracion)
+        self.sin_duracion = [i for i in range(len(self.entradas)) if i not in con]
+        # Más nuevas primero; con la misma fecha, la que se guardó después
+        self.por_fecha = sorted(range(len(self.entradas)),
+                                key=lambda i: (self.entradas[i].get("creado") or 0, i), reverse=True)
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def consultar(self, tipo=None, nivel=None, min_seg=None, max_seg=None,
+                  orden="RECIENTES", limite=None):
+        # Regresa (total, entradas) que cumplen todos los filtros, en el orden
+        # pedido; entradas trae a lo más limite elementos
+        filtros = []
+        if tipo:
+            filtros.append(self.por_tipo.get(tipo, set()))
+        if nivel:
+            filtros.append(self.por_nivel.get(nivel, set()))
+        if min_seg is not None or max_seg is not None:
+            desde = bisect_left(self.segundos, min_seg) if min_seg is not None else 0
+            hasta = bisect_right(self.segundos, max_seg) if max_seg is not None else len(self.segundos)
+            filtros.append(set(self.por_duracion[desde:hasta]))
+        if filtros:
+            # Intersección empezando por el conjunto más chico
+            filtros.sort(key=len)
+            elegidas = set(filtros[0]).intersection(*filtros[1:])
+        else:
+            elegidas = None
+
+        if orden == "CORTAS":
+            recorrido = chain(self.por_duracion, self.sin_duracion)
+        elif orden == "LARGAS":
+            recorrido = chain(reversed(self.por_duracion), self.sin_duracion)
+        else:
+            recorrido = self.por_fecha
+        total = len(elegidas) if elegidas is not None else len(self.entradas)
+        out = []
+        for i in recorrido:
+            if elegidas is None or i in elegidas:
+                out.append(self.entradas[i])
+                if limite is not None and len(out) >= limite:
+                    break
+        return total, out
+
+
+_CACHE_INDICES = CacheLRU(int(os.environ.get("INDICE_ATRIBUTOS_MAX", "32")))
+
+
+def atributos_para(user_id, version, entradas):
+    # Índice cacheado por (usuario, versión del manifiesto); entradas puede
+    # ser una función para no leer el manifiesto si el índice ya está armado
+    clave = (user_id, version)
+    indice = _CACHE_INDICES.obtener(clave) if version else None
+    if indice is None:
+        indice = IndiceAtributos(entradas() if callable(entradas) else entradas, version)
+        if version:
+            _CACHE_INDICES.guardar(clave, indice)
+    return indice
@@ -0,0 +1,147 @@
+# Índice de nombres de rutinas guardadas para "ver rutina X" y "borrar rutina X"
+#
+# Antes recorríamos toda la lista buscando una subcadena (con mayúsculas y
+# acentos tal cual) y nos quedábamos con la primera. Ahora, por usuario:
+#   - cada nombre se normaliza (sin acentos, minúsculas, espacios y signos
+#     colapsados), así "Piernas  Lúnes" y "piernas lunes" son la misma clave
+#   - un dict clave -> entrada resuelve las coincidencias exactas
+#   - un índice de trigramas da los candidatos parecidos, y los ordenamos por
+#     distancia de edición (y por si uno contiene al otro como palabras)
+# El índice se arma una vez por versión del manifiesto (su ETag) y se guarda
+# en una cache LRU del contenedor.
+#
+# Variables de entorno:
+#   INDICE_NOMBRES_MAX   índices en memoria (default 32)
+
+import os
+import unicodedata
+from collections import Counter
+
+from cache_rutinas import CacheLRU
+
+UMBRAL = 0.5        # puntaje mínimo (0 a 1) para aceptar una coincidencia
+CANDIDATOS = 20     # candidatos del índice de trigramas que se puntúan
+A_FONDO = 5         # de esos, cuántos se comparan con distancia de edición
+
+
+def normalizar_nombre(nombre):
+    # "  Piernas   LÚNES! " -> "piernas lunes"
+    texto = unicodedata.normalize("NFKD", str(nombre or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return " ".join("".join(c if c.isalnum() else " " for c in texto).split())
+
+
+def trigramas(clave):
+    relleno = f"  {clave} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def distancia_edicion(a, b, tope):
+    # Levenshtein limitado a la banda |i - j| <= tope; si la distancia pasa de
+    # tope regresa tope + 1 sin terminar
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > tope:
+        return tope + 1
+    fuera = tope + 1
+    anterior = [j if j <= tope else fuera for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        desde, hasta = max(1, i - tope), min(len(b), i + tope)
+        actual = [fuera] * (len(b) + 1)
+        actual[0] = i if i <= tope else fuera
+        for j in range(desde, hasta + 1):
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != b[j - 1]))
+        if min(actual[desde - 1:hasta + 1]) > tope:
+            return fuera
+        anterior = actual
+    return min(anterior[-1], fuera)
+
+
+class IndiceNombres:
+    def __init__(self, entradas, version=None):
+        self.version = version
+        self.entradas = [e for e in entradas if isinstance(e, dict)]
+        self.claves = [normalizar_nombre(e.get("nombre")) for e in self.entradas]
+        self.n_trigramas = []
+        self.exactos = {}
+        self.posteos = {}
+        for i, clave in enumerate(self.claves):
+            # Con nombres repetidos gana el más viejo, como antes
+            self.exactos.setdefault(clave, i)
+            tris = trigramas(clave)
+            self.n_trigramas.append(len(tris))
+            for t in tris:
+                self.posteos.setdefault(t, []).append(i)
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def _puntaje_rapido(self, consulta, i, comunes, n_trigramas):
+        # Trigramas en común (Dice) y si uno contiene al otro como palabras
+        # completas ("piernas" contra "piernas lunes")
+        clave = self.claves[i]
+        puntaje = 2 * comunes / (n_trigramas + self.n_trigramas[i])
+        if f" {consulta} " in f" {clave} " or f" {clave} " in f" {consulta} ":
+            corto, largo = sorted((len(consulta), len(clave)))
+            puntaje = max(puntaje, 0.6 + 0.4 * corto / largo)
+        return puntaje
+
+    def _puntaje_edicion(self, consulta, i, piso):
+        # Solo nos interesa si supera piso, así la banda de Levenshtein es angosta
+        clave = self.claves[i]
+        largo = max(len(consulta), len(clave)) or 1
+        tope = int(largo * (1 - piso))
+        d = distancia_edicion(consulta, clave, tope)
+        return 1 - d / largo if d <= tope else 0.0
+
+    def buscar(self, nombre, limite=3):
+        # Regresa [(puntaje, entrada)] ordenados de mejor a peor
+        consulta = normalizar_nombre(nombre)
+        if not consulta or not self.entradas:
+            return []
+        if consulta in self.exactos:
+            return [(1.0, self.entradas[self.exactos[consulta]])]
+        tris = trigramas(consulta)
+        conteo = Counter()
+        for t in tris:
+            conteo.update(self.posteos.get(t, ()))
+        # Los que más se parecen por trigramas pasan a distancia de edición
+        # (cubre erratas de una o dos letras en nombres cortos)
+        puntajes = sorted(((self._puntaje_rapido(consulta, i, comunes, len(tris)), -i)
+                           for i, comunes in conteo.most_common(CANDIDATOS)), reverse=True)
+        resultados = []
+        piso = max([UMBRAL] + [p for p, _ in puntajes[:1]])
+        for n, (p, i) in enumerate(puntajes):
+            if n < A_FONDO:
+                p = max(p, self._puntaje_edicion(consulta, -i, piso))
+                piso = max(piso, p)
+            if p >= UMBRAL:
+                resultados.append((p, i))
+        resultados.sort(reverse=True)
+        return [(p, self.entradas[-i]) for p, i in resultados[:limite]]
+
+    def mejor(self, nombre):
+        # La entrada que mejor coincide, o None
+        res = self.buscar(nombre, limite=1)
+        return res[0][1] if res else None
+
+    def exacta(self, nombre):
+        # La entrada con exactamente ese nombre (ya normalizado), o None.
+        # Para borrar: una coincidencia aproximada se confirma antes
+        i = self.exactos.get(normalizar_nombre(nombre))
+        return self.entradas[i] if i is not None else None
+
+
+_CACHE_INDICES = CacheLRU(int(os.environ.get("INDICE_NOMBRES_MAX", "32")))
+
+
+def indice_para(user_id, version, entradas):
+    # Índice cacheado por (usuario, versión del manifiesto). entradas puede
+    # ser una función para no leer el manifiesto si el índice ya está armado.
+    clave = (user_id, version)
+    indice = _CACHE_INDICES.obtener(clave) if version else None
+    if indice is None:
+        indice = IndiceNombres(entradas() if callable(entradas) else entradas, version)
+        if version:
+            _CACHE_INDICES.guardar(clave, indice)
+    return indice
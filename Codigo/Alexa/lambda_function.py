@@ -1,79 +1,16 @@
 # Archivo Lambda de la skill Entrenador Fit (lógica principal y handlers de Alexa)
 
-import os
 import sys
-import json
+import gc
 from pathlib import Path
 import random
 import logging
 
-try:
-    import boto3
-    from botocore.exceptions import ClientError
-except Exception:
-    boto3 = None
-    class ClientError(Exception):
-        pass
-
+# boto3/botocore y las partes poco usadas de ask_sdk_model (dialog, Intent, Slot)
+# se importan dentro de las funciones que las necesitan para no pagar su
+# import en cada arranque en frío de la Lambda.
 from ask_sdk_core.skill_builder import SkillBuilder
 from ask_sdk_core.dispatch_components import AbstractRequestHandler, AbstractExceptionHandler
-from ask_sdk_core.handler_input import HandlerInput
-from ask_sdk_model import Response
-from ask_sdk_model.ui import SimpleCard
-from ask_sdk_model.dialog import ElicitSlotDirective
-from ask_sdk_model import Intent as AIntent, Slot as ASlot
-
-
-# --- Configuración S3 para guardar/ver rutinas ---
-S3_REGION = os.environ.get("S3_PERSISTENCE_REGION")
-S3_BUCKET = os.environ.get("S3_PERSISTENCE_BUCKET")
-
-
-def _get_s3_client():
-    # Regresa el cliente de S3 si está configurado, si no, None
-    if not boto3 or not S3_BUCKET:
-        return None
-    try:
-        if S3_REGION:
-            return boto3.client("s3", region_name=S3_REGION)
-        return boto3.client("s3")
-    except Exception as e:
-        logging.error("Error creando cliente S3: %r", e)
-        return None
-
-
-def cargar_rutinas_guardadas(user_id):
-   # Lee rutinas guardadas en S3 para ese usuario; si falla, regresa lista vacía
-    cli = _get_s3_client()
-    if not cli:
-        return []
-    key = f"{user_id}/rutinas_guardadas.json" if user_id else "rutinas_guardadas.json"
-    try:
-        resp = cli.get_object(Bucket=S3_BUCKET, Key=key)
-        body = resp["Body"].read().decode("utf-8")
-        if not body.strip():
-            return []
-        data = json.loads(body)
-        if isinstance(data, list):
-            return data
-        return []
-    except Exception:
-        # Cualquier error leyendo, regresamos []
-        return []
-
-
-def guardar_rutinas_guardadas(user_id, data):
-    """Guarda la lista de rutinas en S3."""
-    cli = _get_s3_client()
-    if not cli:
-        return
-    key = f"{user_id}/rutinas_guardadas.json" if user_id else "rutinas_guardadas.json"
-    try:
-        body = json.dumps(data, ensure_ascii=False, indent=2)
-        cli.put_object(Bucket=S3_BUCKET, Key=key, Body=body.encode("utf-8"))
-    except Exception:
-        # Si no se puede guardar, no rompemos la skill
-        pass
 
 
 HERE = Path(__file__).parent
@@ -83,19 +20,27 @@ if str(HERE) not in sys.path:
 
 # --- Módulos propios del proyecto ---
 from rutina_servicio import RoutineFacade
-from modos_rutina import crear_strategy
+from modos_rutina import crear_strategy, contar_variantes_set, nueva_semilla
 from selector_sets import elegir_set
+from almacen_rutinas import (listar_rutinas, leer_rutina, agregar_rutina, borrar_rutina,
+                             indice_rutinas, atributos_rutinas, precargar_biblioteca,
+                             almacen_remoto, AlmacenNoConfigurado)
+from catalogo import obtener_catalogo
+from compilador_rutinas import es_ejercicio, regla_nivel
+from cache_rutinas import CACHE_RUTINAS
+from rutinas_precalculadas import buscar_precalculada
+from codec_rutinas import estructura_rutina
+from render_ssml import RENDER_SSML, MAX_PASOS
+from reproduccion_rutina import plan_reproduccion, texto_paso, texto_falta
+from respuesta_progresiva import PROGRESIVA
+from grabador_sesiones import GRABADOR
 import imc  # opcional
-import rutina_creador as builder  # noqa: F401
-import app  # noqa: F401
 
 # --- Helpers para cargar data y parsear valores ---
 def cargar_data():
-    # Carga el archivo routines.json con las plantillas de rutinas
-    ruta = HERE / "routines.json"
-    if not ruta.exists():
-        return {"rutinas": []}
-    return json.loads(ruta.read_text(encoding="utf-8"))
+    # Catálogo de routines.json compartido por el contenedor (solo lectura);
+    # solo se vuelve a leer del disco si el archivo cambió
+    return obtener_catalogo()
 
 def _safe_int(x, default=0):
     # Convierte a int, si falla regresa default
@@ -139,6 +84,15 @@ def norm_nivel(s):
         return "DIFICIL"
     return ""
 
+def norm_orden(s):
+    # Normaliza el orden de "buscar rutinas" a RECIENTES / CORTAS / LARGAS
+    s = (s or "").strip().lower()
+    if any(w in s for w in ("corta", "rápida", "rapida")):
+        return "CORTAS"
+    if any(w in s for w in ("larga", "lenta")):
+        return "LARGAS"
+    return "RECIENTES"
+
 def parse_estatura_cm(v):
     # Convierte estatura a centímetros (acepta metros o cm)
     if v is None:
@@ -182,162 +136,157 @@ def clasificar_imc(peso_kg, estatura_cm):
     v = _calc_imc_fallback(peso_kg, estatura_cm)
     return _clasificar_por_imc_valor(v)
 
-# ---------- Ajustes de rutina después de generarla ----------
-def ajustar_descansos_por_imc(rutina, categoria):
-    # Ajusta los descansos según la categoría de IMC
-    if not isinstance(rutina, dict): return rutina
-    pasos = rutina.get("pasos")
-    if not isinstance(pasos, list): return rutina
-    cat = (categoria or "").upper()
-
-    for p in pasos:
-        t = str(p.get("title", "")).lower()
-        if "descanso" in t or "rest" in t or "pausa" in t:
-            s = _safe_int(p.get("segundos", 0), 0)
-            # Solo tocamos descansos; el nivel ya se aplicó antes
-            if cat in ("SOBREPESO", "OBESIDAD"):
-                s = max(30, s + 15)
-            elif cat == "NORMAL":
-                s = max(10, s - 5)
-            p["segundos"] = int(s)
-    return rutina
-
-# Pool de ejercicios base por tipo (para rellenar si falta)
-POOL_UPPER = [
-    {"title":"Flexiones", "segundos":30, "decir":"Espalda recta."},
-    {"title":"Remo invertido", "segundos":30, "decir":"Escápulas atrás."},
-    {"title":"Fondos en banco", "segundos":30, "decir":"Codos hacia atrás."},
-    {"title":"Pike push up", "segundos":30, "decir":"Cadera arriba."}
-]
-POOL_LOWER = [
-    {"title":"Sentadillas", "segundos":30, "decir":"Talones al suelo."},
-    {"title":"Zancadas", "segundos":30, "decir":"Alterna piernas."},
-    {"title":"Puente de glúteo", "segundos":30, "decir":"Aprieta al subir."},
-    {"title":"Elevación de talones", "segundos":30, "decir":"Sube y baja controlado."}
-]
-
-def es_descanso(p): 
-    # Revisa si el paso es un descanso
-    t = str(p.get("title","")).lower()
-    return ("descanso" in t) or ("pausa" in t) or ("rest" in t)
-
-def es_calentamiento(p):
-    # Revisa si el paso es calentamiento
-    return "calent" in str(p.get("title","")).lower()
-
-def normalizar_segundos_ejercicio(p, nivel):
-    """Ajusta los segundos de ejercicios (no descanso) por nivel."""
-    base = _safe_int(p.get("segundos", p.get("duracion", 30)), 30)
-    if es_descanso(p): return p
-    if nivel == "FACIL":  base = max(20, int(round(base * 0.8)))
-    if nivel == "MEDIO":  base = max(25, int(round(base * 1.0)))
-    if nivel == "DIFICIL":base = max(35, int(round(base * 1.2)))
-    p["segundos"] = base
-    return p
-
-def ajustar_por_nivel_y_tipo(rutina, nivel, tipo):
-    """Ajusta cuántos ejercicios hay y cuánto duran según nivel y tipo."""
-    if not isinstance(rutina, dict):
-        return rutina
-    pasos = list(rutina.get("pasos", []))
-    if not pasos:
-        return rutina
-
-    # Separamos calentamiento, descansos y ejercicios
-    calent = [p for p in pasos if es_calentamiento(p)]
-    rests  = [p for p in pasos if es_descanso(p)]
-    exs    = [p for p in pasos if (not es_descanso(p) and not es_calentamiento(p))]
-
-    # Número objetivo de ejercicios según nivel
-    objetivo = {"FACIL":4, "MEDIO":6, "DIFICIL":8}.get(nivel, 6)
-
-    # Recortamos o rellenamos ejercicios para llegar al objetivo
-    if len(exs) > objetivo:
-        exs = exs[:objetivo]
-    elif len(exs) < objetivo:
-        pool = POOL_UPPER if tipo == "UPPER" else POOL_LOWER
-        i = 0
-        while len(exs) < objetivo and i < len(pool)*2:
-            exs.append(dict(pool[i % len(pool)]))  # copia del pool
-            i += 1
-
-    # Ajustamos duración de cada ejercicio por nivel
-    exs = [normalizar_segundos_ejercicio(dict(p), nivel) for p in exs]
-
-    # Armamos la rutina: calentamiento (si hay) + [ejercicio, descanso]...
-    rest_template = next((r for r in rests), {"title":"Descanso", "segundos":20, "decir":""})
-    nueva = []
-    if calent:
-        for c in calent[:1]:
-            nueva.append(dict(c))
-    for idx, e in enumerate(exs, 1):
-        nueva.append(e)
-        if idx < len(exs):
-            nueva.append(dict(rest_template))
-    rutina["pasos"] = nueva
-    if "titulo" not in rutina:
-        rutina["titulo"] = f"Rutina {tipo.title()} - {nivel.title()}"
-    return rutina
-
 # ---------- Conversión de rutina a texto ----------
 def resumen_y_texto(rutina):
-    """Convierte la rutina a texto que Alexa pueda leer paso a paso."""
-    pasos = []
-    resumen = "Rutina generada."
-    if isinstance(rutina, dict):
-        pasos = rutina.get("pasos", []) or rutina.get("rutina", [])
-        resumen = rutina.get("titulo") or rutina.get("resumen") or resumen
-    elif isinstance(rutina, list):
-        pasos = rutina
-
-    partes = [str(resumen).strip()]
-    # Limitamos a 12 pasos para evitar respuestas muy largas
-    for i, p in enumerate(pasos, 1):
-        if isinstance(p, dict):
-            t = str(p.get("title", p.get("nombre", "Paso"))).strip()
-            s = int(p.get("segundos", p.get("duracion", 0)) or 0)
-            d = str(p.get("decir", p.get("descripcion", "")) or "").strip()
-        else:
-            t = str(p).strip()
-            s = 0
-            d = ""
-        linea = f"Paso {i}: {t}" + (f", {s} segundos." if s else ".")
-        if d:
-            linea += f" {d}"
-        partes.append(linea)
-        if i >= 12:
-            break
-    return " ".join(partes)
-
-def intentar_generar(facade, peso, est, nivel, tipo):
-    """Llama al facade para generar una rutina con esos parámetros."""
-    intentos = [
-        dict(peso_kg=peso, estatura_cm=est, nivel=nivel, tipo=tipo),
-    ]
-    errores = []
-    for kwargs in intentos:
-        try:
-            rutina = facade.generar_rutina(kwargs.get("nivel"), kwargs.get("tipo"), kwargs.get("peso_kg"), kwargs.get("estatura_cm"))
-            return rutina, errores
-        except Exception as e:
-            errores.append(str(e))
-    return None, errores
-
-def rutina_fallback(tipo, nivel):
-    # Rutina de respaldo por si la generación falla
-    objetivo = {"FACIL":4, "MEDIO":6, "DIFICIL":8}.get(nivel, 6)
-    base = [{"title":"Calentamiento", "segundos":60, "decir":"Movilidad articular suave."}]
-    pool = POOL_UPPER if tipo == "UPPER" else POOL_LOWER
-    exs = [dict(pool[i % len(pool)]) for i in range(objetivo)]
-    rest = {"title":"Descanso", "segundos":20, "decir":""}
-    pasos = []
-    pasos += base
-    for i, e in enumerate(exs, 1):
-        e = normalizar_segundos_ejercicio(e, nivel)
-        pasos.append(e)
-        if i < len(exs):
-            pasos.append(dict(rest))
-    return {"titulo": f"Rutina {tipo.title()} - {nivel.title()}", "pasos": pasos}
+    """Convierte la rutina a texto que Alexa pueda leer paso a paso.
+
+    Los fragmentos de cada paso salen de la cache de render_ssml.
+    """
+    return RENDER_SSML.texto(rutina)
+
+def posiciones_variables(data, nivel):
+    """Cuántos pasos del set sobreviven al recorte por nivel del compilador.
+
+    El calentamiento que no dice "calent" cuenta como ejercicio y va antes del
+    set, así que solo el orden de los primeros pasos del set cambia la rutina.
+    """
+    antes = [p for p in data.get("warmup", []) if es_ejercicio(p)]
+    return max(0, regla_nivel(nivel)["ejercicios"] - len(antes))
+
+def elegir_variante(sess, data, peso, est, nivel, tipo, rng=random):
+    """Índice de una variante del set que no se haya dado en esta sesión.
+
+    Las ya vistas se guardan en sesión por tipo, nivel y sobrepeso; cuando
+    ya salieron todas se vuelve a empezar, sin repetir la que se acaba de
+    escuchar. rng es el generador del sorteo.
+    """
+    sobre = imc.es_sobrepeso(imc.calc_imc_cm(peso, est))
+    pasos = elegir_set(data, nivel=nivel, tipo=tipo, sobrepeso=sobre)
+    total = contar_variantes_set(pasos, posiciones_variables(data, nivel))
+    vistas_por_set = sess.setdefault('variantes', {})
+    clave = f"{tipo}|{nivel}|{int(bool(sobre))}"
+    anteriores = vistas_por_set.get(clave, [])
+    vistas = sorted(anteriores)
+    if len(vistas) >= total:
+        # La última de la lista es la que se dio al final
+        vistas = [anteriores[-1]] if total > 1 else []
+    # Sorteamos entre las que faltan y recorremos el índice saltando las vistas
+    indice = rng.randrange(total - len(vistas))
+    for v in vistas:
+        if v <= indice:
+            indice += 1
+    vistas_por_set[clave] = vistas + [indice]
+    return indice
+
+def describir_rutina(data, tipo, nivel, variante=None, semilla=None):
+    """Lo que se guarda en sesión de la rutina actual en lugar de su texto.
+
+    Con esto y los params de la sesión se vuelve a armar la misma rutina
+    (materializar_rutina); catalogo es el inicio del sha256 de routines.json.
+    La llave de un sorteo es el par (semilla, variante): la semilla sola no
+    dice qué variante salió, porque esa depende de las ya vistas en la
+    sesión. Por eso no se acepta una semilla sin su variante.
+    """
+    if semilla is not None and variante is None:
+        raise ValueError("la semilla se guarda siempre junto con su variante")
+    desc = {'tipo': tipo, 'nivel': nivel, 'catalogo': data.firma[:12]}
+    if variante is not None:
+        desc['variante'] = variante
+    if semilla is not None:
+        desc['semilla'] = semilla
+    return desc
+
+def materializar_rutina(sess):
+    """(rutina, estructura, texto) de la rutina descrita en sesión.
+
+    Sale de la tabla precalculada o de la cache del contenedor casi siempre;
+    si no, se vuelve a generar. Las sesiones que empezaron antes de guardar
+    la descripción todavía traen el texto y la estructura completos.
+    """
+    desc = sess.get('rutina')
+    params = sess.get('params') or {}
+    if not desc:
+        return None, sess.get('last_estructura'), sess.get('last_routine', '')
+    rutina, texto = rutina_en_sesion(sess)
+    p = {'modo': params.get('modo'), 'tipo': desc['tipo'], 'nivel': desc['nivel'],
+         'semilla': desc.get('semilla'), 'variante': desc.get('variante')}
+    return rutina, estructura_rutina(rutina, p), texto
+
+def rutina_en_sesion(sess):
+    """(rutina, texto) de la rutina descrita en sesión, o (None, None).
+
+    Se arma con la variante guardada; la semilla solo queda como registro
+    del sorteo que la eligió.
+    """
+    desc = sess.get('rutina')
+    if not desc:
+        return None, None
+    params = sess.get('params') or {}
+    data = cargar_data()
+    if desc.get('catalogo') != data.firma[:12]:
+        logging.warning("El catálogo cambió durante la sesión; la rutina se arma con el actual")
+    variante = desc.get('variante')
+    modo = 'manual' if variante is None else 'random'
+    return GenerarRutinaIntentHandler()._generar_rutina(
+        modo, params.get('peso'), params.get('estatura'), desc['nivel'], desc['tipo'], variante=variante)
+
+def invitar_reproduccion(rutina):
+    """Si no se leyeron todos los pasos, cómo escuchar la rutina completa."""
+    n = len(rutina.get("pasos") or [])
+    if n <= MAX_PASOS:
+        return ""
+    return f" La rutina tiene {n} pasos; para escucharla completa, paso a paso, di: empezar rutina."
+
+def generar_rutina_completa(modo, peso, est, nivel, tipo, data=None, cat=None, variante=None, seed=None):
+    """Corre todo el proceso (facade -> compilador, texto) sin caches.
+
+    Con la misma variante, o la misma seed en modo aleatorio sin variante,
+    sale la misma rutina.
+    """
+    data = data if data is not None else cargar_data()
+    cat = cat or clasificar_imc(peso, est)
+    posiciones = posiciones_variables(data, nivel) if variante is not None else None
+    strategy = crear_strategy(modo, elegir_set_func=elegir_set, seed=seed,
+                              variante=variante, posiciones=posiciones)
+    facade = RoutineFacade(data, strategy=strategy)
+    RENDER_SSML.preparar(data)
+    # Una sola pasada: set, recorte/relleno por nivel y descansos por IMC
+    rutina = facade.compilar_rutina(nivel, tipo, peso, est, cat)
+    print("IMC categoria:", cat)
+    return rutina, resumen_y_texto(rutina)
+
+def borrar_y_responder(handler_input, user_id, entrada, nombre_buscar=""):
+    """Borra la rutina (entrada del índice) y arma la respuesta según cómo salió."""
+    nom_final = entrada.get("nombre") or nombre_buscar
+    try:
+        with avisar_mientras(handler_input, "borrar", "Borrando la rutina…"):
+            borrada = borrar_rutina(user_id, entrada.get("id"))
+    except Exception as e:
+        print("Error borrando rutina en BorrarRutinaIntent:", repr(e))
+        speak = ("Hubo un problema al borrar la rutina. "
+                 "Intenta de nuevo más tarde.")
+        return (handler_input.response_builder
+                .speak(speak)
+                .ask("¿Quieres hacer otra cosa, como ver o crear rutinas?")
+                .response)
+    if not borrada:
+        # Ya no estaba (otro dispositivo la borró entre la búsqueda y ahora)
+        speak = (f"No encontré la rutina {nom_final}; puede que ya la hayas borrado. "
+                 "Si quieres, puedes decir: ver rutinas.")
+        return (handler_input.response_builder
+                .speak(speak)
+                .ask("¿Quieres hacer algo más?")
+                .response)
+    speak = (f"La rutina {nom_final} ha sido borrada. "
+             "Si quieres, puedes decir: ver rutinas, o crear una nueva rutina.")
+    return (handler_input.response_builder
+            .speak(speak)
+            .ask("¿Quieres hacer algo más?")
+            .response)
+
+def avisar_mientras(handler_input, operacion, texto):
+    """Respuesta progresiva (texto) mientras corre el bloque, si se espera que tarde."""
+    return PROGRESIVA.avisar_mientras(handler_input, operacion, texto, remoto=almacen_remoto())
 
 # === Handlers de Alexa ===
 class LaunchRequestHandler(AbstractRequestHandler):
@@ -350,7 +299,12 @@ class LaunchRequestHandler(AbstractRequestHandler):
                  "Puedo ayudarte a crear una rutina nueva o ver tus rutinas. "
                  "Di: crear rutinas o ver rutinas.")
         reprompt = "¿Qué eliges? Puedes decir crear rutinas o ver rutinas."
-        # Aquí solo presentamos el menú principal
+        # Mientras el usuario escucha el menú, traemos su biblioteca en segundo plano
+        try:
+            user_id = handler_input.request_envelope.session.user.user_id
+        except Exception:
+            user_id = None
+        precargar_biblioteca(user_id)
         return handler_input.response_builder.speak(speak).ask(reprompt).response
 
 class GenerarRutinaIntentHandler(AbstractRequestHandler):
@@ -366,6 +320,8 @@ class GenerarRutinaIntentHandler(AbstractRequestHandler):
 
     def _ask_slot(self, handler_input, intent, slot_name, prompt):
         # Pregunta un slot faltante y mantiene el intent
+        from ask_sdk_model.dialog import ElicitSlotDirective
+        from ask_sdk_model import Intent as AIntent
         return (handler_input.response_builder
                 .speak(prompt).ask(prompt)
                 .add_directive(ElicitSlotDirective(
@@ -373,19 +329,39 @@ class GenerarRutinaIntentHandler(AbstractRequestHandler):
                     updated_intent=AIntent(name=intent.name, slots=intent.slots)))
                 .response)
 
-    def _generar_combinado(self, modo, peso, est, nivel, tipo):
-        # Junta: carga data, crea strategy, llama al facade y ajusta por nivel/IMC
+    def _generar_combinado(self, modo, peso, est, nivel, tipo, seed=None):
+        # Solo el texto que va a leer Alexa
+        return self._generar_rutina(modo, peso, est, nivel, tipo, seed=seed)[1]
+
+    def _generar_rutina(self, modo, peso, est, nivel, tipo, variante=None, seed=None):
+        # Junta: carga data, crea strategy, llama al facade y ajusta por nivel/IMC.
+        # Regresa (rutina, texto). Con variante se arma esa variante del set;
+        # en aleatorio, con seed la rutina sale siempre igual.
         data = cargar_data()
-        strategy = crear_strategy(modo, elegir_set_func=elegir_set)
-        facade = RoutineFacade(data, strategy=strategy)
-        rutina, errs = intentar_generar(facade, peso, est, nivel, tipo)
-        if rutina is None:
-            rutina = rutina_fallback(tipo or "UPPER", nivel)
-        rutina = ajustar_por_nivel_y_tipo(rutina, nivel, tipo or "UPPER")
         cat = clasificar_imc(peso, est)
-        print("IMC categoria:", cat)
-        rutina = ajustar_descansos_por_imc(rutina, cat)
-        return resumen_y_texto(rutina)
+        sobre = imc.es_sobrepeso(imc.calc_imc_cm(peso, est))
+        # En manual el resultado solo depende de tipo, nivel y el IMC: primero
+        # buscamos en la tabla precalculada y luego en la cache del contenedor.
+        # Una variante o una semilla también fijan la rutina, así que se cachean igual
+        clave = None
+        if variante is not None:
+            clave = ("variante", tipo, nivel, cat, sobre, variante)
+        elif modo == "manual":
+            guardado = buscar_precalculada(data, tipo, nivel, cat, sobre)
+            if guardado is not None:
+                return guardado["rutina"], guardado["texto"]
+            clave = (modo, tipo, nivel, cat, sobre)
+        elif seed is not None:
+            clave = (modo, tipo, nivel, cat, sobre, seed)
+        if clave is not None:
+            guardado = CACHE_RUTINAS.obtener(clave, data.version)
+            if guardado is not None:
+                return guardado
+        rutina, texto = generar_rutina_completa(modo, peso, est, nivel, tipo, data=data, cat=cat,
+                                                variante=variante, seed=seed)
+        if clave is not None:
+            CACHE_RUTINAS.guardar(clave, (rutina, texto), data.version)
+        return rutina, texto
 
     def handle(self, handler_input):
         intent = handler_input.request_envelope.request.intent
@@ -413,14 +389,21 @@ class GenerarRutinaIntentHandler(AbstractRequestHandler):
 
         # Modo aleatorio: la skill decide tipo y nivel
         if modo == "random":
-            tipo  = random.choice(["UPPER","LOWER"])
+            # El sorteo sale de una semilla que se guarda con los parámetros
+            semilla = nueva_semilla()
+            rng = random.Random(semilla)
+            tipo  = rng.choice(["UPPER","LOWER"])
             nivel = "MEDIO"
-            texto = self._generar_combinado("random", peso, est, nivel, tipo)
             sess = handler_input.attributes_manager.session_attributes
+            data = cargar_data()
+            variante = elegir_variante(sess, data, peso, est, nivel, tipo, rng=rng)
+            rutina, texto = self._generar_rutina("random", peso, est, nivel, tipo, variante=variante)
             sess['awaiting'] = 'like_routine'
             sess['params'] = {'modo':'random','peso':peso,'estatura':est,'nivel':nivel,'tipo':tipo}
-            sess['last_routine'] = texto
-            pregunta = texto + ' ¿Te gusta la rutina? Puedes decir sí o no.'
+            # En sesión solo va cómo se armó la rutina, no su texto (viaja en cada turno)
+            sess['rutina'] = describir_rutina(data, tipo, nivel, variante, semilla)
+            sess.pop('reproduccion', None)
+            pregunta = texto + invitar_reproduccion(rutina) + ' ¿Te gusta la rutina? Puedes decir sí o no.'
             return handler_input.response_builder.speak(pregunta).ask('¿Te gusta la rutina?').response
 
         # Modo manual: el usuario elige tipo y nivel
@@ -433,12 +416,16 @@ class GenerarRutinaIntentHandler(AbstractRequestHandler):
             return self._ask_slot(handler_input, intent, "nivel",
                 "¿Qué nivel quieres? fácil, medio o difícil?")
 
-        texto = self._generar_combinado("manual", peso, est, nivel, tipo)
+        rutina, texto = self._generar_rutina("manual", peso, est, nivel, tipo)
         sess = handler_input.attributes_manager.session_attributes
+        # En manual el set va en su orden: es la variante 0
+        sobre = imc.es_sobrepeso(imc.calc_imc_cm(peso, est))
+        sess.setdefault('variantes', {})[f"{tipo}|{nivel}|{int(bool(sobre))}"] = [0]
         sess['awaiting'] = 'like_routine'
         sess['params'] = {'modo':'manual','peso':peso,'estatura':est,'nivel':nivel,'tipo':tipo}
-        sess['last_routine'] = texto
-        pregunta = texto + ' ¿Te gusta la rutina? Puedes decir sí o no.'
+        sess['rutina'] = describir_rutina(cargar_data(), tipo, nivel)
+        sess.pop('reproduccion', None)
+        pregunta = texto + invitar_reproduccion(rutina) + ' ¿Te gusta la rutina? Puedes decir sí o no.'
         return handler_input.response_builder.speak(pregunta).ask('¿Te gusta la rutina?').response
 
 
@@ -462,6 +449,15 @@ class YesIntentHandler(AbstractRequestHandler):
             # Confirmó guardar, ahora pedimos el nombre
             sess['awaiting'] = 'ask_name'
             return handler_input.response_builder.speak("¿Cómo quieres llamar esta rutina?").ask("¿Cómo la quieres llamar?").response
+        pendiente = sess.pop('borrar_pendiente', None)
+        if awaiting == 'confirm_delete' and pendiente:
+            # Confirmó borrar la rutina que encontramos por un nombre parecido
+            sess['awaiting'] = None
+            try:
+                user_id = handler_input.request_envelope.session.user.user_id
+            except Exception:
+                user_id = None
+            return borrar_y_responder(handler_input, user_id, pendiente)
         # Si no hay flujo pendiente, regresamos al menú principal
         return handler_input.response_builder.speak("De acuerdo. ¿Qué deseas hacer, crear rutinas o ver rutinas?").ask("¿Crear rutinas o ver rutinas?").response
 
@@ -486,29 +482,35 @@ class NoIntentHandler(AbstractRequestHandler):
             nivel= params.get('nivel')
             tipo = params.get('tipo')
             gen = GenerarRutinaIntentHandler()
-            prev = sess.get('last_routine') or ''
-            intento = 0
-            texto = prev
-            while intento < 5 and (texto.strip() == prev.strip()):
-                if modo == 'manual':
-                    # En manual, cambiamos el set manteniendo tipo/nivel
-                    texto = gen._generar_combinado('random', peso, est, nivel, tipo)
-                else:
-                    # En aleatorio, también cambiamos tipo/nivel
-                    tipo = random.choice(['UPPER','LOWER'])
-                    nivel = random.choice(['FACIL','MEDIO','DIFICIL']) if 'nivel' in locals() else 'MEDIO'
-                    texto = gen._generar_combinado('random', peso, est, nivel, tipo)
-                intento += 1
-            sess['last_routine'] = texto
+            semilla = nueva_semilla()
+            rng = random.Random(semilla)
+            if modo != 'manual':
+                # En aleatorio, también cambiamos tipo/nivel
+                tipo = rng.choice(['UPPER','LOWER'])
+                nivel = rng.choice(['FACIL','MEDIO','DIFICIL'])
+            # En manual mantenemos tipo/nivel y cambiamos el orden del set; la
+            # variante sale de las que no se han dado, así que es distinta
+            data = cargar_data()
+            variante = elegir_variante(sess, data, peso, est, nivel, tipo, rng=rng)
+            rutina, texto = gen._generar_rutina('random', peso, est, nivel, tipo, variante=variante)
+            sess['rutina'] = describir_rutina(data, tipo, nivel, variante, semilla)
+            sess.pop('reproduccion', None)
             sess['awaiting'] = 'like_routine'
-            return handler_input.response_builder.speak(texto + " ¿Te gusta esta nueva rutina? Puedes decir sí o no.").ask("¿Te gusta esta nueva rutina?").response
+            return handler_input.response_builder.speak(texto + invitar_reproduccion(rutina) + " ¿Te gusta esta nueva rutina? Puedes decir sí o no.").ask("¿Te gusta esta nueva rutina?").response
+        if awaiting == 'confirm_delete':
+            # No era esa rutina: no se borra nada
+            pendiente = sess.pop('borrar_pendiente', None) or {}
+            sess['awaiting'] = None
+            speak = (f"De acuerdo, no borré la rutina {pendiente.get('nombre', '')}. "
+                     "Si era otra, di: borrar rutina y el nombre exacto.")
+            return handler_input.response_builder.speak(speak).ask("¿Qué deseas hacer?").response
         if awaiting == 'confirm_save':
             # No quiere guardar, cerramos
             return handler_input.response_builder.speak("Listo. ¡Hasta luego!").set_should_end_session(True).response
         return handler_input.response_builder.speak("Entendido.").set_should_end_session(True).response
 
 class AsignarNombreRutinaIntentHandler(AbstractRequestHandler):
-    # Asigna nombre a la rutina actual y la guarda en S3
+    # Asigna nombre a la rutina actual y la guarda en el almacén de rutinas
     def can_handle(self, handler_input):
         req = handler_input.request_envelope.request
         return req.object_type == "IntentRequest" and req.intent.name == "AsignarNombreRutinaIntent"
@@ -532,18 +534,27 @@ class AsignarNombreRutinaIntentHandler(AbstractRequestHandler):
             except Exception:
                 user_id = None
 
-            # Cargamos rutinas existentes
-            data = cargar_rutinas_guardadas(user_id)
-            if not isinstance(data, list):
-                data = []
-
-            # Agregamos la nueva rutina con su texto
-            data.append({"nombre": nombre, "texto": sess.get('last_routine', '')})
-
-            # Guardamos en S3
-            guardar_rutinas_guardadas(user_id, data)
+            # Guardamos la rutina nueva (solo ese objeto y el manifiesto); con la
+            # estructura se guardan los pasos en lugar del texto completo.
+            # La sesión solo trae su descripción: aquí se vuelve a armar
+            with avisar_mientras(handler_input, "guardar", "Guardando tu rutina…"):
+                _, estructura, texto = materializar_rutina(sess)
+                rid = agregar_rutina(user_id, {"nombre": nombre, "texto": texto, "estructura": estructura})
+            if not rid:
+                raise RuntimeError("el almacén no regresó id para la rutina")
+        except AlmacenNoConfigurado:
+            # Repetir el nombre no lo arregla; lo contesta AlmacenNoConfiguradoHandler
+            raise
         except Exception as e:
+            # Incluye el conflicto de escritura cuando se acaban los reintentos.
+            # La rutina sigue en sesión y seguimos esperando el nombre para reintentar
             print("Error guardando rutina:", repr(e))
+            speak = ("Hubo un problema al guardar la rutina. "
+                     "Dime el nombre otra vez para intentarlo de nuevo.")
+            return (handler_input.response_builder
+                    .speak(speak)
+                    .ask("¿Cómo quieres llamar esta rutina?")
+                    .response)
         sess['awaiting'] = None
         speech = f"Rutina guardada como {nombre}. ¡Listo! Si quieres ver tus rutinas guardadas, di: ver rutinas."
         reprompt = "¿Quieres ver tus rutinas o crear otra rutina?"
@@ -556,6 +567,8 @@ class PesoSoloIntentHandler(AbstractRequestHandler):
         return req.object_type == "IntentRequest" and req.intent.name == "PesoSoloIntent"
 
     def handle(self, handler_input):
+        from ask_sdk_model.dialog import ElicitSlotDirective
+        from ask_sdk_model import Intent as AIntent, Slot as ASlot
         intent = handler_input.request_envelope.request.intent
         peso = (intent.slots or {}).get("peso_kg")
         peso_val = peso.value if peso else None
@@ -582,6 +595,8 @@ class EstaturaSoloIntentHandler(AbstractRequestHandler):
         return req.object_type == "IntentRequest" and req.intent.name == "EstaturaSoloIntent"
 
     def handle(self, handler_input):
+        from ask_sdk_model.dialog import ElicitSlotDirective
+        from ask_sdk_model import Intent as AIntent, Slot as ASlot
         intent = handler_input.request_envelope.request.intent
         est = (intent.slots or {}).get("estatura_cm")
         est_val = est.value if est else None
@@ -601,58 +616,220 @@ class EstaturaSoloIntentHandler(AbstractRequestHandler):
                 .response)
 
 
+# Cuántos nombres leemos por turno en "ver rutinas"; el resto con "siguientes"
+RUTINAS_POR_PAGINA = 10
+
+def _texto_lista(nombres):
+    # "a", "a y b", "a, b y c"
+    if len(nombres) == 1:
+        return nombres[0]
+    return ", ".join(nombres[:-1]) + " y " + nombres[-1]
+
+def responder_pagina_rutinas(handler_input, inicio):
+    """Lee una página de nombres del manifiesto y deja el cursor en sesión."""
+    try:
+        try:
+            user_id = handler_input.request_envelope.session.user.user_id
+        except Exception:
+            user_id = None
+        with avisar_mientras(handler_input, "listar", "Buscando tus rutinas…"):
+            rutinas = listar_rutinas(user_id)
+    except AlmacenNoConfigurado:
+        raise
+    except Exception as e:
+        print("Error leyendo rutinas en VerRutinasIntent:", repr(e))
+        rutinas = []
+
+    sess = handler_input.attributes_manager.session_attributes
+    # Si no hay rutinas, lo avisamos
+    if not rutinas:
+        sess.pop('pagina_rutinas', None)
+        speak = ("Todavía no tengo rutinas guardadas para mostrar. "
+                 "Primero crea una diciendo: crear rutinas.")
+        return handler_input.response_builder.speak(speak).ask("¿Quieres crear una rutina nueva?").response
+
+    total = len(rutinas)
+    inicio = max(0, min(int(inicio or 0), total - 1))
+    fin = min(total, inicio + RUTINAS_POR_PAGINA)
+    nombres = [(r or {}).get("nombre") or "sin nombre" for r in rutinas[inicio:fin]]
+    lista_texto = _texto_lista(nombres)
+
+    if inicio == 0 and fin == total:
+        speak = (f"Tienes {total} rutinas guardadas. "
+                 f"Sus nombres son: {lista_texto}. ")
+    elif inicio == 0:
+        speak = (f"Tienes {total} rutinas guardadas. "
+                 f"Las primeras {len(nombres)} son: {lista_texto}. ")
+    else:
+        speak = f"Rutinas {inicio + 1} a {fin} de {total}: {lista_texto}. "
+
+    if fin < total:
+        sess['pagina_rutinas'] = fin
+        speak += "Para escuchar más nombres, di: siguientes. "
+    else:
+        sess.pop('pagina_rutinas', None)
+    speak += ("Si quieres escuchar una rutina, di: ver rutina y el nombre, por ejemplo, ver rutina y el nombre. "
+              "También puedes crear otra rutina diciendo: crear rutinas. "
+              "Si quieres borrar una rutina, di: borrar rutina y el nombre, por ejemplo, borrar rutina hola.")
+    reprompt = ("¿Quieres escuchar más nombres, crear otra rutina o salir?" if fin < total
+                else "¿Quieres crear otra rutina o salir?")
+    return handler_input.response_builder.speak(speak).ask(reprompt).response
+
+
 class VerRutinasIntentHandler(AbstractRequestHandler):
-    # Muestra la lista de rutinas guardadas con sus nombres
+    # Muestra la lista de rutinas guardadas con sus nombres (por páginas)
     def can_handle(self, handler_input):
         return (handler_input.request_envelope.request.object_type == "IntentRequest"
                 and handler_input.request_envelope.request.intent.name == "VerRutinasIntent")
 
     def handle(self, handler_input):
-        # Leemos rutinas desde S3
-        try:
-            try:
-                user_id = handler_input.request_envelope.session.user.user_id
-            except Exception:
-                user_id = None
-            rutinas = cargar_rutinas_guardadas(user_id)
-        except Exception as e:
-            print("Error leyendo rutinas en VerRutinasIntent:", repr(e))
-            rutinas = []
+        # Solo leemos el manifiesto: nombres, sin bajar las rutinas
+        return responder_pagina_rutinas(handler_input, 0)
 
-        # Si no hay rutinas, lo avisamos
-        if not rutinas:
-            speak = ("Todavía no tengo rutinas guardadas para mostrar. "
-                     "Primero crea una diciendo: crear rutinas.")
+
+class SiguientesRutinasIntentHandler(AbstractRequestHandler):
+    # "siguientes": continúa la lista de "ver rutinas" donde se quedó
+    def can_handle(self, handler_input):
+        req = handler_input.request_envelope.request
+        return req.object_type == "IntentRequest" and req.intent.name == "SiguientesRutinasIntent"
+
+    def handle(self, handler_input):
+        sess = handler_input.attributes_manager.session_attributes
+        inicio = sess.get('pagina_rutinas')
+        if inicio is None:
+            speak = "No hay más nombres por leer. Puedes decir: ver rutinas, o crear rutinas."
+            return handler_input.response_builder.speak(speak).ask("¿Qué quieres hacer?").response
+        return responder_pagina_rutinas(handler_input, inicio)
+
+
+INSTRUCCIONES_REPRODUCCION = "Di siguiente para seguir, repite, pausa o cuánto falta."
+
+class ReproducirRutinaIntentHandler(AbstractRequestHandler):
+    # Lee la rutina actual un paso por turno: empezar, siguiente, repite,
+    # pausa, continúa y cuánto falta. En sesión solo va el cursor.
+    INTENTS = ("EmpezarRutinaIntent", "CuantoFaltaIntent", "AMAZON.NextIntent",
+               "AMAZON.RepeatIntent", "AMAZON.PauseIntent", "AMAZON.ResumeIntent")
+
+    def can_handle(self, handler_input):
+        req = handler_input.request_envelope.request
+        if req.object_type != "IntentRequest":
+            return False
+        if req.intent.name in self.INTENTS:
+            return True
+        # "siguientes" también avanza el paso, salvo que se esté leyendo la lista de rutinas
+        sess = handler_input.attributes_manager.session_attributes or {}
+        return (req.intent.name == "SiguientesRutinasIntent" and 'reproduccion' in sess
+                and sess.get('pagina_rutinas') is None)
+
+    def handle(self, handler_input):
+        nombre = handler_input.request_envelope.request.intent.name
+        sess = handler_input.attributes_manager.session_attributes
+        cursor = sess.get('reproduccion')
+        if cursor is None and nombre != "EmpezarRutinaIntent":
+            if nombre == "AMAZON.NextIntent" and sess.get('pagina_rutinas') is not None:
+                return responder_pagina_rutinas(handler_input, sess['pagina_rutinas'])
+            speak = ("No hay ninguna rutina en curso. Crea una diciendo: crear rutinas, "
+                     "y después di: empezar rutina.")
+            return handler_input.response_builder.speak(speak).ask("¿Qué quieres hacer?").response
+
+        rutina, _ = rutina_en_sesion(sess)
+        if not rutina or not rutina.get("pasos"):
+            sess.pop('reproduccion', None)
+            speak = "Todavía no tengo una rutina para leerte. Primero crea una diciendo: crear rutinas."
             return handler_input.response_builder.speak(speak).ask("¿Quieres crear una rutina nueva?").response
+        plan = plan_reproduccion(rutina)
+        i = 0 if nombre == "EmpezarRutinaIntent" else min(int(cursor.get('i', 0)), len(plan.pasos) - 1)
+
+        if nombre == "CuantoFaltaIntent":
+            speak = texto_falta(plan, i)
+            if cursor.get('pausa'):
+                speak += " Estás en pausa; di continúa cuando quieras seguir."
+            return handler_input.response_builder.speak(speak).ask(INSTRUCCIONES_REPRODUCCION).response
+        if nombre == "AMAZON.PauseIntent":
+            sess['reproduccion'] = {'i': i, 'pausa': True}
+            speak = f"En pausa en el paso {i + 1}. Cuando quieras seguir, di: continúa."
+            return handler_input.response_builder.speak(speak).ask("Di continúa para seguir.").response
+
+        intro = ""
+        if nombre == "EmpezarRutinaIntent":
+            intro = f"Vamos paso a paso. {INSTRUCCIONES_REPRODUCCION} "
+        elif nombre in ("AMAZON.NextIntent", "SiguientesRutinasIntent"):
+            i += 1
+        if i >= len(plan.pasos):
+            sess.pop('reproduccion', None)
+            speak = ("Terminaste la rutina. ¡Buen trabajo! "
+                     "Puedes decir: crear rutinas, ver rutinas o empezar rutina para repetirla.")
+            return handler_input.response_builder.speak(speak).ask("¿Qué quieres hacer ahora?").response
+        sess['reproduccion'] = {'i': i, 'pausa': False}
+        return (handler_input.response_builder
+                .speak(intro + texto_paso(plan, i))
+                .ask(INSTRUCCIONES_REPRODUCCION)
+                .response)
 
-        # Armamos la lista de nombres para leerla
-        nombres = []
-        for r in rutinas:
-            nom = ""
-            try:
-                nom = (r or {}).get("nombre")
-            except Exception:
-                nom = None
-            if not nom:
-                nom = "sin nombre"
-            nombres.append(nom)
-
-        total = len(nombres)
-        if total == 1:
-            lista_texto = nombres[0]
-        else:
-            if total == 2:
-                lista_texto = " y ".join(nombres)
-            else:
-                lista_texto = ", ".join(nombres[:-1]) + " y " + nombres[-1]
 
-        speak = (f"Tienes {total} rutinas guardadas. "
-                 f"Sus nombres son: {lista_texto}. "
-                 "Si quieres escuchar una rutina, di: ver rutina y el nombre, por ejemplo, ver rutina y el nombre. "
-                 "También puedes crear otra rutina diciendo: crear rutinas. "
-                 "Si quieres borrar una rutina, di: borrar rutina y el nombre, por ejemplo, borrar rutina hola.")
+def _minutos_a_texto(minutos):
+    return "un minuto" if minutos == 1 else f"{minutos} minutos"
+
+class BuscarRutinasIntentHandler(AbstractRequestHandler):
+    # Busca rutinas guardadas por tipo, nivel y duración, usando solo el manifiesto
+    def can_handle(self, handler_input):
+        req = handler_input.request_envelope.request
+        return req.object_type == "IntentRequest" and req.intent.name == "BuscarRutinasIntent"
+
+    def _slot(self, intent, name):
+        s = (intent.slots or {}).get(name)
+        return (s.value if s else None) or None
+
+    def handle(self, handler_input):
+        intent = handler_input.request_envelope.request.intent
+        tipo = norm_tipo(self._slot(intent, "tipo"))
+        nivel = norm_nivel(self._slot(intent, "nivel"))
+        min_max = _safe_int(self._slot(intent, "minutos_max"), 0)
+        min_min = _safe_int(self._slot(intent, "minutos_min"), 0)
+        orden = norm_orden(self._slot(intent, "orden"))
+
+        try:
+            user_id = handler_input.request_envelope.session.user.user_id
+        except Exception:
+            user_id = None
+        indice = atributos_rutinas(user_id)
+        if not indice:
+            speak = ("Por ahora no tienes rutinas guardadas. "
+                     "Primero crea una diciendo: crear rutinas.")
+            return handler_input.response_builder.speak(speak).ask("¿Quieres crear una rutina nueva?").response
 
-        return handler_input.response_builder.speak(speak).ask("¿Quieres crear otra rutina o salir?").response
+        total, rutinas = indice.consultar(tipo=tipo or None, nivel=nivel or None,
+                                          min_seg=min_min * 60 if min_min else None,
+                                          max_seg=min_max * 60 if min_max else None,
+                                          orden=orden, limite=RUTINAS_POR_PAGINA)
+
+        # Armamos la descripción de lo que pidió, por ejemplo "de tren inferior de menos de 10 minutos"
+        desc = ""
+        if tipo:
+            desc += " de tren superior" if tipo == "UPPER" else " de tren inferior"
+        if nivel:
+            desc += {"FACIL": " de nivel fácil", "MEDIO": " de nivel medio", "DIFICIL": " de nivel difícil"}[nivel]
+        if min_min:
+            desc += f" de más de {_minutos_a_texto(min_min)}"
+        if min_max:
+            desc += f" de menos de {_minutos_a_texto(min_max)}"
+
+        if not total:
+            speak = (f"No encontré rutinas guardadas{desc}. "
+                     "Puedes decir: ver rutinas, para escuchar todos los nombres.")
+            return handler_input.response_builder.speak(speak).ask("¿Qué quieres hacer?").response
+
+        nombres = _texto_lista([r.get("nombre") or "sin nombre" for r in rutinas])
+        cuantas = "una rutina" if total == 1 else f"{total} rutinas"
+        speak = f"Encontré {cuantas}{desc}"
+        if total > len(rutinas):
+            speak += {"CORTAS": f". Las {len(rutinas)} más cortas son: ",
+                      "LARGAS": f". Las {len(rutinas)} más largas son: "}.get(
+                orden, f". Las {len(rutinas)} más recientes son: ")
+        else:
+            speak += ": "
+        speak += f"{nombres}. Si quieres escuchar una, di: ver rutina y el nombre."
+        return handler_input.response_builder.speak(speak).ask("¿Qué rutina quieres escuchar?").response
 
 
 class ElegirRutinaIntentHandler(AbstractRequestHandler):
@@ -681,13 +858,15 @@ class ElegirRutinaIntentHandler(AbstractRequestHandler):
         except Exception:
             user_id = None
 
-        try:
-            rutinas = cargar_rutinas_guardadas(user_id)
-        except Exception as e:
-            print("Error leyendo rutinas en ElegirRutinaIntent:", repr(e))
-            rutinas = []
+        # Índice de nombres del usuario (se arma una vez por versión del manifiesto)
+        # y la rutina cuyo nombre se parece más (sin importar acentos ni
+        # mayúsculas); solo bajamos la que eligió
+        with avisar_mientras(handler_input, "elegir", "Buscando tu rutina…"):
+            indice = indice_rutinas(user_id)
+            elegida = indice.mejor(nombre_buscar) if indice else None
+            guardada = (leer_rutina(user_id, elegida.get("id")) or {}) if elegida else {}
 
-        if not rutinas:
+        if not indice:
             speak = ("Por ahora no tienes rutinas guardadas. "
                      "Primero crea una diciendo: crear rutinas.")
             return (handler_input.response_builder
@@ -695,21 +874,6 @@ class ElegirRutinaIntentHandler(AbstractRequestHandler):
                     .ask("¿Quieres crear una rutina nueva?")
                     .response)
 
-        # Buscamos la rutina por coincidencia de nombre
-        nombre_buscar_low = nombre_buscar.lower()
-        elegida = None
-        for r in rutinas:
-            try:
-                nom = (r or {}).get("nombre", "")
-                if not isinstance(nom, str):
-                    continue
-                nom_low = nom.lower()
-                if nombre_buscar_low in nom_low or nom_low in nombre_buscar_low:
-                    elegida = r
-                    break
-            except Exception:
-                continue
-
         if not elegida:
             speak = (f"No encontré ninguna rutina cuyo nombre se parezca a {nombre_buscar}. "
                      "Intenta de nuevo diciendo, por ejemplo: quiero la rutina y el nombre.")
@@ -719,7 +883,7 @@ class ElegirRutinaIntentHandler(AbstractRequestHandler):
                     .response)
 
         nom_elegido = elegida.get("nombre") or nombre_buscar
-        texto = elegida.get("texto") or "No tengo texto guardado para esta rutina."
+        texto = guardada.get("texto") or "No tengo texto guardado para esta rutina."
         speak = f"Esta es la rutina {nom_elegido}: {texto}"
         # Dejamos sesión abierta por si quiere otra cosa
         return handler_input.response_builder.speak(speak).ask(
@@ -749,18 +913,15 @@ class BorrarRutinaIntentHandler(AbstractRequestHandler):
                     .ask("¿Qué rutina quieres borrar?")
                     .response)
 
-        # Leemos rutinas desde S3
+        # Índice de nombres del usuario, armado desde el manifiesto
         try:
-            try:
-                user_id = handler_input.request_envelope.session.user.user_id
-            except Exception:
-                user_id = None
-            rutinas = cargar_rutinas_guardadas(user_id)
-        except Exception as e:
-            print("Error leyendo rutinas en BorrarRutinaIntent:", repr(e))
-            rutinas = []
+            user_id = handler_input.request_envelope.session.user.user_id
+        except Exception:
+            user_id = None
+        with avisar_mientras(handler_input, "indice", "Buscando la rutina…"):
+            indice = indice_rutinas(user_id)
 
-        if not rutinas:
+        if not indice:
             speak = ("No tienes rutinas guardadas todavía. "
                      "Primero crea una diciendo: crear rutinas.")
             return (handler_input.response_builder
@@ -768,24 +929,18 @@ class BorrarRutinaIntentHandler(AbstractRequestHandler):
                     .ask("¿Quieres crear una rutina nueva?")
                     .response)
 
-        # Buscamos la rutina por nombre
-        nombre_buscar_low = nombre_buscar.lower()
-        indice_borrar = None
-        nom_encontrado = None
-        for idx, r in enumerate(rutinas):
-            try:
-                nom = (r or {}).get("nombre", "")
-                if not isinstance(nom, str):
-                    continue
-                nom_low = nom.lower()
-                if nombre_buscar_low in nom_low or nom_low in nombre_buscar_low:
-                    indice_borrar = idx
-                    nom_encontrado = nom
-                    break
-            except Exception:
-                continue
+        # Buscamos la rutina por nombre. Borrar no se puede deshacer: solo
+        # con el nombre exacto (sin contar acentos ni mayúsculas) se borra de
+        # una vez; si solo se parece, primero preguntamos
+        sess = handler_input.attributes_manager.session_attributes
+        if sess is None:
+            sess = {}
+            handler_input.attributes_manager.session_attributes = sess
+        sess.pop('borrar_pendiente', None)
+        exacta = indice.exacta(nombre_buscar)
+        elegida = exacta or indice.mejor(nombre_buscar)
 
-        if indice_borrar is None:
+        if elegida is None:
             speak = (f"No encontré ninguna rutina cuyo nombre se parezca a {nombre_buscar}. "
                      "Intenta de nuevo diciendo, por ejemplo: borrar rutina y el nombre.")
             return (handler_input.response_builder
@@ -793,26 +948,17 @@ class BorrarRutinaIntentHandler(AbstractRequestHandler):
                     .ask("¿Qué rutina quieres borrar?")
                     .response)
 
-        # Borramos la rutina y guardamos cambios
-        try:
-            del rutinas[indice_borrar]
-            guardar_rutinas_guardadas(user_id, rutinas)
-        except Exception as e:
-            print("Error borrando rutina en BorrarRutinaIntent:", repr(e))
-            speak = ("Hubo un problema al borrar la rutina. "
-                     "Intenta de nuevo más tarde.")
+        if exacta is None:
+            nom = elegida.get("nombre") or nombre_buscar
+            sess['borrar_pendiente'] = {"id": elegida.get("id"), "nombre": nom}
+            sess['awaiting'] = 'confirm_delete'
             return (handler_input.response_builder
-                    .speak(speak)
-                    .ask("¿Quieres hacer otra cosa, como ver o crear rutinas?")
+                    .speak(f"¿Borro la rutina {nom}? Puedes decir sí o no.")
+                    .ask(f"¿Borro la rutina {nom}?")
                     .response)
 
-        nom_final = nom_encontrado or nombre_buscar
-        speak = (f"La rutina {nom_final} ha sido borrada. "
-                 "Si quieres, puedes decir: ver rutinas, o crear una nueva rutina.")
-        return (handler_input.response_builder
-                .speak(speak)
-                .ask("¿Quieres hacer algo más?")
-                .response)
+        # Borramos solo esa rutina y su entrada del manifiesto
+        return borrar_y_responder(handler_input, user_id, elegida, nombre_buscar)
 
 
 class HelpIntentHandler(AbstractRequestHandler):
@@ -842,6 +988,8 @@ class CancelOrStopIntentHandler(AbstractRequestHandler):
             sess = {}
             handler_input.attributes_manager.session_attributes = sess
         sess["awaiting"] = None
+        sess.pop('reproduccion', None)
+        sess.pop('borrar_pendiente', None)
 
         speak = (
             "De acuerdo. Seguimos en Entrenador Fit. "
@@ -869,6 +1017,22 @@ class SessionEndedRequestHandler(AbstractRequestHandler):
     def handle(self, handler_input):
         return handler_input.response_builder.response
 
+class AlmacenNoConfiguradoHandler(AbstractExceptionHandler):
+    # Sin almacén configurado no se pueden guardar, ver, buscar ni borrar
+    # rutinas; lo decimos y dejamos que el usuario cree una rutina nueva
+    def can_handle(self, handler_input, exception):
+        return isinstance(exception, AlmacenNoConfigurado)
+
+    def handle(self, handler_input, exception):
+        print("Almacén de rutinas no configurado:", repr(exception))
+        sess = handler_input.attributes_manager.session_attributes
+        if sess is not None:
+            sess.pop('awaiting', None)
+            sess.pop('borrar_pendiente', None)
+        speak = ("Por ahora no puedo guardar ni leer tus rutinas guardadas. "
+                 "Sí puedo crear una rutina nueva: di crear rutinas.")
+        return handler_input.response_builder.speak(speak).ask("¿Quieres crear una rutina nueva?").response
+
 class CatchAllExceptionHandler(AbstractExceptionHandler):
     # Atrapa cualquier excepción que no se haya manejado
     def can_handle(self, handler_input, exception):
@@ -884,6 +1048,9 @@ sb = SkillBuilder()
 sb.add_request_handler(LaunchRequestHandler())
 sb.add_request_handler(GenerarRutinaIntentHandler())
 sb.add_request_handler(VerRutinasIntentHandler())
+sb.add_request_handler(ReproducirRutinaIntentHandler())
+sb.add_request_handler(SiguientesRutinasIntentHandler())
+sb.add_request_handler(BuscarRutinasIntentHandler())
 sb.add_request_handler(BorrarRutinaIntentHandler())
 sb.add_request_handler(ElegirRutinaIntentHandler())
 sb.add_request_handler(PesoSoloIntentHandler())
@@ -895,7 +1062,14 @@ sb.add_request_handler(HelpIntentHandler())
 sb.add_request_handler(CancelOrStopIntentHandler())
 sb.add_request_handler(FallbackIntentHandler())
 sb.add_request_handler(SessionEndedRequestHandler())
+sb.add_exception_handler(AlmacenNoConfiguradoHandler())
 sb.add_exception_handler(CatchAllExceptionHandler())
 
 # Handler que usa AWS Lambda como punto de entrada
-lambda_handler = sb.lambda_handler()
+# Con TRAZAS_ARCHIVO o TRAZAS_LOG cada request también se graba anonimizado
+# (grabador_sesiones); si no, es el handler del SDK tal cual
+lambda_handler = GRABADOR.envolver(sb.lambda_handler())
+
+# Todo lo creado en el init (módulos, handlers, skill) vive lo mismo que el
+# contenedor; lo sacamos del GC para que las colecciones no lo recorran.
+gc.freeze()
@@ -1,4 +1,8 @@
+import os
 import random
+from math import perm
+
+from compilador_rutinas import es_ejercicio
 
 class SetSelectionStrategy:
     def elegir(self, data, nivel, tipo, sobrepeso):
@@ -15,22 +19,88 @@ class SimpleKeyStrategy(SetSelectionStrategy):
 
 
 class RandomizedStrategy(SetSelectionStrategy):
-    # Modo "random": baraja la lista de pasos
-    def __init__(self, elegir_set_func):
+    # Modo "random": baraja la lista de pasos. Cada estrategia tiene su propio
+    # generador, así con la misma semilla sale la misma rutina y dos hilos no
+    # comparten el estado global de random. Esto vale para esta estrategia
+    # (app.py, benchmarks); en la skill la semilla no basta, ver nueva_semilla
+    def __init__(self, elegir_set_func, seed=None):
+        self._elegir_set = elegir_set_func
+        self.seed = seed
+        self._rng = random.Random(seed)
+
+    def elegir(self, data, nivel, tipo, sobrepeso):
+        pasos = list(self._elegir_set(data, nivel=nivel, tipo=tipo, sobrepeso=sobrepeso))
+        self._rng.shuffle(pasos)
+        return pasos
+
+
+def nueva_semilla():
+    # Semilla para guardar junto con los parámetros; no toca el estado global de random.
+    # En la skill la semilla sortea tipo, nivel y la variante entre las que el
+    # usuario no ha escuchado, así que la variante depende también de lo que ya
+    # salió en la sesión. La rutina se vuelve a armar con el par (semilla,
+    # variante), que siempre se guarda junto, nunca con la semilla sola
+    return int.from_bytes(os.urandom(4), "big")
+
+
+def contar_variantes(n, posiciones=None):
+    # Cuántos órdenes distintos hay de n pasos si solo cuentan los primeros
+    # "posiciones" (los demás se recortan después)
+    k = n if posiciones is None else max(0, min(posiciones, n))
+    return perm(n, k)
+
+
+def variante_por_indice(pasos, indice, posiciones=None):
+    # Regresa la variante número "indice" (0 .. contar_variantes - 1) sin
+    # generar las anteriores: cada dígito del índice en base factorial elige
+    # qué paso va en cada posición. Los que no entran quedan al final en su
+    # orden original. La variante 0 es la lista tal cual.
+    resto = list(pasos)
+    n = len(resto)
+    k = n if posiciones is None else max(0, min(posiciones, n))
+    indice %= perm(n, k)
+    out = []
+    for j in range(k):
+        base = perm(n - j - 1, k - j - 1)
+        i, indice = divmod(indice, base)
+        out.append(resto.pop(i))
+    return out + resto
+
+
+def contar_variantes_set(pasos, posiciones=None):
+    # Como contar_variantes, pero solo con los pasos que el compilador deja
+    # como ejercicio: los descansos del set (p. ej. "Press pared + pausa") se
+    # descartan al compilar y moverlos no cambia la rutina
+    return contar_variantes(sum(1 for p in pasos if es_ejercicio(p)), posiciones)
+
+
+class VariantStrategy(SetSelectionStrategy):
+    # Para "otra rutina": en lugar de barajar y esperar que salga algo
+    # distinto, se pide una variante concreta por su índice
+    def __init__(self, elegir_set_func, indice, posiciones=None):
         self._elegir_set = elegir_set_func
+        self.indice = indice
+        self.posiciones = posiciones
 
     def elegir(self, data, nivel, tipo, sobrepeso):
+        # Solo se reordenan los ejercicios; descansos y calentamientos se quedan
+        # en su lugar para que el compilador los trate igual que en el set
         pasos = list(self._elegir_set(data, nivel=nivel, tipo=tipo, sobrepeso=sobrepeso))
-        # Usamos shuffle directo para que se vea más sencillo
-        random.shuffle(pasos)
+        lugares = [i for i, p in enumerate(pasos) if es_ejercicio(p)]
+        orden = variante_por_indice([pasos[i] for i in lugares], self.indice, self.posiciones)
+        for i, p in zip(lugares, orden):
+            pasos[i] = p
         return pasos
 
 
-def crear_strategy(modo, elegir_set_func, seed=None):
+def crear_strategy(modo, elegir_set_func, seed=None, variante=None, posiciones=None):
     # Según el modo, devolvemos una estrategia u otra.
-    # El parámetro seed se ignora aquí, pero se deja en la firma
+    # seed es la semilla del modo aleatorio (None = una nueva cada vez).
+    # Con variante se arma esa variante del set, sin importar el modo.
+    if variante is not None:
+        return VariantStrategy(elegir_set_func, variante, posiciones)
     modo_limpio = (modo or "").strip().lower()
     if modo_limpio == "manual":
         return SimpleKeyStrategy(elegir_set_func)
     # Por defecto, usamos la estrategia aleatoria
-    return RandomizedStrategy(elegir_set_func)
+    return RandomizedStrategy(elegir_set_func, seed)
@@ -0,0 +1,408 @@
+# Persistencia de rutinas guardadas en S3
+#
+# Cada rutina guardada es su propio objeto y un manifiesto chico lleva la
+# lista de nombres:
+#   {user_id}/rutinas/manifiesto.json   {"v": 1, "rutinas": [{"id", "nombre", "bytes", "creado",
+#                                        "tipo", "nivel", "segundos", "ejercicios"}, ...]}
+#   {user_id}/rutinas/{id}.json         la rutina, en el formato de codec_rutinas
+# Así guardar o borrar solo toca la rutina afectada y el manifiesto, en lugar
+# de reescribir toda la biblioteca. El formato anterior (un solo
+# {user_id}/rutinas_guardadas.json con la lista completa) se migra solo la
+# primera vez que se lee.
+#
+# Escrituras con concurrencia optimista: el manifiesto se escribe con
+# If-Match sobre el ETag que leímos (If-None-Match: * si todavía no existe) y
+# cada rutina nueva con If-None-Match: *. Si otra sesión del mismo usuario
+# (otro dispositivo, o Alexa reintentando) escribió antes, S3 contesta 412 o
+# 409; entonces volvemos a leer el manifiesto, aplicamos otra vez el cambio
+# sobre lo nuevo y reintentamos, hasta S3_CONFLICTO_INTENTOS veces. No hay
+# locks y no se pierden rutinas guardadas al mismo tiempo.
+#
+# Un solo cliente de S3 por contenedor: se crea la primera vez que se necesita
+# y se reutiliza en todas las invocaciones, así no resolvemos credenciales ni
+# abrimos conexiones TCP/TLS nuevas en cada lectura o escritura.
+#
+# Variables de entorno:
+#   S3_PERSISTENCE_BUCKET / S3_PERSISTENCE_REGION  bucket y región
+#   S3_ENDPOINT_URL           endpoint alterno (por ejemplo un S3 local)
+#   S3_MAX_POOL_CONNECTIONS   conexiones en el pool (default 10)
+#   S3_CONNECT_TIMEOUT        segundos para conectar (default 2)
+#   S3_READ_TIMEOUT           segundos para leer la respuesta (default 3)
+#   S3_RETRY_MODE             legacy / standard / adaptive (default standard)
+#   S3_MAX_ATTEMPTS           intentos totales por llamada (default 3)
+#   S3_CONFLICTO_INTENTOS     intentos por cambio del manifiesto si hay conflicto (default 5)
+
+import os
+import logging
+import random
+import threading
+import time
+
+from cache_s3 import CACHE_S3
+from codec_rutinas import (a_json, de_json, codificar_rutina, decodificar_rutina,
+                           entrada_manifiesto, nuevo_id)
+from indice_nombres import IndiceNombres, indice_para
+from indice_atributos import IndiceAtributos, atributos_para
+
+S3_REGION = os.environ.get("S3_PERSISTENCE_REGION")
+S3_BUCKET = os.environ.get("S3_PERSISTENCE_BUCKET")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+
+_cliente = None
+_lock_cliente = threading.Lock()
+
+
+# Cuántas escrituras condicionales perdieron contra otra sesión y cuántos
+# cambios se rindieron después de S3_CONFLICTO_INTENTOS
+ESTADISTICAS_CONFLICTOS = {"conflictos": 0, "agotados": 0}
+
+
+class ConflictoEscritura(Exception):
+    # Otra sesión cambió el objeto entre nuestra lectura y la escritura
+    pass
+
+
+def _env_num(nombre, default, tipo=float):
+    try:
+        return tipo(os.environ.get(nombre, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _config_s3():
+    # Config de botocore armada desde las variables de entorno
+    from botocore.config import Config
+    extra = {}
+    if S3_ENDPOINT_URL:
+        # Los S3 locales no tienen DNS por bucket
+        extra["s3"] = {"addressing_style": "path"}
+    return Config(
+        max_pool_connections=_env_num("S3_MAX_POOL_CONNECTIONS", 10, int),
+        connect_timeout=_env_num("S3_CONNECT_TIMEOUT", 2.0),
+        read_timeout=_env_num("S3_READ_TIMEOUT", 3.0),
+        retries={"mode": os.environ.get("S3_RETRY_MODE", "standard"),
+                 "max_attempts": _env_num("S3_MAX_ATTEMPTS", 3, int)},
+        tcp_keepalive=True,
+        **extra,
+    )
+
+
+def _get_s3_client():
+    # Regresa el cliente compartido de S3, o None si no hay bucket configurado
+    global _cliente
+    if not S3_BUCKET:
+        return None
+    if _cliente is not None:
+        return _cliente
+    with _lock_cliente:
+        if _cliente is not None:
+            return _cliente
+        try:
+            import boto3
+        except Exception:
+            return None
+        try:
+            kwargs = {"config": _config_s3()}
+            if S3_REGION:
+                kwargs["region_name"] = S3_REGION
+            if S3_ENDPOINT_URL:
+                kwargs["endpoint_url"] = S3_ENDPOINT_URL
+            # Sesión propia: boto3.client() usa una sesión global que no es thread-safe
+            _cliente = boto3.session.Session().client("s3", **kwargs)
+        except Exception as e:
+            logging.error("Error creando cliente S3: %r", e)
+            return None
+        return _cliente
+
+
+def _key_usuario(user_id):
+    # Archivo único del formato anterior (solo se lee para migrar)
+    return f"{user_id}/rutinas_guardadas.json" if user_id else "rutinas_guardadas.json"
+
+
+def _prefijo(user_id):
+    return f"{user_id}/rutinas/" if user_id else "rutinas/"
+
+
+def _key_manifiesto(user_id):
+    return _prefijo(user_id) + "manifiesto.json"
+
+
+def _key_rutina(user_id, rutina_id):
+    return f"{_prefijo(user_id)}{rutina_id}.json"
+
+
+def _codigo_error(e):
+    try:
+        return str(e.response["Error"]["Code"])
+    except Exception:
+        return ""
+
+
+def _leer_objeto(cli, key, inmutable=False):
+    # Regresa los bytes del objeto o None si no existe
+    return _leer_con_etag(cli, key, inmutable=inmutable)[0]
+
+
+def _leer_con_etag(cli, key, revalidar=False, inmutable=False):
+    # GET con cache: con copia local preguntamos a S3 con If-None-Match y
+    # solo bajamos el cuerpo si cambió (un 304 no trae cuerpo). Los objetos
+    # inmutables (cada rutina: un id nuevo por cada guardado) se usan sin
+    # preguntar mientras la copia sea reciente; el manifiesto no, porque otro
+    # dispositivo pudo guardar o borrar. Regresa (bytes o None, ETag o None).
+    entrada = CACHE_S3.obtener(key)
+    if inmutable and not revalidar and CACHE_S3.fresca(entrada):
+        return entrada.cuerpo, entrada.etag
+    kwargs = {}
+    if entrada is not None and entrada.etag:
+        kwargs["IfNoneMatch"] = entrada.etag
+        CACHE_S3.stats["revalidaciones"] += 1
+    try:
+        resp = cli.get_object(Bucket=S3_BUCKET, Key=key, **kwargs)
+    except Exception as e:
+        codigo = _codigo_error(e)
+        if codigo in ("304", "NotModified"):
+            CACHE_S3.revalidada(key, entrada)
+            return entrada.cuerpo, entrada.etag
+        if codigo in ("NoSuchKey", "404"):
+            CACHE_S3.guardar(key, None, None)
+            return None, None
+        if entrada is not None and not revalidar:
+            # S3 no contestó bien: mejor la copia que teníamos que nada
+            return entrada.cuerpo, entrada.etag
+        raise
+    cuerpo = resp["Body"].read()
+    CACHE_S3.guardar(key, resp.get("ETag"), cuerpo)
+    return cuerpo, resp.get("ETag")
+
+
+def _escribir_objeto(cli, key, cuerpo, content_encoding=None, if_match=None, if_none_match=None):
+    # PUT; con if_match / if_none_match es condicional y, si otra sesión ganó,
+    # lanza ConflictoEscritura
+    kwargs = {"ContentType": "application/json"}
+    if content_encoding:
+        kwargs["ContentEncoding"] = content_encoding
+    if if_match:
+        kwargs["IfMatch"] = if_match
+    if if_none_match:
+        kwargs["IfNoneMatch"] = if_none_match
+    try:
+        resp = cli.put_object(Bucket=S3_BUCKET, Key=key, Body=cuerpo, **kwargs)
+    except Exception as e:
+        if _codigo_error(e) in ("PreconditionFailed", "412", "ConditionalRequestConflict", "409"):
+            raise ConflictoEscritura(key) from e
+        raise
+    CACHE_S3.guardar(key, resp.get("ETag"), cuerpo, escritura=True)
+    return resp.get("ETag")
+
+
+def _borrar_objeto(cli, key):
+    cli.delete_object(Bucket=S3_BUCKET, Key=key)
+    CACHE_S3.guardar(key, None, None, escritura=True)
+
+
+def _escribir_manifiesto(cli, user_id, entradas, etag=None):
+    # Solo escribe si el manifiesto sigue en la versión que leímos (etag), o
+    # si todavía no existe cuando etag es None
+    return _escribir_objeto(cli, _key_manifiesto(user_id), a_json({"v": 1, "rutinas": entradas}),
+                            if_match=etag, if_none_match=None if etag else "*")
+
+
+def _escribir_rutina_nueva(cli, user_id, rutina):
+    # Sube la rutina con un id nuevo y regresa su entrada para el manifiesto
+    rid = nuevo_id()
+    cuerpo, encoding = codificar_rutina(rutina)
+    _escribir_objeto(cli, _key_rutina(user_id, rid), cuerpo, encoding, if_none_match="*")
+    return entrada_manifiesto(rid, rutina, cuerpo)
+
+
+def _migrar_formato_anterior(cli, user_id):
+    # Convierte {user_id}/rutinas_guardadas.json al formato de un objeto por
+    # rutina. Regresa (entradas, etag) del manifiesto nuevo (([], None) si no
+    # había nada que migrar).
+    data = de_json(_leer_objeto(cli, _key_usuario(user_id)))
+    if not isinstance(data, list) or not data:
+        return [], None
+    entradas = [_escribir_rutina_nueva(cli, user_id, r) for r in data if isinstance(r, dict)]
+    try:
+        etag = _escribir_manifiesto(cli, user_id, entradas)
+    except ConflictoEscritura:
+        # Otra sesión migró al mismo tiempo: nos quedamos con su manifiesto
+        for e in entradas:
+            _borrar_objeto(cli, _key_rutina(user_id, e["id"]))
+        return _leer_manifiesto(cli, user_id, revalidar=True)
+    try:
+        _borrar_objeto(cli, _key_usuario(user_id))
+    except Exception as e:
+        # No pasa nada si queda: ya no se vuelve a leer porque existe el manifiesto
+        logging.warning("No se pudo borrar el archivo anterior de rutinas: %r", e)
+    return entradas, etag
+
+
+def _leer_manifiesto(cli, user_id, revalidar=False):
+    # Regresa (entradas, etag); etag None si el manifiesto no existe
+    cuerpo, etag = _leer_con_etag(cli, _key_manifiesto(user_id), revalidar)
+    return _entradas_manifiesto(cli, user_id, cuerpo, etag)
+
+
+def _entradas_manifiesto(cli, user_id, cuerpo, etag):
+    # (entradas, etag) a partir del cuerpo del manifiesto ya leído
+    data = de_json(cuerpo)
+    if data is None:
+        return _migrar_formato_anterior(cli, user_id)
+    entradas = data.get("rutinas") if isinstance(data, dict) else None
+    return [e for e in (entradas or []) if isinstance(e, dict) and e.get("id")], etag
+
+
+def _actualizar_manifiesto(cli, user_id, cambio):
+    # Lee el manifiesto, le aplica cambio(entradas) -> entradas nuevas (o None
+    # si no hay nada que escribir) y lo escribe condicionado al ETag leído. Si
+    # otra sesión escribió antes, reintenta con el manifiesto nuevo.
+    intentos = max(1, _env_num("S3_CONFLICTO_INTENTOS", 5, int))
+    for intento in range(intentos):
+        entradas, etag = _leer_manifiesto(cli, user_id, revalidar=intento > 0)
+        nuevas = cambio(list(entradas))
+        if nuevas is None:
+            return None
+        try:
+            _escribir_manifiesto(cli, user_id, nuevas, etag)
+            return nuevas
+        except ConflictoEscritura:
+            ESTADISTICAS_CONFLICTOS["conflictos"] += 1
+            logging.info("Conflicto escribiendo el manifiesto de %s (intento %d)", user_id, intento + 1)
+            # Espera corta y aleatoria para no chocar otra vez con la misma sesión
+            time.sleep(random.uniform(0, 0.02 * (2 ** intento)))
+    ESTADISTICAS_CONFLICTOS["agotados"] += 1
+    raise ConflictoEscritura(_key_manifiesto(user_id))
+
+
+def listar_rutinas(user_id):
+    # Regresa las entradas del manifiesto [{"id", "nombre", "bytes", "creado"}],
+    # sin bajar las rutinas
+    cli = _get_s3_client()
+    if not cli:
+        return []
+    try:
+        return _leer_manifiesto(cli, user_id)[0]
+    except Exception as e:
+        print("Error leyendo manifiesto de rutinas:", repr(e))
+        return []
+
+
+def _indice(user_id, para, vacio):
+    # Índice armado desde el manifiesto; solo se vuelve a armar cuando cambia
+    # el ETag del manifiesto
+    cli = _get_s3_client()
+    if not cli:
+        return vacio([])
+    try:
+        # Un solo GET condicional; el cuerpo solo se parsea si cambió el ETag
+        cuerpo, etag = _leer_con_etag(cli, _key_manifiesto(user_id))
+        return para(user_id, etag, lambda: _entradas_manifiesto(cli, user_id, cuerpo, etag)[0])
+    except Exception as e:
+        print("Error leyendo manifiesto de rutinas:", repr(e))
+        return vacio([])
+
+
+def indice_rutinas(user_id):
+    # Índice de nombres (indice_nombres.IndiceNombres) de las rutinas del usuario
+    return _indice(user_id, indice_para, IndiceNombres)
+
+
+def atributos_rutinas(user_id):
+    # Índice por tipo, nivel, duración y fecha (indice_atributos.IndiceAtributos)
+    return _indice(user_id, atributos_para, IndiceAtributos)
+
+
+def leer_rutina(user_id, rutina_id):
+    # Regresa {"nombre", "texto"} de una rutina guardada, o None
+    cli = _get_s3_client()
+    if not cli or not rutina_id:
+        return None
+    try:
+        return decodificar_rutina(_leer_objeto(cli, _key_rutina(user_id, rutina_id), inmutable=True))
+    except Exception as e:
+        print("Error leyendo rutina:", repr(e))
+        return None
+
+
+def agregar_rutina(user_id, rutina):
+    # Guarda una rutina nueva ({"nombre", "texto"} y, si se tiene, la
+    # "estructura" de codec_rutinas): su propio objeto y una entrada en el
+    # manifiesto. Regresa el id, o None si no hay S3 configurado.
+    cli = _get_s3_client()
+    if not cli:
+        return None
+    entrada = _escribir_rutina_nueva(cli, user_id, rutina)
+    try:
+        _actualizar_manifiesto(cli, user_id, lambda entradas: entradas + [entrada])
+    except Exception:
+        CACHE_S3.olvidar(_key_manifiesto(user_id))
+        raise
+    return entrada["id"]
+
+
+def borrar_rutina(user_id, rutina_id):
+    # Quita la rutina del manifiesto y después borra su objeto
+    cli = _get_s3_client()
+    if not cli:
+        return False
+    def quitar(entradas):
+        nuevas = [e for e in entradas if e.get("id") != rutina_id]
+        return nuevas if len(nuevas) < len(entradas) else None
+
+    try:
+        if _actualizar_manifiesto(cli, user_id, quitar) is None:
+            return False
+    except Exception:
+        CACHE_S3.olvidar(_key_manifiesto(user_id))
+        raise
+    try:
+        _borrar_objeto(cli, _key_rutina(user_id, rutina_id))
+    except Exception as e:
+        # El manifiesto ya no la menciona; el objeto huérfano no estorba
+        logging.warning("No se pudo borrar el objeto de la rutina: %r", e)
+    return True
+
+
+def cargar_rutinas_guardadas(user_id):
+    # Lista completa [{"id", "nombre", "texto"}] del usuario; si falla, regresa lista vacía
+    out = []
+    for e in listar_rutinas(user_id):
+        r = leer_rutina(user_id, e["id"])
+        if r is not None:
+            out.append(dict(r, id=e["id"]))
+    return out
+
+
+def guardar_rutinas_guardadas(user_id, data):
+    """Reemplaza la biblioteca completa del usuario por la lista data."""
+    cli = _get_s3_client()
+    if not cli:
+        return
+    subidas = {}    # índice en data -> entrada ya subida (no se repite al reintentar)
+    quitadas = []
+
+    def reemplazar(anteriores):
+        por_id = {e["id"]: e for e in anteriores}
+        entradas = []
+        for i, r in enumerate(data or []):
+            if not isinstance(r, dict):
+                continue
+            # Las rutinas que ya existían (mismo id) no se vuelven a subir
+            if r.get("id") in por_id:
+                entradas.append(por_id[r["id"]])
+                continue
+            if i not in subidas:
+                subidas[i] = _escribir_rutina_nueva(cli, user_id, r)
+            entradas.append(subidas[i])
+        quitadas[:] = set(por_id) - {e["id"] for e in entradas}
+        return entradas
+
+    try:
+        _actualizar_manifiesto(cli, user_id, reemplazar)
+        for rid in quitadas:
+            _borrar_objeto(cli, _key_rutina(user_id, rid))
+    except Exception:
+        # Si no se puede guardar, no rompemos la skill; la copia local ya no es confiable
+        CACHE_S3.olvidar(_key_manifiesto(user_id))
@@ -0,0 +1,118 @@
+# Precarga en segundo plano de la biblioteca del usuario
+#
+# Casi todas las sesiones abren la skill (LaunchRequest) y luego dicen "ver
+# rutinas". Al abrir lanzamos en un pool de hilos la lectura del manifiesto,
+# el índice de nombres y las rutinas más recientes, y guardamos el resultado
+# por user_id mientras el contenedor siga caliente. El siguiente turno lo
+# encuentra listo; si todavía está en camino espera a lo más PRECARGA_ESPERA
+# segundos y, si no llegó (o falló), lee de forma normal. La espera cuenta
+# desde la primera consulta, así un turno que consulta varias veces (índice y
+# luego rutina) no la paga dos veces. Qué parte del resultado se puede usar
+# más de una vez lo decide quien lo arma (almacen_rutinas: el manifiesto solo
+# una vez, las rutinas mientras dure PRECARGA_TTL).
+#
+# En Lambda el contenedor se congela al terminar la invocación: si la
+# precarga no alcanzó a terminar, sigue en cuanto llega el siguiente turno.
+#
+# Variables de entorno:
+#   PRECARGA_HILOS     hilos del pool (default 4)
+#   PRECARGA_ESPERA    segundos máximos que se espera una precarga (default 0.15)
+#   PRECARGA_TTL       segundos que se guarda un resultado (default 30)
+#   PRECARGA_MAX       usuarios guardados (default 128)
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FuturoTardio
+
+
+class _Precarga:
+    __slots__ = ("futuro", "inicio", "limite")
+
+    def __init__(self, futuro):
+        self.futuro = futuro
+        self.inicio = time.monotonic()
+        self.limite = None   # hasta cuándo se espera; se fija en la primera consulta
+
+
+class PrecargaRutinas:
+    def __init__(self, hilos=4, espera=0.15, ttl=30.0, capacidad=128):
+        self.hilos = max(1, int(hilos))
+        self.espera = float(espera)
+        self.ttl = float(ttl)
+        self.capacidad = max(1, int(capacidad))
+        self._pool = None
+        self._datos = OrderedDict()   # user_id -> _Precarga
+        self._lock = threading.Lock()
+        self.stats = {"iniciadas": 0, "listas": 0, "esperadas": 0, "tardias": 0, "fallidas": 0}
+
+    def _ejecutor(self):
+        # El pool se crea la primera vez, no al importar (arranque en frío)
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="precarga")
+        return self._pool
+
+    def _vigente(self, p):
+        return p is not None and time.monotonic() - p.inicio < self.ttl
+
+    def iniciar(self, user_id, cargar):
+        # Lanza cargar() en segundo plano, salvo que ya haya una precarga vigente
+        if user_id is None:
+            return
+        with self._lock:
+            if self._vigente(self._datos.get(user_id)):
+                return
+            p = _Precarga(self._ejecutor().submit(cargar))
+            self._datos[user_id] = p
+            self._datos.move_to_end(user_id)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+            self.stats["iniciadas"] += 1
+
+    def lanzar(self, tarea):
+        # Trabajo extra en el mismo pool del que nadie espera el resultado
+        # (p. ej. bajar rutinas cuando el manifiesto ya está listo)
+        return self._ejecutor().submit(tarea)
+
+    def resultado(self, user_id):
+        # Lo que regresó cargar(), o None si no hay precarga vigente, si falló
+        # o si no terminó dentro de la espera permitida
+        with self._lock:
+            p = self._datos.get(user_id)
+        if not self._vigente(p):
+            return None
+        espera = 0
+        if not p.futuro.done():
+            ahora = time.monotonic()
+            if p.limite is None:
+                p.limite = ahora + self.espera
+            espera = max(0.0, p.limite - ahora)
+            self.stats["esperadas"] += 1
+        try:
+            res = p.futuro.result(timeout=espera)
+        except FuturoTardio:
+            self.stats["tardias"] += 1
+            return None
+        except Exception as e:
+            self.stats["fallidas"] += 1
+            logging.warning("La precarga de rutinas falló: %r", e)
+            self.olvidar(user_id)
+            return None
+        self.stats["listas"] += 1
+        return res
+
+    def olvidar(self, user_id):
+        # La biblioteca cambió (guardar, borrar): lo precargado ya no sirve
+        with self._lock:
+            self._datos.pop(user_id, None)
+
+
+PRECARGA = PrecargaRutinas(
+    hilos=int(os.environ.get("PRECARGA_HILOS", "4")),
+    espera=float(os.environ.get("PRECARGA_ESPERA", "0.15")),
+    ttl=float(os.environ.get("PRECARGA_TTL", "30")),
+    capacidad=int(os.environ.get("PRECARGA_MAX", "128")),
+)
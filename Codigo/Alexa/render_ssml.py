@@ -0,0 +1,138 @@
+# Texto (SSML) que Alexa lee de una rutina, armado con fragmentos en cache
+#
+# resumen_y_texto armaba cada línea en cada llamada: f-strings, str(), las
+# claves de respaldo (title/nombre, segundos/duracion, decir/descripcion) y
+# el join. Pero un mismo paso (mismo título, segundos y frase) da siempre el
+# mismo fragmento para cualquier usuario, y desde compilador_rutinas los pasos
+# son Paso compartidos. Aquí el fragmento de cada Paso se arma una sola vez
+# (ya escapado para SSML) y se guarda; los "Paso N: " con la pausa entre
+# pasos también están armados de antemano. Una rutina es la concatenación de
+# esos fragmentos.
+#
+# La cache se vacía cuando cambia la versión del catálogo (preparar) y en
+# ese momento se arman los fragmentos de los pasos del catálogo en cada nivel
+# y de los descansos, que son los que salen en casi todas las rutinas.
+#
+# Alexa no acepta respuestas de más de 8000 caracteres de SSML. Al armar el
+# texto se deja espacio (RESERVA_SSML) para la pregunta que agregan los
+# handlers y las etiquetas <speak>; si no cabe, se dejan fuera los últimos
+# pasos y se registra en el log.
+#
+# SSML_PAUSA_MS pone un <break> de ese largo entre los pasos. En 0 (default)
+# los pasos se separan con un espacio, igual que siempre, y el texto sale
+# idéntico al de antes (bench_ssml.py lo revisa).
+
+import logging
+import os
+from xml.sax.saxutils import escape
+
+from catalogo import TipoPaso
+from compilador_rutinas import (Paso, REGLAS_NIVEL, REGLAS_IMC, POOL_UPPER, POOL_LOWER,
+                                FRASE_DESCANSO, ajustar_descanso, ajustar_ejercicio,
+                                es_descanso, paso_de_dict, segundos_descanso)
+
+# Límite de Alexa para outputSpeech de tipo SSML
+LIMITE_SSML = 8000
+# "<speak></speak>" y la pregunta que se agrega después ("¿Te gusta la rutina? ...")
+RESERVA_SSML = 200
+# Como antes: a lo más 12 pasos para evitar respuestas muy largas
+MAX_PASOS = 12
+PAUSA_MS = int(os.environ.get("SSML_PAUSA_MS", "0"))
+# Cuántos fragmentos se guardan antes de vaciar la cache
+MAX_FRAGMENTOS = int(os.environ.get("SSML_MAX_FRAGMENTOS", "4096"))
+
+
+def fragmento_paso(t, s, d):
+    # "Flexiones, 30 segundos. Espalda recta." (sin el "Paso N: ")
+    linea = escape(t) + (f", {s} segundos." if s else ".")
+    if d:
+        linea += " " + escape(d)
+    return linea
+
+
+class SsmlRenderer:
+    def __init__(self, pausa_ms=PAUSA_MS, limite=LIMITE_SSML, reserva=RESERVA_SSML,
+                 max_pasos=MAX_PASOS, capacidad=MAX_FRAGMENTOS):
+        self.separador = f' <break time="{pausa_ms}ms"/> ' if pausa_ms else " "
+        # " Paso 1: ", " Paso 2: "... con la pausa incluida
+        self._prefijos = [f"{self.separador}Paso {i}: " for i in range(1, max_pasos + 1)]
+        self.limite = limite - reserva
+        self.capacidad = capacidad
+        self.version = None
+        self._fragmentos = {}
+        self.stats = {"aciertos": 0, "fallos": 0, "recortes": 0, "preparados": 0}
+
+    def preparar(self, data):
+        """Arma los fragmentos de los pasos del catálogo (una vez por versión)."""
+        version = getattr(data, "version", None)
+        if version == self.version:
+            return
+        self._fragmentos = {}
+        self.version = version
+        # El calentamiento va tal cual; los demás pasos con los segundos de cada nivel
+        for p in data.get("warmup", []):
+            self.fragmento(paso_de_dict(p))
+        pasos = list(data.get("warmup", [])) + list(data.get("cooldown", []))
+        for lista in (data.get("sets") or {}).values():
+            pasos += list(lista)
+        for regla in REGLAS_NIVEL.values():
+            for p in pasos + POOL_UPPER + POOL_LOWER:
+                if not es_descanso(p):
+                    self.fragmento(ajustar_ejercicio(p, regla))
+        # Los descansos de cada nivel, con y sin sobrepeso, en cada categoría de IMC
+        for nivel in REGLAS_NIVEL:
+            for sobre in (False, True):
+                base = {"title": "Descanso", "segundos": segundos_descanso(nivel, sobre),
+                        "decir": FRASE_DESCANSO}
+                for cat in list(REGLAS_IMC) + [None]:
+                    self.fragmento(ajustar_descanso(base, cat))
+        self.stats["preparados"] = len(self._fragmentos)
+
+    def fragmento(self, paso):
+        # Fragmento de un Paso; se arma la primera vez y después sale de la cache
+        frag = self._fragmentos.get(paso)
+        if frag is not None:
+            self.stats["aciertos"] += 1
+            return frag
+        self.stats["fallos"] += 1
+        if len(self._fragmentos) >= self.capacidad:
+            self._fragmentos = {}
+        frag = fragmento_paso(paso.title.strip(), paso.segundos, paso.decir.strip())
+        self._fragmentos[paso] = frag
+        return frag
+
+    def _fragmento_de(self, p):
+        if isinstance(p, Paso):
+            return self.fragmento(p)
+        if isinstance(p, dict):
+            # Pasos sueltos como dict (rutinas viejas): se vuelven Paso compartidos
+            return self.fragmento(paso_de_dict(p, TipoPaso.EJERCICIO))
+        return fragmento_paso(str(p).strip(), 0, "")
+
+    def texto(self, rutina):
+        """Texto que Alexa lee de la rutina: el título y luego "Paso N: ..."."""
+        pasos = []
+        resumen = "Rutina generada."
+        if isinstance(rutina, dict):
+            pasos = rutina.get("pasos", []) or rutina.get("rutina", [])
+            resumen = rutina.get("titulo") or rutina.get("resumen") or resumen
+        elif isinstance(rutina, list):
+            pasos = rutina
+
+        partes = [escape(str(resumen).strip())]
+        largo = len(partes[0])
+        for prefijo, p in zip(self._prefijos, pasos):
+            frag = self._fragmento_de(p)
+            largo += len(prefijo) + len(frag)
+            if largo > self.limite:
+                self.stats["recortes"] += 1
+                logging.warning("La rutina no cabe en %d caracteres de SSML; se leen %d pasos",
+                                self.limite, (len(partes) - 1) // 2)
+                break
+            partes.append(prefijo)
+            partes.append(frag)
+        return "".join(partes)
+
+
+# Uno por contenedor
+RENDER_SSML = SsmlRenderer()
@@ -0,0 +1,63 @@
+# Reproducción de la rutina paso a paso, un paso por turno
+#
+# Al generar una rutina Alexa la lee completa en una sola respuesta, y como
+# se leen a lo más MAX_PASOS, a las rutinas largas (DIFICIL: calentamiento,
+# 8 ejercicios y 7 descansos) les faltan los últimos pasos. Al reproducirla
+# cada respuesta lee un solo paso: "siguiente", "repite", "pausa" y
+# "¿cuánto falta?".
+#
+# En sesión solo va el cursor {'i': paso actual, 'pausa': bool}; la rutina
+# se vuelve a armar de la descripción que ya está en sesión (sale de la
+# cache). Lo que falta sale de las sumas acumuladas de los segundos, que se
+# calculan una vez por rutina (plan_reproduccion).
+
+from functools import lru_cache
+from itertools import accumulate
+from typing import NamedTuple
+
+from compilador_rutinas import Paso, paso_de_dict
+from render_ssml import RENDER_SSML
+
+
+class PlanReproduccion(NamedTuple):
+    pasos: tuple
+    # acumulados[i]: segundos antes del paso i; acumulados[-1] es el total
+    acumulados: tuple
+
+    def faltan_segundos(self, i):
+        # Del inicio del paso i al final de la rutina
+        return self.acumulados[-1] - self.acumulados[i]
+
+
+@lru_cache(maxsize=256)
+def _plan(pasos):
+    return PlanReproduccion(pasos, tuple(accumulate((p.segundos for p in pasos), initial=0)))
+
+
+def plan_reproduccion(rutina):
+    # Los pasos son Paso compartidos, así que la misma rutina da el mismo plan
+    pasos = (rutina or {}).get("pasos") or []
+    return _plan(tuple(p if isinstance(p, Paso) else paso_de_dict(p) for p in pasos))
+
+
+def duracion_a_texto(segundos):
+    minutos, seg = divmod(int(segundos), 60)
+    partes = []
+    if minutos:
+        partes.append("un minuto" if minutos == 1 else f"{minutos} minutos")
+    if seg or not minutos:
+        partes.append("un segundo" if seg == 1 else f"{seg} segundos")
+    return " y ".join(partes)
+
+
+def texto_paso(plan, i):
+    # "Paso 3 de 16: Flexiones, 30 segundos. Espalda recta."
+    return f"Paso {i + 1} de {len(plan.pasos)}: {RENDER_SSML.fragmento(plan.pasos[i])}"
+
+
+def texto_falta(plan, i):
+    restantes = len(plan.pasos) - i
+    if restantes == 1:
+        return f"Solo queda este paso: {duracion_a_texto(plan.faltan_segundos(i))}."
+    return (f"Vas en el paso {i + 1} de {len(plan.pasos)}. Contando este, faltan "
+            f"{restantes} pasos, unos {duracion_a_texto(plan.faltan_segundos(i))}.")
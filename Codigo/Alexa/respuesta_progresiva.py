@@ -0,0 +1,172 @@
+# Respuestas progresivas mientras se lee o escribe en el almacén
+#
+# "ver rutinas", "ver rutina", "borrar rutina" y guardar una rutina esperan
+# al almacén (S3) antes de decir algo, y el usuario solo oye silencio. Si se
+# espera que la operación tarde más de PROGRESIVA_UMBRAL_MS, mandamos una
+# respuesta progresiva ("Buscando tus rutinas…") por el servicio de
+# directivas de Alexa (VoicePlayer.Speak) en un hilo aparte, al mismo tiempo
+# que la operación; Alexa la dice mientras la Lambda sigue trabajando.
+#
+# Cuánto se espera que tarde cada operación es un promedio móvil de lo que
+# han tardado en este contenedor (con caches calientes o precarga baja solo,
+# y deja de avisar). Antes de la primera medición se supone
+# PROGRESIVA_LATENCIA_INICIAL_MS en almacenes remotos y 0 en los locales.
+#
+# La directiva tiene que llegar antes que la respuesta final: al terminar la
+# operación se espera el envío a lo más PROGRESIVA_ESPERA segundos. Si no hay
+# apiEndpoint o token (simulador, pruebas) no se manda nada.
+#
+# La directiva la arma y la manda DirectiveServiceClient del SDK; la llamada
+# HTTP la hace un ApiClient con urllib en lugar del DefaultApiClient (que
+# importa requests y solo acepta https). Solo se permite http hacia la misma
+# máquina, para el servicio local de Benchmarks/directivas_local.py.
+#
+# Variables de entorno:
+#   PROGRESIVA_UMBRAL_MS            latencia esperada desde la que se avisa (default 300)
+#   PROGRESIVA_LATENCIA_INICIAL_MS  latencia supuesta antes de medir (default 500)
+#   PROGRESIVA_ESPERA               segundos máximos que se espera el envío (default 1.0)
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+UMBRAL_MS = float(os.environ.get("PROGRESIVA_UMBRAL_MS", "300"))
+LATENCIA_INICIAL_MS = float(os.environ.get("PROGRESIVA_LATENCIA_INICIAL_MS", "500"))
+ESPERA = float(os.environ.get("PROGRESIVA_ESPERA", "1.0"))
+# Peso de la última medición en el promedio móvil
+ALFA = 0.3
+
+
+HOSTS_LOCALES = ("127.0.0.1", "localhost", "::1")
+
+
+def crear_cliente_api(timeout):
+    # ApiClient del SDK con urllib; se arma al mandar la primera directiva
+    import urllib.request
+    from urllib.error import HTTPError
+    from ask_sdk_model.services import ApiClient, ApiClientResponse
+
+    class ClienteApiUrllib(ApiClient):
+        def invoke(self, request):
+            partes = urlsplit(request.url)
+            if partes.scheme != "https" and partes.hostname not in HOSTS_LOCALES:
+                raise ValueError(f"Solo se aceptan endpoints https: {request.url}")
+            headers = dict(request.headers or [])
+            cuerpo = request.body
+            if cuerpo is not None and not isinstance(cuerpo, (bytes, str)):
+                cuerpo = json.dumps(cuerpo)
+            if isinstance(cuerpo, str):
+                cuerpo = cuerpo.encode("utf-8")
+            req = urllib.request.Request(request.url, data=cuerpo, headers=headers,
+                                         method=request.method)
+            try:
+                with urllib.request.urlopen(req, timeout=timeout) as resp:
+                    return ApiClientResponse(headers=list(resp.headers.items()),
+                                             status_code=resp.status,
+                                             body=resp.read().decode("utf-8"))
+            except HTTPError as e:
+                # El SDK traduce el status a su error
+                return ApiClientResponse(headers=list(e.headers.items()), status_code=e.code,
+                                         body=e.read().decode("utf-8"))
+
+    return ClienteApiUrllib()
+
+
+class LatenciasAlmacen:
+    # Promedio móvil (ms) de cada operación del almacén
+    def __init__(self, alfa=ALFA):
+        self.alfa = alfa
+        self._ms = {}
+        self._lock = threading.Lock()
+
+    def esperada(self, operacion, inicial):
+        return self._ms.get(operacion, inicial)
+
+    def registrar(self, operacion, ms):
+        with self._lock:
+            previa = self._ms.get(operacion)
+            self._ms[operacion] = ms if previa is None else previa + self.alfa * (ms - previa)
+
+
+class RespuestaProgresiva:
+    def __init__(self, umbral_ms=UMBRAL_MS, inicial_ms=LATENCIA_INICIAL_MS, espera=ESPERA):
+        self.umbral_ms = float(umbral_ms)
+        self.inicial_ms = float(inicial_ms)
+        self.espera = float(espera)
+        self.latencias = LatenciasAlmacen()
+        self._pool = None
+        self._cliente_api = None
+        self.stats = {"enviadas": 0, "fallidas": 0, "tardias": 0, "omitidas": 0}
+
+    def _ejecutor(self):
+        # El pool se crea la primera vez, no al importar (arranque en frío)
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="progresiva")
+        return self._pool
+
+    def _enviar(self, endpoint, token, request_id, texto):
+        # Lo que hace handler_input.service_client_factory.get_directive_service(),
+        # sin tener que armar la skill con un ApiClient
+        from ask_sdk_core.serialize import DefaultSerializer
+        from ask_sdk_model.services import ApiConfiguration
+        from ask_sdk_model.services.directive import (DirectiveServiceClient, Header,
+                                                      SendDirectiveRequest, SpeakDirective)
+        if self._cliente_api is None:
+            self._cliente_api = crear_cliente_api(self.espera)
+        config = ApiConfiguration(serializer=DefaultSerializer(), api_client=self._cliente_api,
+                                  authorization_value=token, api_endpoint=endpoint)
+        DirectiveServiceClient(config).enqueue(SendDirectiveRequest(
+            header=Header(request_id=request_id), directive=SpeakDirective(speech=texto)))
+
+    def iniciar(self, handler_input, texto):
+        # Manda la directiva en segundo plano; regresa el futuro o None
+        try:
+            sistema = handler_input.request_envelope.context.system
+            endpoint, token = sistema.api_endpoint, sistema.api_access_token
+            request_id = handler_input.request_envelope.request.request_id
+        except AttributeError:
+            return None
+        if not (endpoint and token and request_id):
+            self.stats["omitidas"] += 1
+            return None
+        return self._ejecutor().submit(self._enviar, endpoint, token, request_id, texto)
+
+    def terminar(self, futuro):
+        # Espera el envío antes de la respuesta final; un fallo no cambia la respuesta
+        from concurrent.futures import TimeoutError as EnvioTardio
+        try:
+            futuro.result(timeout=self.espera)
+            self.stats["enviadas"] += 1
+        except EnvioTardio:
+            self.stats["tardias"] += 1
+            logging.warning("La respuesta progresiva no terminó en %.1f s", self.espera)
+        except Exception as e:
+            self.stats["fallidas"] += 1
+            logging.warning("No se pudo mandar la respuesta progresiva: %r", e)
+
+    @contextmanager
+    def avisar_mientras(self, handler_input, operacion, texto, remoto=True):
+        """Dice texto mientras corre el bloque, si se espera que tarde.
+
+        remoto: si el almacén es remoto (para la latencia supuesta al inicio).
+        """
+        inicial = self.inicial_ms if remoto else 0.0
+        futuro = None
+        if self.latencias.esperada(operacion, inicial) >= self.umbral_ms:
+            futuro = self.iniciar(handler_input, texto)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencias.registrar(operacion, (time.perf_counter() - t0) * 1000)
+            if futuro is not None:
+                self.terminar(futuro)
+
+
+# Una por contenedor
+PROGRESIVA = RespuestaProgresiva()
@@ -1,21 +1,7 @@
 from selector_sets import elegir_set
-
-def segundos_descanso(nivel, sobrepeso):
-    nivel_texto = (nivel or "").upper()
-    if nivel_texto == "FACIL":
-        base = 15
-    elif nivel_texto == "MEDIO":
-        base = 20
-    elif nivel_texto == "DIFICIL":
-        base = 25
-    else:
-        base = 15
-
-    # Si la persona tiene sobrepeso, se aumenta un poco el descanso
-    if sobrepeso:
-        base = base + 5
-
-    return base
+from catalogo import obtener_catalogo
+# La regla de descansos vive en compilador_rutinas (una sola tabla para todos)
+from compilador_rutinas import segundos_descanso, FRASE_DESCANSO
 
 def insertar_descansos(pasos, descanso_s):
     out = []
@@ -25,11 +11,14 @@ def insertar_descansos(pasos, descanso_s):
             out.append({
                 "title": "Descanso",
                 "segundos": int(descanso_s),
-                "decir": "Hidrátate y respira."
+                "decir": FRASE_DESCANSO
             })
     return out
 
 def crear_rutina_desde_data(data, nivel, tipo, sobrepeso):
+    # Sin data usamos el catálogo compartido del contenedor
+    if data is None:
+        data = obtener_catalogo()
     warmup = data.get("warmup", [])
     cooldown = data.get("cooldown", [])
     set_main = elegir_set(data, nivel=nivel, tipo=tipo, sobrepeso=sobrepeso)
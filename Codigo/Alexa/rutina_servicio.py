@@ -1,9 +1,12 @@
 from imc import calc_imc_cm, es_sobrepeso
 from rutina_creador import crear_rutina_desde_data
+from catalogo import obtener_catalogo
+from compilador_rutinas import compilar_rutina, segundos_descanso, FRASE_DESCANSO
 
 class RoutineFacade:
-    def __init__(self, data, strategy=None):
-        self.data = data
+    def __init__(self, data=None, strategy=None):
+        # Sin data usamos el catálogo compartido (se carga una vez por contenedor)
+        self.data = data if data is not None else obtener_catalogo()
         self.strategy = strategy  # puede ser None
 
     def generar_rutina(self, nivel, tipo, peso, estatura_cm):
@@ -18,9 +21,8 @@ class RoutineFacade:
         cooldown = self.data.get("cooldown", [])
         set_main = self.strategy.elegir(self.data, nivel=nivel, tipo=tipo, sobrepeso=sobre)
 
-        descanso = {"FACIL": 15, "INTERMEDIO": 20, "DIFICIL": 25}.get((nivel or "").upper(), 15)
-        if sobre:
-            descanso += 5
+        # Misma tabla de descansos que el compilador
+        descanso = segundos_descanso(nivel, sobre)
 
         pasos = list(warmup) + list(set_main) + list(cooldown)
 
@@ -31,11 +33,21 @@ class RoutineFacade:
                 pasos_con_descanso.append({
                     "title": "Descanso",
                     "segundos": int(descanso),
-                    "decir": "Hidrátate y respira."
+                    "decir": FRASE_DESCANSO
                 })
 
         return {"titulo": f"Rutina {tipo} {nivel}", "pasos": pasos_con_descanso}
 
+    def compilar_rutina(self, nivel, tipo, peso, estatura_cm, categoria):
+        # Rutina final (recortada o rellenada por nivel, descansos por IMC) en
+        # una pasada; es la que usa la skill. Sin strategy se usa el set tal cual
+        strategy = self.strategy
+        if strategy is None:
+            from modos_rutina import SimpleKeyStrategy
+            from selector_sets import elegir_set
+            strategy = SimpleKeyStrategy(elegir_set)
+        return compilar_rutina(self.data, nivel, tipo, peso, estatura_cm, categoria, strategy)
+
     def duracion_estimada_seg(self, rutina):
         return sum(p.get("segundos", 0) for p in rutina.get("pasos", []))
 
@@ -0,0 +1,124 @@
+# Tabla precalculada de todas las rutinas del modo manual
+#
+# En modo manual solo hay 2 tipos x 3 niveles x 4 categorías de IMC, y la
+# rutina no tiene nada aleatorio. Por eso en el build corremos todo el proceso
+# (RoutineFacade -> compilador_rutinas -> resumen_y_texto) para cada
+# combinación y lo guardamos en rutinas_precalculadas.json. En la Lambda solo
+# se busca la clave en un dict.
+#
+# Generar:   python rutinas_precalculadas.py
+# Verificar: python rutinas_precalculadas.py --verificar
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+from imc import calc_imc_cm, es_sobrepeso
+
+HERE = Path(__file__).parent
+RUTA_TABLA = HERE / "rutinas_precalculadas.json"
+
+TIPOS = ("UPPER", "LOWER")
+NIVELES = ("FACIL", "MEDIO", "DIFICIL")
+# Peso y estatura de ejemplo que caen en cada categoría de _clasificar_por_imc_valor
+EJEMPLOS_IMC = {
+    "BAJO_PESO": (50.0, 170),
+    "NORMAL": (65.0, 170),
+    "SOBREPESO": (80.0, 170),
+    "OBESIDAD": (100.0, 170),
+}
+
+
+def clave_tabla(tipo, nivel, cat, sobre):
+    return f"{tipo}|{nivel}|{cat}|{int(bool(sobre))}"
+
+
+# --- Lectura en la Lambda ---
+_lock = threading.Lock()
+_tabla = None
+_version_catalogo = None
+
+
+def _leer_tabla(catalogo, ruta):
+    # Solo usamos la tabla si se generó con este mismo routines.json
+    try:
+        contenido = json.loads(Path(ruta).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if contenido.get("catalogo") != catalogo.firma:
+        print("WARN rutinas_precalculadas.json no corresponde al catálogo; se ignora")
+        return {}
+    # Los pasos vuelven a ser Paso compartidos (los mismos que arma el compilador)
+    from compilador_rutinas import rutina_de_dict
+    return {clave: {"rutina": rutina_de_dict(e["rutina"]), "texto": e["texto"]}
+            for clave, e in (contenido.get("rutinas") or {}).items()}
+
+
+def buscar_precalculada(catalogo, tipo, nivel, cat, sobre, ruta=None):
+    # Regresa {"rutina": ..., "texto": ...} o None si no está en la tabla
+    global _tabla, _version_catalogo
+    if _tabla is None or _version_catalogo != catalogo.version:
+        with _lock:
+            if _tabla is None or _version_catalogo != catalogo.version:
+                _tabla = _leer_tabla(catalogo, ruta or RUTA_TABLA)
+                _version_catalogo = catalogo.version
+    return _tabla.get(clave_tabla(tipo, nivel, cat, sobre))
+
+
+# --- Generación y verificación (build) ---
+def generar_tabla():
+    # Corre la generación real para cada combinación, sin caches
+    import lambda_function as lf
+    from compilador_rutinas import rutina_a_dict
+    data = lf.cargar_data()
+    rutinas = {}
+    for tipo in TIPOS:
+        for nivel in NIVELES:
+            for cat, (peso, est) in EJEMPLOS_IMC.items():
+                sobre = es_sobrepeso(calc_imc_cm(peso, est))
+                rutina, texto = lf.generar_rutina_completa("manual", peso, est, nivel, tipo,
+                                                           data=data, cat=cat)
+                rutinas[clave_tabla(tipo, nivel, cat, sobre)] = {"rutina": rutina_a_dict(rutina),
+                                                                 "texto": texto}
+    return {"catalogo": data.firma, "rutinas": rutinas}
+
+
+def escribir_tabla(ruta=None):
+    ruta = Path(ruta or RUTA_TABLA)
+    tabla = generar_tabla()
+    ruta.write_text(json.dumps(tabla, ensure_ascii=False, separators=(",", ":"), sort_keys=True),
+                    encoding="utf-8")
+    return len(tabla["rutinas"])
+
+
+def verificar_tabla(ruta=None):
+    # Compara la tabla guardada contra la generación en vivo; regresa la
+    # lista de problemas (vacía si todo coincide)
+    try:
+        guardada = json.loads(Path(ruta or RUTA_TABLA).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        return [f"no se pudo leer la tabla: {e!r}"]
+    viva = json.loads(json.dumps(generar_tabla(), ensure_ascii=False))
+    problemas = []
+    if guardada.get("catalogo") != viva["catalogo"]:
+        problemas.append("la tabla se generó con otro routines.json")
+    for clave, entrada in viva["rutinas"].items():
+        otra = guardada.get("rutinas", {}).get(clave)
+        if otra is None:
+            problemas.append(f"{clave}: falta en la tabla")
+        elif otra != entrada:
+            problemas.append(f"{clave}: no coincide con la generación en vivo")
+    for clave in set(guardada.get("rutinas", {})) - set(viva["rutinas"]):
+        problemas.append(f"{clave}: sobra en la tabla")
+    return problemas
+
+
+if __name__ == "__main__":
+    if "--verificar" in sys.argv[1:]:
+        problemas = verificar_tabla()
+        for p in problemas:
+            print(p)
+        print("OK" if not problemas else f"{len(problemas)} diferencias")
+        sys.exit(1 if problemas else 0)
+    print(f"{escribir_tabla()} rutinas escritas en {RUTA_TABLA}")
@@ -1,4 +1,9 @@
+from catalogo import obtener_catalogo
+
 def elegir_set(data, nivel, tipo, sobrepeso):
+    # Sin data usamos el catálogo compartido del contenedor
+    if data is None:
+        data = obtener_catalogo()
     # normalizo entradas 
     nivel = (nivel or "FACIL").upper()
     tipo  = (tipo  or "UPPER").upper()
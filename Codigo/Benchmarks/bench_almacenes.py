@@ -0,0 +1,106 @@
+# Benchmark compartido de los almacenes de rutinas (almacen_rutinas)
+#
+# Corre la misma carga contra cada backend: varios usuarios guardan rutinas
+# desde varios hilos, después listan, leen cada rutina, buscan por nombre y
+# borran la mitad. Reporta por operación las operaciones por segundo y la
+# latencia p50 / p95. El backend s3 habla con el S3 local (s3_local.py), con
+# la latencia por petición que se le indique; ese servidor corre en el mismo
+# proceso y compite por el GIL con los hilos del benchmark, así que sus números
+# sirven para comparar cambios, no como tiempos reales de S3.
+#
+# Uso: python bench_almacenes.py [--backends memoria,archivos,sqlite,s3]
+#                                [--usuarios 8] [--rutinas 25] [--hilos 8] [--latencia-ms 0]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+from s3_local import ServidorS3Local, configurar_entorno  # noqa: E402
+
+
+def rutina_de_ejemplo():
+    import codec_rutinas
+    import lambda_function as lf
+    with contextlib.redirect_stdout(io.StringIO()):
+        rutina, texto = lf.GenerarRutinaIntentHandler()._generar_rutina("manual", 70, 170, "MEDIO", "LOWER")
+    params = {"modo": "manual", "tipo": "LOWER", "nivel": "MEDIO"}
+    return {"texto": texto, "estructura": codec_rutinas.estructura_rutina(rutina, params)}
+
+
+def fase(hilos, tareas):
+    # Corre las tareas en paralelo; regresa ops/s y latencias en ms
+    def medir(tarea):
+        t0 = time.perf_counter()
+        tarea()
+        return (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ex:
+        tiempos = sorted(ex.map(medir, tareas))
+    total = time.perf_counter() - t0
+    return {"ops": len(tiempos), "ops_s": round(len(tiempos) / total, 1),
+            "ms_p50": round(statistics.median(tiempos), 3),
+            "ms_p95": round(tiempos[int(len(tiempos) * 0.95)], 3)}
+
+
+def correr(almacen, base, args):
+    usuarios = [f"amzn1.ask.account.bench{u}" for u in range(args.usuarios)]
+    res = {}
+    ids = {u: [] for u in usuarios}
+
+    def guardar(u, i):
+        return lambda: ids[u].append(almacen.agregar(u, dict(base, nombre=f"Rutina {i} de {u[-6:]}")))
+
+    res["agregar"] = fase(args.hilos, [guardar(u, i) for i in range(args.rutinas) for u in usuarios])
+    res["listar"] = fase(args.hilos, [lambda u=u: almacen.listar(u) for u in usuarios for _ in range(5)])
+    res["leer"] = fase(args.hilos, [lambda u=u, r=r: almacen.leer(u, r)
+                                    for j in range(args.rutinas) for u in usuarios for r in ids[u][j:j + 1]])
+    res["buscar_nombre"] = fase(args.hilos, [
+        lambda u=u, i=i: almacen.indice_nombres(u).mejor(f"rutina {i} de {u[-6:]}")
+        for u in usuarios for i in range(args.rutinas)])
+    # Intercalado por usuario: cada hilo casi siempre trabaja con un usuario distinto
+    res["borrar"] = fase(args.hilos, [lambda u=u, r=r: almacen.borrar(u, r)
+                                      for j in range(0, args.rutinas, 2) for u in usuarios
+                                      for r in ids[u][j:j + 1]])
+    esperadas = args.rutinas - len(range(0, args.rutinas, 2))
+    res["ok"] = all(len(almacen.listar(u)) == esperadas for u in usuarios)
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", default="memoria,archivos,sqlite,s3")
+    ap.add_argument("--usuarios", type=int, default=8)
+    ap.add_argument("--rutinas", type=int, default=25)
+    ap.add_argument("--hilos", type=int, default=8)
+    ap.add_argument("--latencia-ms", type=float, default=0.0)
+    args = ap.parse_args()
+
+    salida = {}
+    with tempfile.TemporaryDirectory() as tmp, ServidorS3Local(args.latencia_ms / 1000) as s3:
+        configurar_entorno(s3.url)
+        os.environ["S3_CACHE_DIR"] = str(Path(tmp) / "cache_s3")
+        os.environ["S3_MAX_POOL_CONNECTIONS"] = str(args.hilos)
+        os.environ["RUTINAS_DIR"] = str(Path(tmp) / "archivos")
+        os.environ["RUTINAS_SQLITE"] = str(Path(tmp) / "rutinas.sqlite3")
+        import almacen_rutinas
+        base = rutina_de_ejemplo()
+        for backend in args.backends.split(","):
+            salida[backend] = correr(almacen_rutinas.crear_almacen(backend), base, args)
+    print(json.dumps(salida, indent=2))
+
+
+if __name__ == "__main__":
+    main()
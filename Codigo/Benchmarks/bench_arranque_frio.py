@@ -0,0 +1,78 @@
+# Benchmark de arranque en frío de la Lambda
+#
+# Cada corrida es un proceso nuevo de Python (como un contenedor nuevo):
+# medimos cuánto tarda `import lambda_function` y la primera invocación
+# (LaunchRequest + GenerarRutinaIntent). "Antes" es el paquete publicado en
+# Descarga/lambda.zip y "después" es Codigo/Alexa.
+#
+# Uso: python bench_arranque_frio.py [--corridas 15] [--antes DIR] [--despues DIR]
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+RAIZ = AQUI.parent.parent
+
+SONDA = r"""
+import json, sys, time
+sys.path.insert(0, {dir!r})
+sys.path.insert(0, {bench!r})
+import sobres
+t0 = time.perf_counter()
+import lambda_function
+t1 = time.perf_counter()
+lambda_function.lambda_handler(sobres.launch(), None)
+t2 = time.perf_counter()
+lambda_function.lambda_handler(sobres.intent("GenerarRutinaIntent", {{
+    "peso_kg": "70", "estatura_cm": "170", "modo": "manual", "tipo": "upper", "nivel": "medio"}}), None)
+t3 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "launch_ms": (t2 - t1) * 1000,
+                  "generar_ms": (t3 - t2) * 1000,
+                  "modulos": len(sys.modules),
+                  "boto3": "boto3" in sys.modules}}))
+"""
+
+
+def medir(directorio, corridas):
+    resultados = []
+    for _ in range(corridas):
+        codigo = SONDA.format(dir=str(directorio), bench=str(AQUI))
+        out = subprocess.run([sys.executable, "-c", codigo], capture_output=True,
+                             text=True, check=True, cwd=str(directorio))
+        resultados.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    resumen = {}
+    for campo in ("import_ms", "launch_ms", "generar_ms"):
+        valores = sorted(r[campo] for r in resultados)
+        resumen[campo] = {"p50": round(statistics.median(valores), 2),
+                          "min": round(valores[0], 2), "max": round(valores[-1], 2)}
+    resumen["modulos"] = resultados[-1]["modulos"]
+    resumen["boto3_importado"] = resultados[-1]["boto3"]
+    return resumen
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corridas", type=int, default=15)
+    ap.add_argument("--antes", help="carpeta con la versión anterior (por defecto Descarga/lambda.zip)")
+    ap.add_argument("--despues", default=str(RAIZ / "Codigo" / "Alexa"))
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        antes = args.antes
+        if not antes:
+            with zipfile.ZipFile(RAIZ / "Descarga" / "lambda.zip") as z:
+                z.extractall(tmp)
+            antes = str(Path(tmp) / "lambda")
+        reporte = {"antes": medir(antes, args.corridas),
+                   "despues": medir(args.despues, args.corridas)}
+    print(json.dumps(reporte, indent=2))
+
+
+if __name__ == "__main__":
+    main()
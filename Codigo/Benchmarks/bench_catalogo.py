@@ -0,0 +1,93 @@
+# Benchmark de carga del catálogo: routines.json vs routines.bin (mmap)
+#
+# Genera catálogos sintéticos de 12 a 10,000 sets con el mismo formato que
+# routines.json, los compila y mide en un proceso nuevo el tiempo de carga
+# (obtener_catalogo + leer un set) y cuánta memoria RSS agrega.
+#
+# Uso: python bench_catalogo.py [--tamanos 12,100,1000,10000] [--corridas 5]
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+import catalogo_binario  # noqa: E402
+
+SONDA = r"""
+import json, sys, time
+sys.path.insert(0, {alexa!r})
+def rss_kb():
+    for linea in open("/proc/self/status"):
+        if linea.startswith("VmRSS:"):
+            return int(linea.split()[1])
+    return 0
+import catalogo
+antes = rss_kb()
+t0 = time.perf_counter()
+c = catalogo.obtener_catalogo({json_path!r}, ruta_binario={bin_path!r})
+pasos = c["sets"].get({clave!r})
+t1 = time.perf_counter()
+print(json.dumps({{"ms": (t1 - t0) * 1000, "rss_kb": rss_kb() - antes,
+                  "binario": catalogo.estadisticas_catalogo()["cargas_binario"], "pasos": len(pasos)}}))
+"""
+
+
+def catalogo_sintetico(n_sets):
+    base = json.loads((ALEXA / "routines.json").read_text(encoding="utf-8"))
+    originales = list(base["sets"].items())
+    sets = {}
+    for i in range(n_sets):
+        clave, pasos = originales[i % len(originales)]
+        if i >= len(originales):
+            clave = f"{clave}_V{i}"
+            pasos = [dict(p, title=f"{p['title']} {i % 97}") for p in pasos]
+        sets[clave] = pasos
+    return {"warmup": base["warmup"], "cooldown": base["cooldown"], "sets": sets}
+
+
+def correr(json_path, bin_path, clave, corridas):
+    res = []
+    for _ in range(corridas):
+        codigo = SONDA.format(alexa=str(ALEXA), json_path=str(json_path),
+                              bin_path=str(bin_path), clave=clave)
+        out = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+        res.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {"ms_p50": round(statistics.median(r["ms"] for r in res), 3),
+            "rss_kb_p50": statistics.median(r["rss_kb"] for r in res),
+            "uso_binario": bool(res[-1]["binario"])}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tamanos", default="12,100,1000,10000")
+    ap.add_argument("--corridas", type=int, default=5)
+    args = ap.parse_args()
+
+    filas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in [int(x) for x in args.tamanos.split(",")]:
+            json_path = Path(tmp) / f"catalogo_{n}.json"
+            bin_path = Path(tmp) / f"catalogo_{n}.bin"
+            json_path.write_text(json.dumps(catalogo_sintetico(n), ensure_ascii=False, indent=2),
+                                 encoding="utf-8")
+            tam_bin = catalogo_binario.compilar(json_path, bin_path)
+            clave = "UPPER_INTERMEDIO_NO_SOBREPESO"
+            filas.append({
+                "sets": n,
+                "bytes_json": json_path.stat().st_size,
+                "bytes_bin": tam_bin,
+                "json": correr(json_path, Path(tmp) / "no_existe.bin", clave, args.corridas),
+                "bin": correr(json_path, bin_path, clave, args.corridas),
+            })
+    print(json.dumps(filas, indent=2))
+
+
+if __name__ == "__main__":
+    main()
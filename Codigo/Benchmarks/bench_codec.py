@@ -0,0 +1,110 @@
+# Benchmark del formato de rutinas guardadas (codec_rutinas)
+#
+# Arma bibliotecas de 1 a 1000 rutinas generadas de verdad (modo manual y
+# aleatorio) y compara, por tamaño de biblioteca, los bytes guardados y el
+# tiempo de codificar y decodificar todo con cada formato:
+#   anterior     una sola lista en JSON con indent=2 (rutinas_guardadas.json)
+#   texto        un objeto por rutina, JSON compacto con el texto completo
+#   texto_gzip   lo mismo, siempre en gzip
+#   estructura   lo que guarda ahora la skill (parámetros + pasos, gzip si conviene)
+#
+# Uso: python bench_codec.py [--tamanos 1,10,100,1000] [--repeticiones 3]
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+import codec_rutinas  # noqa: E402
+import lambda_function as lf  # noqa: E402
+
+
+def biblioteca(n, semilla=7):
+    rng = random.Random(semilla)
+    gen = lf.GenerarRutinaIntentHandler()
+    out = []
+    # generar_rutina_completa imprime la categoría de IMC
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(n):
+            modo = rng.choice(["manual", "random"])
+            tipo = rng.choice(["UPPER", "LOWER"])
+            nivel = rng.choice(["FACIL", "MEDIO", "DIFICIL"])
+            peso = rng.choice([50, 65, 80, 100])
+            # Con semilla la biblioteca sale igual en cada corrida
+            seed = rng.getrandbits(32) if modo == "random" else None
+            rutina, texto = gen._generar_rutina(modo, peso, 170, nivel, tipo, seed=seed)
+            params = {"modo": modo, "tipo": tipo, "nivel": nivel, "semilla": seed}
+            out.append({"nombre": f"Rutina {i}", "texto": texto,
+                        "estructura": codec_rutinas.estructura_rutina(rutina, params)})
+    return out
+
+
+def _texto(r):
+    return {"v": 2, "nombre": r["nombre"], "texto": r["texto"]}
+
+
+FORMATOS = {
+    "anterior": (
+        lambda rs: [json.dumps([{"nombre": r["nombre"], "texto": r["texto"]} for r in rs],
+                               ensure_ascii=False, indent=2).encode("utf-8")],
+        lambda cuerpos: json.loads(cuerpos[0].decode("utf-8")),
+    ),
+    "texto": (
+        lambda rs: [codec_rutinas.a_json(_texto(r)) for r in rs],
+        lambda cuerpos: [codec_rutinas.decodificar_rutina(c) for c in cuerpos],
+    ),
+    "texto_gzip": (
+        lambda rs: [gzip.compress(codec_rutinas.a_json(_texto(r)), 6, mtime=0) for r in rs],
+        lambda cuerpos: [codec_rutinas.decodificar_rutina(c) for c in cuerpos],
+    ),
+    "estructura": (
+        lambda rs: [codec_rutinas.codificar_rutina(r)[0] for r in rs],
+        lambda cuerpos: [codec_rutinas.decodificar_rutina(c) for c in cuerpos],
+    ),
+}
+
+
+def medir(func, arg, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        res = func(arg)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return res, mejor * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tamanos", default="1,10,100,1000")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args()
+
+    tamanos = [int(x) for x in args.tamanos.split(",")]
+    todas = biblioteca(max(tamanos))
+    filas = []
+    for n in tamanos:
+        rs = todas[:n]
+        fila = {"rutinas": n}
+        for nombre, (codificar, decodificar) in FORMATOS.items():
+            cuerpos, ms_cod = medir(codificar, rs, args.repeticiones)
+            leidas, ms_dec = medir(decodificar, cuerpos, args.repeticiones)
+            # Lo que se lee tiene que ser exactamente lo que escuchó el usuario
+            assert [r["texto"] for r in leidas] == [r["texto"] for r in rs], nombre
+            fila[nombre] = {"bytes": sum(len(c) for c in cuerpos),
+                            "ms_codificar": round(ms_cod, 3), "ms_decodificar": round(ms_dec, 3)}
+        filas.append(fila)
+    print(json.dumps({"encoder": "orjson" if codec_rutinas.orjson else "json",
+                      "filas": filas}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Benchmark del compilador de rutinas contra la cadena anterior
+#
+# La cadena anterior (RoutineFacade.generar_rutina -> ajustar_por_nivel_y_tipo
+# -> ajustar_descansos_por_imc) está copiada abajo tal como estaba en
+# lambda_function.py. Para cada tipo, nivel, categoría de IMC y estrategia
+# (manual, variantes y aleatorio con semilla) revisa que las dos den
+# exactamente la misma rutina (mismo título y mismos pasos), y después
+# compara el tiempo por rutina, la memoria pico (tracemalloc) y cuánta
+# memoria ocupa un lote de rutinas guardadas, como en CACHE_RUTINAS (los
+# pasos del compilador son Paso compartidos; los de antes, un dict por paso).
+#
+# Uso: python bench_compilador.py [--repeticiones 2000]
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+from catalogo import obtener_catalogo  # noqa: E402
+from compilador_rutinas import POOL_UPPER, POOL_LOWER, compilar_rutina, es_descanso, es_calentamiento  # noqa: E402
+from modos_rutina import crear_strategy  # noqa: E402
+from rutina_servicio import RoutineFacade  # noqa: E402
+from selector_sets import elegir_set  # noqa: E402
+
+TIPOS = ("UPPER", "LOWER")
+NIVELES = ("FACIL", "MEDIO", "DIFICIL")
+# (peso, estatura, categoría) de cada categoría de IMC
+PERSONAS = [(50, 170, "BAJO_PESO"), (65, 170, "NORMAL"), (80, 170, "SOBREPESO"), (100, 170, "OBESIDAD")]
+
+
+# --- Cadena anterior (copiada de lambda_function.py) ---
+def _safe_int(x, default=0):
+    # Convierte a int, si falla regresa default
+    try:
+        return int(float(x))
+    except Exception:
+        return default
+
+
+def normalizar_segundos_ejercicio(p, nivel):
+    """Ajusta los segundos de ejercicios (no descanso) por nivel."""
+    base = _safe_int(p.get("segundos", p.get("duracion", 30)), 30)
+    if es_descanso(p): return p
+    if nivel == "FACIL":  base = max(20, int(round(base * 0.8)))
+    if nivel == "MEDIO":  base = max(25, int(round(base * 1.0)))
+    if nivel == "DIFICIL":base = max(35, int(round(base * 1.2)))
+    p["segundos"] = base
+    return p
+
+
+def ajustar_por_nivel_y_tipo(rutina, nivel, tipo):
+    """Ajusta cuántos ejercicios hay y cuánto duran según nivel y tipo."""
+    if not isinstance(rutina, dict):
+        return rutina
+    pasos = list(rutina.get("pasos", []))
+    if not pasos:
+        return rutina
+
+    # Separamos calentamiento, descansos y ejercicios
+    calent = [p for p in pasos if es_calentamiento(p)]
+    rests  = [p for p in pasos if es_descanso(p)]
+    exs    = [p for p in pasos if (not es_descanso(p) and not es_calentamiento(p))]
+
+    # Número objetivo de ejercicios según nivel
+    objetivo = {"FACIL":4, "MEDIO":6, "DIFICIL":8}.get(nivel, 6)
+
+    # Recortamos o rellenamos ejercicios para llegar al objetivo
+    if len(exs) > objetivo:
+        exs = exs[:objetivo]
+    elif len(exs) < objetivo:
+        pool = POOL_UPPER if tipo == "UPPER" else POOL_LOWER
+        i = 0
+        while len(exs) < objetivo and i < len(pool)*2:
+            exs.append(dict(pool[i % len(pool)]))  # copia del pool
+            i += 1
+
+    # Ajustamos duración de cada ejercicio por nivel
+    exs = [normalizar_segundos_ejercicio(dict(p), nivel) for p in exs]
+
+    # Armamos la rutina: calentamiento (si hay) + [ejercicio, descanso]...
+    rest_template = next((r for r in rests), {"title":"Descanso", "segundos":20, "decir":""})
+    nueva = []
+    if calent:
+        for c in calent[:1]:
+            nueva.append(dict(c))
+    for idx, e in enumerate(exs, 1):
+        nueva.append(e)
+        if idx < len(exs):
+            nueva.append(dict(rest_template))
+    rutina["pasos"] = nueva
+    if "titulo" not in rutina:
+        rutina["titulo"] = f"Rutina {tipo.title()} - {nivel.title()}"
+    return rutina
+
+
+def ajustar_descansos_por_imc(rutina, categoria):
+    # Ajusta los descansos según la categoría de IMC
+    if not isinstance(rutina, dict): return rutina
+    pasos = rutina.get("pasos")
+    if not isinstance(pasos, list): return rutina
+    cat = (categoria or "").upper()
+
+    for p in pasos:
+        if es_descanso(p):
+            s = _safe_int(p.get("segundos", 0), 0)
+            # Solo tocamos descansos; el nivel ya se aplicó antes
+            if cat in ("SOBREPESO", "OBESIDAD"):
+                s = max(30, s + 15)
+            elif cat == "NORMAL":
+                s = max(10, s - 5)
+            p["segundos"] = int(s)
+    return rutina
+
+# Pool de ejercicios base por tipo (para rellenar si falta)
+
+def intentar_generar(facade, peso, est, nivel, tipo):
+    """Llama al facade para generar una rutina con esos parámetros."""
+    intentos = [
+        dict(peso_kg=peso, estatura_cm=est, nivel=nivel, tipo=tipo),
+    ]
+    errores = []
+    for kwargs in intentos:
+        try:
+            rutina = facade.generar_rutina(kwargs.get("nivel"), kwargs.get("tipo"), kwargs.get("peso_kg"), kwargs.get("estatura_cm"))
+            return rutina, errores
+        except Exception as e:
+            errores.append(str(e))
+    return None, errores
+
+def rutina_fallback(tipo, nivel):
+    # Rutina de respaldo por si la generación falla
+    objetivo = {"FACIL":4, "MEDIO":6, "DIFICIL":8}.get(nivel, 6)
+    base = [{"title":"Calentamiento", "segundos":60, "decir":"Movilidad articular suave."}]
+    pool = POOL_UPPER if tipo == "UPPER" else POOL_LOWER
+    exs = [dict(pool[i % len(pool)]) for i in range(objetivo)]
+    rest = {"title":"Descanso", "segundos":20, "decir":""}
+    pasos = []
+    pasos += base
+    for i, e in enumerate(exs, 1):
+        e = normalizar_segundos_ejercicio(e, nivel)
+        pasos.append(e)
+        if i < len(exs):
+            pasos.append(dict(rest))
+    return {"titulo": f"Rutina {tipo.title()} - {nivel.title()}", "pasos": pasos}
+
+
+
+def cadena_anterior(data, nivel, tipo, peso, est, cat, strategy):
+    facade = RoutineFacade(data, strategy=strategy)
+    rutina, errs = intentar_generar(facade, peso, est, nivel, tipo)
+    if rutina is None:
+        rutina = rutina_fallback(tipo or "UPPER", nivel)
+    rutina = ajustar_por_nivel_y_tipo(rutina, nivel, tipo or "UPPER")
+    return ajustar_descansos_por_imc(rutina, cat)
+
+
+def compilador(data, nivel, tipo, peso, est, cat, strategy):
+    return compilar_rutina(data, nivel, tipo, peso, est, cat, strategy)
+
+
+class _Falla:
+    # Estrategia que falla, para revisar la rutina de respaldo
+    def elegir(self, *args, **kwargs):
+        raise RuntimeError("sin set")
+
+
+def casos():
+    # (nivel, tipo, peso, estatura, categoría, función que crea la estrategia);
+    # la estrategia se crea en cada corrida para que la semilla baraje igual
+    estrategias = [lambda: crear_strategy("manual", elegir_set), _Falla]
+    estrategias += [lambda v=v: crear_strategy("random", elegir_set, variante=v, posiciones=6)
+                    for v in range(0, 120, 17)]
+    estrategias += [lambda s=s: crear_strategy("random", elegir_set, seed=s) for s in range(5)]
+    for tipo in TIPOS:
+        for nivel in NIVELES:
+            for peso, est, cat in PERSONAS:
+                for hacer in estrategias:
+                    yield nivel, tipo, peso, est, cat, hacer
+
+
+def _comparable(rutina):
+    pasos = [(p.get("title"), int(p.get("segundos") or 0), p.get("decir") or "") for p in rutina["pasos"]]
+    return rutina["titulo"], pasos
+
+
+def medir(func, data, lista, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        args = lista[i % len(lista)]
+        t0 = time.perf_counter()
+        func(data, *args[:-1], args[-1]())
+        tiempos.append((time.perf_counter() - t0) * 1e6)
+    tiempos.sort()
+    picos = []
+    for args in lista[:50]:
+        st = args[-1]()
+        tracemalloc.start()
+        func(data, *args[:-1], st)
+        picos.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    # Lote que se queda en memoria: lo que ocupa cada rutina guardada
+    estrategias = [args[-1]() for args in lista]
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    lote = [func(data, *args[:-1], st) for args, st in zip(lista, estrategias)]
+    retenido = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+    return {"us_p50": round(statistics.median(tiempos), 2),
+            "us_p95": round(tiempos[int(len(tiempos) * 0.95)], 2),
+            "bytes_pico_p50": int(statistics.median(picos)),
+            "bytes_por_rutina_en_lote": int(retenido / len(lote))}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=2000)
+    args = ap.parse_args()
+
+    data = obtener_catalogo()
+    lista = list(casos())
+    distintas = 0
+    for *args_caso, hacer in lista:
+        a = cadena_anterior(data, *args_caso, hacer())
+        b = compilador(data, *args_caso, hacer())
+        distintas += _comparable(a) != _comparable(b)
+    salida = {"casos": len(lista), "distintas": distintas,
+              "cadena_anterior": medir(cadena_anterior, data, lista, args.repeticiones),
+              "compilador": medir(compilador, data, lista, args.repeticiones)}
+    print(json.dumps(salida, indent=2))
+    if distintas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Benchmark de búsqueda de rutinas por nombre: índice vs recorrido anterior
+#
+# Arma bibliotecas sintéticas de 10 a 10,000 nombres ("Piernas lúnes 17",
+# "Brazos y hombros fuerte 3", ...) y busca nombres como los diría Alexa:
+# tal cual, sin acentos, en mayúsculas, con espacios de más o con una letra
+# cambiada. Compara el tiempo de armar el índice, el tiempo por búsqueda y
+# cuántas veces se encontró la rutina correcta contra el recorrido con
+# subcadenas que usaban antes ElegirRutinaIntent y BorrarRutinaIntent.
+#
+# Uso: python bench_indice_nombres.py [--tamanos 10,100,1000,10000] [--consultas 200]
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+from indice_nombres import IndiceNombres  # noqa: E402
+
+GRUPOS = ["Piernas", "Brazos", "Espalda", "Glúteos", "Pecho", "Cardio", "Abdomen", "Hombros",
+          "Cuerpo completo", "Tren superior", "Tren inferior", "Movilidad"]
+EXTRAS = ["lúnes", "martes", "miércoles", "jueves", "viernes", "sábado", "fuerte", "suave",
+          "rápida", "de la mañana", "de la noche", "en casa", "en el parque", "con banda"]
+
+
+def nombres_sinteticos(n, rng):
+    vistos = set()
+    out = []
+    while len(out) < n:
+        nombre = f"{rng.choice(GRUPOS)} {rng.choice(EXTRAS)}"
+        if rng.random() < 0.5:
+            nombre += f" y {rng.choice(GRUPOS).lower()}"
+        if nombre in vistos:
+            nombre += f" {len(out)}"
+        vistos.add(nombre)
+        out.append(nombre)
+    return out
+
+
+def sin_acentos(s):
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+
+def variante(nombre, rng):
+    # Cómo podría llegar el nombre en el slot de Alexa
+    tipo = rng.choice(["igual", "sin_acentos", "mayusculas", "espacios", "errata"])
+    if tipo == "sin_acentos":
+        return sin_acentos(nombre)
+    if tipo == "mayusculas":
+        return nombre.upper()
+    if tipo == "espacios":
+        return "  " + nombre.replace(" ", "   ") + " "
+    if tipo == "errata":
+        i = rng.randrange(1, len(nombre) - 1)
+        return nombre[:i] + rng.choice("aeiourstn") + nombre[i + 1:]
+    return nombre
+
+
+def buscar_anterior(rutinas, nombre_buscar):
+    # El recorrido que hacían antes los handlers
+    nombre_buscar_low = nombre_buscar.strip().lower()
+    for r in rutinas:
+        nom_low = r.get("nombre", "").lower()
+        if nombre_buscar_low in nom_low or nom_low in nombre_buscar_low:
+            return r
+    return None
+
+
+def medir(func, consultas):
+    tiempos, aciertos = [], 0
+    func(consultas[0][0])  # la primera llamada calienta unicodedata
+    for consulta, esperado in consultas:
+        t0 = time.perf_counter()
+        r = func(consulta)
+        tiempos.append((time.perf_counter() - t0) * 1e6)
+        aciertos += r is not None and r["id"] == esperado
+    tiempos.sort()
+    return {"us_p50": round(statistics.median(tiempos), 1),
+            "us_p95": round(tiempos[int(len(tiempos) * 0.95)], 1),
+            "us_max": round(tiempos[-1], 1),
+            "aciertos": round(aciertos / len(consultas), 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tamanos", default="10,100,1000,10000")
+    ap.add_argument("--consultas", type=int, default=200)
+    args = ap.parse_args()
+
+    filas = []
+    for n in [int(x) for x in args.tamanos.split(",")]:
+        rng = random.Random(n)
+        rutinas = [{"id": str(i), "nombre": nom} for i, nom in enumerate(nombres_sinteticos(n, rng))]
+        consultas = []
+        for _ in range(args.consultas):
+            r = rng.choice(rutinas)
+            consultas.append((variante(r["nombre"], rng), r["id"]))
+
+        t0 = time.perf_counter()
+        indice = IndiceNombres(rutinas)
+        ms_armar = (time.perf_counter() - t0) * 1000
+
+        filas.append({
+            "rutinas": n,
+            "ms_armar_indice": round(ms_armar, 2),
+            "indice": medir(indice.mejor, consultas),
+            "anterior": medir(lambda q: buscar_anterior(rutinas, q), consultas),
+        })
+    print(json.dumps(filas, indent=2))
+
+
+if __name__ == "__main__":
+    main()
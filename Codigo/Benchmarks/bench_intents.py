@@ -0,0 +1,280 @@
+# Latencia por intent del lambda_handler real
+#
+# Corre conversaciones completas, con sobres como los que manda Alexa
+# (sobres.py), contra lambda_function.lambda_handler, con el S3 local en
+# memoria y el servicio de directivas local. Entre todas pasan por cada
+# handler registrado:
+#   manual      LaunchRequest, GenerarRutinaIntent pidiendo cada dato (peso,
+#               estatura, modo, tipo, nivel), "no" (otra rutina), "sí", "sí",
+#               AsignarNombre, la reproducción paso a paso y SessionEnded
+#   aleatorio   GenerarRutinaIntent aleatorio, "no", "sí" y "no" (no guardar)
+#   biblioteca  ver rutinas, siguientes, buscar, ver rutina, borrar rutina,
+#               PesoSolo, EstaturaSolo, ayuda, fallback, cancelar, SessionEnded
+# Cada turno tiene su etiqueta ("GenerarRutinaIntent/pide_peso"...).
+#
+# Reporta por etiqueta:
+#   frio_ms      primera vez en un proceso nuevo (como un contenedor nuevo),
+#                p50/p95/p99 de --corridas-frio procesos; aparte import_ms
+#   caliente_ms  p50/p95/p99/max después de calentar, --repeticiones veces
+#   kb_pico / kb_retenidos  memoria de Python por turno (tracemalloc, en una
+#                pasada aparte para no mover los tiempos)
+#   errores      turnos que terminaron en CatchAllExceptionHandler
+# Todo en JSON; --salida lo guarda y --comparar ANTERIOR.json agrega el
+# cambio de p50/p95 contra otra corrida.
+#
+# Uso: python bench_intents.py [--repeticiones 100] [--corridas-frio 5]
+#                              [--latencia-s3-ms 0] [--salida x.json] [--comparar y.json]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+import sobres  # noqa: E402
+
+USUARIO = "amzn1.ask.account.bench-intents"
+# Lo que contesta CatchAllExceptionHandler
+TEXTO_ERROR = "Ocurrió un problema"
+RUTINAS_INICIALES = 25
+DATOS = {"peso_kg": "70", "estatura_cm": "170"}
+
+
+def guion_manual(k):
+    nombre = f"rutina bench {k}"
+    pasos = [("LaunchRequest", "launch", None)]
+    slots = {}
+    for falta, valor in (("peso_kg", "70"), ("estatura_cm", "170"), ("modo", "manual"),
+                         ("tipo", "piernas"), ("nivel", "difícil")):
+        pasos.append((f"GenerarRutinaIntent/pide_{falta.split('_')[0]}", "GenerarRutinaIntent", dict(slots)))
+        slots[falta] = valor
+    pasos += [
+        ("GenerarRutinaIntent/manual", "GenerarRutinaIntent", slots),
+        ("AMAZON.NoIntent/otra_rutina", "AMAZON.NoIntent", {}),
+        ("AMAZON.YesIntent/le_gusta", "AMAZON.YesIntent", {}),
+        ("AMAZON.YesIntent/guardar", "AMAZON.YesIntent", {}),
+        ("AsignarNombreRutinaIntent", "AsignarNombreRutinaIntent", {"nombre": nombre}),
+        ("EmpezarRutinaIntent", "EmpezarRutinaIntent", {}),
+        ("AMAZON.NextIntent", "AMAZON.NextIntent", {}),
+        ("AMAZON.RepeatIntent", "AMAZON.RepeatIntent", {}),
+        ("CuantoFaltaIntent", "CuantoFaltaIntent", {}),
+        ("SessionEndedRequest", "ended", None),
+    ]
+    return pasos
+
+
+def guion_aleatorio(k):
+    return [
+        ("LaunchRequest", "launch", None),
+        ("GenerarRutinaIntent/aleatorio", "GenerarRutinaIntent", dict(DATOS, modo="aleatorio")),
+        ("AMAZON.NoIntent/otra_rutina", "AMAZON.NoIntent", {}),
+        ("AMAZON.YesIntent/le_gusta", "AMAZON.YesIntent", {}),
+        ("AMAZON.NoIntent/no_guardar", "AMAZON.NoIntent", {}),
+    ]
+
+
+def guion_biblioteca(k):
+    nombre = f"rutina bench {k}"
+    return [
+        ("LaunchRequest", "launch", None),
+        ("VerRutinasIntent", "VerRutinasIntent", {}),
+        ("SiguientesRutinasIntent", "SiguientesRutinasIntent", {}),
+        ("BuscarRutinasIntent", "BuscarRutinasIntent", {"tipo": "piernas", "minutos_max": "20"}),
+        ("ElegirRutinaIntent", "ElegirRutinaIntent", {"nombre": nombre}),
+        ("BorrarRutinaIntent", "BorrarRutinaIntent", {"nombre": nombre}),
+        ("PesoSoloIntent", "PesoSoloIntent", {"peso_kg": "72"}),
+        ("EstaturaSoloIntent", "EstaturaSoloIntent", {"estatura_cm": "168"}),
+        ("AMAZON.HelpIntent", "AMAZON.HelpIntent", {}),
+        ("AMAZON.FallbackIntent", "AMAZON.FallbackIntent", {}),
+        ("AMAZON.CancelIntent", "AMAZON.CancelIntent", {}),
+        ("SessionEndedRequest", "ended", None),
+    ]
+
+
+GUIONES = (guion_manual, guion_aleatorio, guion_biblioteca)
+
+
+def sobre_de(tipo, slots, atributos, endpoint):
+    kw = {"user_id": USUARIO, "atributos": atributos, "api_endpoint": endpoint}
+    if tipo == "launch":
+        return sobres.launch(**kw)
+    if tipo == "ended":
+        return sobres.session_ended(**kw)
+    return sobres.intent(tipo, slots, **kw)
+
+
+def correr_guion(lf, guion, endpoint, medir):
+    # Una conversación; medir(etiqueta, funcion) corre y mide cada turno
+    atributos = {}
+    for etiqueta, tipo, slots in guion:
+        ev = sobre_de(tipo, slots, atributos, endpoint)
+        resp = medir(etiqueta, lambda: lf.lambda_handler(ev, None))
+        if tipo == "launch":
+            atributos = {}
+        atributos = resp.get("sessionAttributes") or atributos
+
+
+def iteracion(lf, k, endpoint, medir):
+    for guion in GUIONES:
+        correr_guion(lf, guion(k), endpoint, medir)
+
+
+@contextlib.contextmanager
+def entorno(latencia_s3_ms):
+    # S3 y directivas locales; la biblioteca del usuario con rutinas de ejemplo
+    from directivas_local import ServidorDirectivasLocal
+    from s3_local import ServidorS3Local, configurar_entorno
+    with tempfile.TemporaryDirectory() as tmp, ServidorS3Local(latencia_s3_ms / 1000) as s3, \
+            ServidorDirectivasLocal() as directivas:
+        configurar_entorno(s3.url)
+        os.environ["S3_CACHE_DIR"] = str(Path(tmp) / "cache_s3")
+        os.environ["RUTINAS_BACKEND"] = "s3"
+        t0 = time.perf_counter()
+        import lambda_function as lf
+        import_ms = (time.perf_counter() - t0) * 1000
+        import almacen_rutinas
+        for i in range(RUTINAS_INICIALES):
+            almacen_rutinas.agregar_rutina(USUARIO, {"nombre": f"piernas {i}", "texto": f"Rutina {i}."})
+        yield lf, directivas.url, import_ms
+
+
+def percentiles(valores, con_max=False):
+    # p50/p95/p99 por rango más cercano
+    v = sorted(valores)
+    if not v:
+        return {}
+    def p(q):
+        return round(v[min(len(v) - 1, max(0, int(round(q / 100 * len(v) + 0.5)) - 1))], 3)
+    out = {"p50": p(50), "p95": p(95), "p99": p(99)}
+    if con_max:
+        out["max"] = round(v[-1], 3)
+    return out
+
+
+def medir_frio(latencia_s3_ms):
+    # Se corre en un proceso nuevo: import y la primera vez de cada etiqueta
+    primeras = {}
+
+    def medir(etiqueta, fn):
+        t0 = time.perf_counter()
+        resp = fn()
+        primeras.setdefault(etiqueta, (time.perf_counter() - t0) * 1000)
+        return resp
+
+    with contextlib.redirect_stdout(io.StringIO()), entorno(latencia_s3_ms) as (lf, endpoint, import_ms):
+        iteracion(lf, 0, endpoint, medir)
+    return {"import_ms": import_ms, "turnos": primeras}
+
+
+def frio(corridas, latencia_s3_ms):
+    resultados = []
+    for _ in range(corridas):
+        out = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--frio-interno",
+                              "--latencia-s3-ms", str(latencia_s3_ms)],
+                             capture_output=True, text=True, check=True)
+        resultados.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return resultados
+
+
+def caliente(repeticiones, latencia_s3_ms):
+    tiempos, memoria, errores = {}, {}, {}
+
+    def medir_tiempo(etiqueta, fn):
+        t0 = time.perf_counter()
+        resp = fn()
+        tiempos.setdefault(etiqueta, []).append((time.perf_counter() - t0) * 1000)
+        voz = ((resp.get("response") or {}).get("outputSpeech") or {}).get("ssml") or ""
+        errores[etiqueta] = errores.get(etiqueta, 0) + (TEXTO_ERROR in voz)
+        return resp
+
+    def medir_memoria(etiqueta, fn):
+        actual = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        resp = fn()
+        despues, pico = tracemalloc.get_traced_memory()
+        m = memoria.setdefault(etiqueta, {"pico": [], "retenidos": []})
+        m["pico"].append((pico - actual) / 1024)
+        m["retenidos"].append((despues - actual) / 1024)
+        return resp
+
+    with contextlib.redirect_stdout(io.StringIO()), entorno(latencia_s3_ms) as (lf, endpoint, _):
+        # Calentamiento: caches, índices y promedios de latencia del almacén
+        for k in range(3):
+            iteracion(lf, k, endpoint, lambda e, fn: fn())
+        for k in range(repeticiones):
+            iteracion(lf, 3 + k, endpoint, medir_tiempo)
+        tracemalloc.start()
+        try:
+            for k in range(5):
+                iteracion(lf, 3 + repeticiones + k, endpoint, medir_memoria)
+        finally:
+            tracemalloc.stop()
+    return tiempos, memoria, errores
+
+
+def comparar(actual, anterior):
+    # Cambio de p50/p95 en caliente contra otra corrida (positivo = más lento)
+    cambios = {}
+    for etiqueta, datos in actual["intents"].items():
+        previo = anterior.get("intents", {}).get(etiqueta, {}).get("caliente_ms")
+        if not previo:
+            continue
+        cambios[etiqueta] = {q: round(datos["caliente_ms"][q] - previo[q], 3)
+                             for q in ("p50", "p95") if previo.get(q)}
+    return cambios
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=100)
+    ap.add_argument("--corridas-frio", type=int, default=5)
+    ap.add_argument("--latencia-s3-ms", type=float, default=0.0)
+    ap.add_argument("--salida")
+    ap.add_argument("--comparar")
+    ap.add_argument("--frio-interno", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.frio_interno:
+        print(json.dumps(medir_frio(args.latencia_s3_ms)))
+        return
+
+    corridas = frio(args.corridas_frio, args.latencia_s3_ms) if args.corridas_frio else []
+    tiempos, memoria, errores = caliente(args.repeticiones, args.latencia_s3_ms)
+    intents = {}
+    for etiqueta, valores in tiempos.items():
+        frios = [c["turnos"][etiqueta] for c in corridas if etiqueta in c["turnos"]]
+        m = memoria.get(etiqueta, {"pico": [0], "retenidos": [0]})
+        intents[etiqueta] = {
+            "n": len(valores),
+            "frio_ms": percentiles(frios),
+            "caliente_ms": percentiles(valores, con_max=True),
+            "kb_pico": round(max(m["pico"]), 1),
+            "kb_retenidos": round(sorted(m["retenidos"])[len(m["retenidos"]) // 2], 1),
+            "errores": errores.get(etiqueta, 0),
+        }
+    reporte = {
+        "config": {"repeticiones": args.repeticiones, "corridas_frio": args.corridas_frio,
+                   "latencia_s3_ms": args.latencia_s3_ms, "python": sys.version.split()[0]},
+        "import_ms": percentiles([c["import_ms"] for c in corridas]),
+        "intents": intents,
+    }
+    if args.comparar:
+        reporte["cambio_contra_anterior"] = comparar(reporte, json.loads(Path(args.comparar).read_text()))
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if args.salida:
+        Path(args.salida).write_text(texto + "\n", encoding="utf-8")
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
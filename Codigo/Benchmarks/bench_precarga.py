@@ -0,0 +1,87 @@
+# Benchmark de la precarga de la biblioteca al abrir la skill (precarga_rutinas)
+#
+# Simula el inicio típico de una sesión contra el S3 local con latencia:
+# LaunchRequest, una pausa mientras Alexa lee el menú, "ver rutinas" y
+# "elegir rutina <nombre>". Cada usuario empieza con la cache de S3 vacía.
+# Compara el tiempo de los dos turnos con y sin precarga, y uno con una
+# pausa tan corta que la precarga no alcanza a terminar (se espera a lo más
+# PRECARGA_ESPERA y se lee como siempre).
+#
+# Uso: python bench_precarga.py [--usuarios 10] [--rutinas 30] [--latencia-ms 40] [--pausa-ms 500]
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+from s3_local import ServidorS3Local, configurar_entorno  # noqa: E402
+from bench_almacenes import rutina_de_ejemplo  # noqa: E402
+
+
+def sesion(almacen_rutinas, user_id, nombre, precargar, pausa):
+    # Regresa (ms de "ver rutinas", ms de "elegir rutina")
+    if precargar:
+        almacen_rutinas.precargar_biblioteca(user_id)
+    time.sleep(pausa)
+    t0 = time.perf_counter()
+    almacen_rutinas.listar_rutinas(user_id)
+    t1 = time.perf_counter()
+    elegida = almacen_rutinas.indice_rutinas(user_id).mejor(nombre)
+    almacen_rutinas.leer_rutina(user_id, elegida["id"])
+    t2 = time.perf_counter()
+    return (t1 - t0) * 1000, (t2 - t1) * 1000
+
+
+def resumen(tiempos):
+    tiempos = sorted(tiempos)
+    return {"ms_p50": round(statistics.median(tiempos), 2), "ms_max": round(tiempos[-1], 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--usuarios", type=int, default=10)
+    ap.add_argument("--rutinas", type=int, default=30)
+    ap.add_argument("--latencia-ms", type=float, default=40.0)
+    ap.add_argument("--pausa-ms", type=float, default=500.0)
+    args = ap.parse_args()
+
+    casos = [("sin_precarga", False, args.pausa_ms), ("con_precarga", True, args.pausa_ms),
+             ("precarga_tardia", True, 0.0)]
+    salida = {}
+    with tempfile.TemporaryDirectory() as tmp, ServidorS3Local(args.latencia_ms / 1000) as s3:
+        configurar_entorno(s3.url)
+        os.environ["S3_CACHE_DIR"] = str(Path(tmp) / "cache_s3")
+        os.environ["RUTINAS_BACKEND"] = "s3"
+        import almacen_rutinas
+        from cache_s3 import CACHE_S3
+        from precarga_rutinas import PRECARGA
+        base = rutina_de_ejemplo()
+
+        for caso, precargar, pausa_ms in casos:
+            usuarios = [f"amzn1.ask.account.{caso}{u}" for u in range(args.usuarios)]
+            for u in usuarios:
+                for i in range(args.rutinas):
+                    almacen_rutinas.agregar_rutina(u, dict(base, nombre=f"Rutina {i} de piernas"))
+            ver, elegir = [], []
+            for u in usuarios:
+                CACHE_S3.limpiar()
+                # La más reciente, que es la que más se vuelve a elegir
+                v, e = sesion(almacen_rutinas, u, f"rutina {args.rutinas - 1} de piernas",
+                              precargar, pausa_ms / 1000)
+                ver.append(v)
+                elegir.append(e)
+            salida[caso] = {"ver_rutinas": resumen(ver), "elegir_rutina": resumen(elegir)}
+        salida["precarga"] = dict(PRECARGA.stats)
+    print(json.dumps(salida, indent=2))
+
+
+if __name__ == "__main__":
+    main()
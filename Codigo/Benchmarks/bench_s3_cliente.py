@@ -0,0 +1,69 @@
+# Microbenchmark del cliente de S3: uno nuevo por llamada vs uno compartido
+#
+# Corre contra el S3 local (s3_local.py). "Antes" imita el código anterior,
+# que llamaba boto3.client("s3") en cada cargar/guardar; "después" usa el
+# cliente compartido de persistencia_s3. Se mide la latencia de cada llamada.
+#
+# Uso: python bench_s3_cliente.py [--llamadas 200] [--latencia-ms 0]
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+sys.path.insert(0, str(AQUI.parent / "Alexa"))
+sys.path.insert(0, str(AQUI))
+
+from s3_local import ServidorS3Local, configurar_entorno  # noqa: E402
+
+
+def percentiles(muestras_ms):
+    m = sorted(muestras_ms)
+    q = statistics.quantiles(m, n=100)
+    return {"p50": round(statistics.median(m), 3), "p95": round(q[94], 3),
+            "p99": round(q[98], 3), "media": round(statistics.fmean(m), 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--llamadas", type=int, default=200)
+    ap.add_argument("--latencia-ms", type=float, default=0.0)
+    args = ap.parse_args()
+
+    with ServidorS3Local(latencia_s=args.latencia_ms / 1000) as s3:
+        configurar_entorno(s3.url)
+        import boto3
+        import persistencia_s3 as p
+
+        rutinas = [{"nombre": f"rutina {i}", "texto": "Paso 1: Sentadillas, 30 segundos."} for i in range(5)]
+        p.guardar_rutinas_guardadas("bench-user", rutinas)
+
+        def cliente_nuevo():
+            return boto3.client("s3", region_name=p.S3_REGION, endpoint_url=p.S3_ENDPOINT_URL,
+                                config=p._config_s3())
+
+        def ciclo(obtener_cliente):
+            # Un turno de guardar: leer el manifiesto y volver a escribirlo
+            # (guardar_rutinas_guardadas ya no escribe el objeto único por usuario)
+            cli = obtener_cliente()
+            cuerpo = cli.get_object(Bucket=p.S3_BUCKET, Key=p._key_manifiesto("bench-user"))["Body"].read()
+            cli = obtener_cliente()
+            cli.put_object(Bucket=p.S3_BUCKET, Key=p._key_manifiesto("bench-user"), Body=cuerpo)
+
+        resultados = {}
+        for nombre, fn in (("cliente_por_llamada", cliente_nuevo), ("cliente_compartido", p._get_s3_client)):
+            ciclo(fn)  # calentamiento
+            muestras = []
+            for _ in range(args.llamadas):
+                t0 = time.perf_counter()
+                ciclo(fn)
+                muestras.append((time.perf_counter() - t0) * 1000)
+            resultados[nombre] = percentiles(muestras)
+    print(json.dumps({"turno_guardar_ms": resultados, "llamadas": args.llamadas}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
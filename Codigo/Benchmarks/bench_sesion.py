@@ -0,0 +1,75 @@
+# Tamaño de los atributos de sesión por turno
+#
+# Alexa manda los atributos de sesión en cada request y los recibe de vuelta
+# en cada respuesta, así que todo lo que se guarda en sesión viaja dos veces
+# por turno. Este script corre conversaciones completas contra el
+# lambda_handler real (crear rutina, "no" un par de veces, "sí", "sí",
+# nombre) y reporta por turno los bytes de los atributos y del request y la
+# respuesta completos. Las rutinas se guardan en el almacén en memoria.
+# Con --reproducir N, después de guardarla se escucha paso a paso ("empezar
+# rutina", N veces "siguiente" y "¿cuánto falta?"); cada uno de esos turnos
+# solo lleva el cursor, así que mide lo mismo sin importar el largo.
+#
+# Uso: python bench_sesion.py [--modo manual|aleatorio] [--nos 2] [--reproducir 0]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+os.environ.setdefault("RUTINAS_BACKEND", "memoria")
+
+import sobres  # noqa: E402
+
+
+def _bytes(obj):
+    return len(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def conversacion(modo, nos, reproducir=0):
+    slots = {"peso_kg": "70", "estatura_cm": "170", "modo": modo}
+    if modo == "manual":
+        slots.update(tipo="piernas", nivel="medio")
+    turnos = [("GenerarRutinaIntent", slots)]
+    turnos += [("AMAZON.NoIntent", {})] * nos
+    turnos += [("AMAZON.YesIntent", {}), ("AMAZON.YesIntent", {}),
+               ("AsignarNombreRutinaIntent", {"nombre": "piernas del lunes"})]
+    if reproducir:
+        turnos += [("EmpezarRutinaIntent", {})] + [("AMAZON.NextIntent", {})] * reproducir
+        turnos += [("CuantoFaltaIntent", {})]
+    return turnos
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modo", default="manual")
+    ap.add_argument("--nos", type=int, default=2)
+    ap.add_argument("--reproducir", type=int, default=0)
+    args = ap.parse_args()
+
+    import lambda_function as lf
+    atributos = {}
+    filas = []
+    for nombre, slots in conversacion(args.modo, args.nos, args.reproducir):
+        ev = sobres.intent(nombre, slots, user_id="amzn1.ask.account.sesion")
+        ev["session"]["attributes"] = atributos
+        with contextlib.redirect_stdout(io.StringIO()):
+            resp = lf.lambda_handler(ev, None)
+        atributos = resp.get("sessionAttributes") or {}
+        filas.append({"turno": nombre,
+                      "bytes_atributos_request": _bytes(ev["session"]["attributes"]),
+                      "bytes_atributos_respuesta": _bytes(atributos),
+                      "bytes_request": _bytes(ev),
+                      "bytes_respuesta": _bytes(resp)})
+    total = sum(f["bytes_atributos_request"] + f["bytes_atributos_respuesta"] for f in filas)
+    print(json.dumps({"turnos": filas, "bytes_atributos_total": total}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Benchmark del texto de las rutinas: render_ssml contra resumen_y_texto anterior
+#
+# La función anterior está copiada abajo tal como estaba en lambda_function.py
+# (antes de los Paso: los pasos eran dicts). Arma las rutinas de cada tipo,
+# nivel, categoría de IMC y variante con el compilador, revisa que el texto
+# de las dos sea idéntico (con los Paso y con los pasos como dict, que es
+# como llegan de la tabla precalculada y de rutinas viejas) y compara el
+# tiempo por rutina. También mide lo que tarda preparar() al cambiar el
+# catálogo y revisa el recorte a 8000 caracteres con una rutina enorme.
+#
+# Uso: python bench_ssml.py [--repeticiones 2000]
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+from catalogo import obtener_catalogo  # noqa: E402
+from compilador_rutinas import compilar_rutina, crear_paso  # noqa: E402
+from modos_rutina import crear_strategy  # noqa: E402
+from render_ssml import LIMITE_SSML, RESERVA_SSML, SsmlRenderer  # noqa: E402
+from selector_sets import elegir_set  # noqa: E402
+
+TIPOS = ("UPPER", "LOWER")
+NIVELES = ("FACIL", "MEDIO", "DIFICIL")
+PERSONAS = [(50, 170, "BAJO_PESO"), (65, 170, "NORMAL"), (80, 170, "SOBREPESO"), (100, 170, "OBESIDAD")]
+
+
+# --- Función anterior (copiada de lambda_function.py) ---
+def resumen_y_texto(rutina):
+    """Convierte la rutina a texto que Alexa pueda leer paso a paso."""
+    pasos = []
+    resumen = "Rutina generada."
+    if isinstance(rutina, dict):
+        pasos = rutina.get("pasos", []) or rutina.get("rutina", [])
+        resumen = rutina.get("titulo") or rutina.get("resumen") or resumen
+    elif isinstance(rutina, list):
+        pasos = rutina
+
+    partes = [str(resumen).strip()]
+    # Limitamos a 12 pasos para evitar respuestas muy largas
+    for i, p in enumerate(pasos, 1):
+        if isinstance(p, dict):
+            t = str(p.get("title", p.get("nombre", "Paso"))).strip()
+            s = int(p.get("segundos", p.get("duracion", 0)) or 0)
+            d = str(p.get("decir", p.get("descripcion", "")) or "").strip()
+        else:
+            t = str(p).strip()
+            s = 0
+            d = ""
+        linea = f"Paso {i}: {t}" + (f", {s} segundos." if s else ".")
+        if d:
+            linea += f" {d}"
+        partes.append(linea)
+        if i >= 12:
+            break
+    return " ".join(partes)
+
+
+def rutinas(data):
+    # Todas las combinaciones, con las primeras variantes del set
+    out = []
+    for tipo in TIPOS:
+        for nivel in NIVELES:
+            for peso, est, cat in PERSONAS:
+                for variante in range(4):
+                    strategy = crear_strategy("random", elegir_set, variante=variante, posiciones=6)
+                    out.append(compilar_rutina(data, nivel, tipo, peso, est, cat, strategy))
+    return out
+
+
+def como_dicts(rutina):
+    return {"titulo": rutina["titulo"], "pasos": [p.a_dict() for p in rutina["pasos"]]}
+
+
+def tiempo_us(fn, lote, repeticiones):
+    muestras = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        for r in lote:
+            fn(r)
+        muestras.append((time.perf_counter() - t0) * 1e6 / len(lote))
+    return round(statistics.median(muestras), 3)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticiones", type=int, default=2000)
+    args = ap.parse_args()
+
+    data = obtener_catalogo()
+    render = SsmlRenderer(pausa_ms=0)
+    t0 = time.perf_counter()
+    render.preparar(data)
+    ms_preparar = (time.perf_counter() - t0) * 1000
+
+    lote = rutinas(data)
+    lote_dicts = [como_dicts(r) for r in lote]
+    diferencias = sum(render.texto(r) != resumen_y_texto(d) for r, d in zip(lote, lote_dicts))
+    diferencias += sum(render.texto(d) != resumen_y_texto(d) for d in lote_dicts)
+
+    # Una rutina que no cabe: pasos con frases muy largas
+    largo = crear_paso("Plancha", 40, "Mantén la espalda recta. " * 40)
+    enorme = render.texto({"titulo": "Rutina enorme", "pasos": [largo] * 12})
+
+    salida = {
+        "rutinas": len(lote),
+        "diferencias": diferencias,
+        "preparar_ms": round(ms_preparar, 2),
+        "fragmentos_preparados": render.stats["preparados"],
+        "us_por_rutina": {
+            "anterior_dicts": tiempo_us(resumen_y_texto, lote_dicts, args.repeticiones),
+            "render_paso": tiempo_us(render.texto, lote, args.repeticiones),
+            "render_dicts": tiempo_us(render.texto, lote_dicts, args.repeticiones),
+        },
+        "recorte": {"caracteres": len(enorme), "limite": LIMITE_SSML - RESERVA_SSML,
+                    "pasos_leidos": enorme.count("Paso "), "recortes": render.stats["recortes"]},
+        "con_pausa": SsmlRenderer(pausa_ms=400).texto(lote[0])[:120],
+    }
+    print(json.dumps(salida, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
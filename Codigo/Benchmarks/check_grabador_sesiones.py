@@ -0,0 +1,97 @@
+# Prueba de que las trazas de grabador_sesiones no llevan nombres de rutina
+#
+# Corre una sesión contra el lambda_handler real con TRAZAS_ARCHIVO: crea una
+# rutina, la guarda con un nombre, pide borrarla con un nombre parecido (la
+# skill pregunta antes de borrar y deja borrar_pendiente en la sesión) y
+# confirma. Uno de los turnos trae además last_routine con el texto completo,
+# como las sesiones viejas. Revisa que:
+#   - se grabaron todos los turnos, incluido el de la confirmación;
+#   - ninguna palabra del nombre aparece en la traza;
+#   - borrar_pendiente.nombre va con el mismo hash que el slot nombre;
+#   - last_routine no llega a la traza.
+#
+# Uso: python check_grabador_sesiones.py
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+import sobres  # noqa: E402
+
+USUARIO = "amzn1.ask.account.grabador"
+NOMBRE = "Piernas de Mariana Quintero"
+PARECIDO = "piernas de mariana quinteros"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        archivo = Path(tmp) / "trazas.jsonl"
+        os.environ["TRAZAS_ARCHIVO"] = str(archivo)
+        os.environ["TRAZAS_SAL"] = "check"
+        os.environ["RUTINAS_BACKEND"] = "memoria"
+        with contextlib.redirect_stdout(io.StringIO()):
+            from lambda_function import lambda_handler
+        from grabador_sesiones import GRABADOR, leer_trazas
+
+        atributos = {}
+        respuestas = []
+
+        def turno(sobre, extra=None):
+            nonlocal atributos
+            sobre["session"]["attributes"] = dict(atributos, **(extra or {}))
+            with contextlib.redirect_stdout(io.StringIO()):
+                resp = lambda_handler(sobre, None)
+            atributos = resp.get("sessionAttributes") or {}
+            respuestas.append(resp["response"]["outputSpeech"]["ssml"])
+
+        sesion = "amzn1.echo-api.session.grabador"
+        kw = {"user_id": USUARIO, "session_id": sesion}
+        turno(sobres.intent("GenerarRutinaIntent", {"peso_kg": "72", "estatura_cm": "168", "modo": "manual",
+                                                    "tipo": "piernas", "nivel": "medio"}, **kw))
+        turno(sobres.intent("AMAZON.YesIntent", {}, **kw))
+        turno(sobres.intent("AMAZON.YesIntent", {}, **kw))
+        turno(sobres.intent("AsignarNombreRutinaIntent", {"nombre": NOMBRE}, **kw))
+        turno(sobres.intent("BorrarRutinaIntent", {"nombre": PARECIDO}, **kw))
+        pendiente = dict(atributos.get("borrar_pendiente") or {})
+        turno(sobres.intent("AMAZON.YesIntent", {}, **kw),
+              extra={"last_routine": f"{NOMBRE}. Paso 1: Sentadillas, 30 segundos."})
+
+        errores = []
+        if pendiente.get("nombre") != NOMBRE:
+            errores.append(f"la skill no pidió confirmar el borrado: {respuestas[-2]}")
+        if "borrada" not in respuestas[-1]:
+            errores.append(f"la rutina no se borró: {respuestas[-1]}")
+
+        texto = archivo.read_text(encoding="utf-8")
+        trazas = list(leer_trazas(texto.splitlines()))
+        if len(trazas) != len(respuestas):
+            errores.append(f"se grabaron {len(trazas)} de {len(respuestas)} turnos")
+        minusculas = texto.lower()
+        for palabra in set((NOMBRE + " " + PARECIDO).lower().split()) - {"de", "piernas"}:
+            if palabra in minusculas:
+                errores.append(f"la traza trae '{palabra}' del nombre de la rutina")
+
+        confirmacion = trazas[-1]["sobre"]["session"]["attributes"] if trazas else {}
+        guardado = next((t for t in trazas if t["intent"] == "AsignarNombreRutinaIntent"), None)
+        slot = guardado["sobre"]["request"]["intent"]["slots"]["nombre"]["value"] if guardado else None
+        if (confirmacion.get("borrar_pendiente") or {}).get("nombre") != slot:
+            errores.append("borrar_pendiente.nombre no tiene el mismo hash que el slot nombre")
+        if "last_routine" in confirmacion:
+            errores.append("last_routine llegó a la traza")
+
+        salida = {"turnos": len(respuestas), "grabador": dict(GRABADOR.stats),
+                  "atributos_confirmacion": confirmacion, "errores": errores}
+    print(json.dumps(salida, ensure_ascii=False, indent=2))
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Prueba de guardados en paralelo contra el S3 local
+#
+# Simula N sesiones del mismo usuario (varios dispositivos, o Alexa
+# reintentando) que guardan una rutina al mismo tiempo, y después otras tantas
+# que borran al mismo tiempo. Con las escrituras condicionales ninguna rutina
+# se debe perder ni quedar de más en el manifiesto.
+#
+# Uso: python check_guardados_paralelos.py [--sesiones 16] [--rondas 3] [--latencia-ms 5]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+from s3_local import ServidorS3Local, configurar_entorno  # noqa: E402
+
+
+def en_paralelo(n, func):
+    # Arranca las n llamadas juntas para que choquen lo más posible
+    barrera = threading.Barrier(n)
+
+    def correr(i):
+        barrera.wait()
+        return func(i)
+
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        return list(ex.map(correr, range(n)))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sesiones", type=int, default=16)
+    ap.add_argument("--rondas", type=int, default=3)
+    ap.add_argument("--latencia-ms", type=float, default=5.0)
+    args = ap.parse_args()
+
+    with ServidorS3Local(latencia_s=args.latencia_ms / 1000) as s3, tempfile.TemporaryDirectory() as tmp:
+        configurar_entorno(s3.url)
+        os.environ["S3_CACHE_DIR"] = tmp
+        os.environ["S3_MAX_POOL_CONNECTIONS"] = str(args.sesiones)
+        os.environ.setdefault("S3_CONFLICTO_INTENTOS", str(args.sesiones + 4))
+        import persistencia_s3 as ps
+
+        fallas = []
+        usuario = "usuario-paralelo"
+        esperados = set()
+        for ronda in range(args.rondas):
+            ids = en_paralelo(args.sesiones, lambda i: ps.agregar_rutina(
+                usuario, {"nombre": f"R{ronda}-{i}", "texto": f"Rutina {ronda}-{i}"}))
+            esperados |= {f"R{ronda}-{i}" for i in range(args.sesiones)}
+            # La mitad se borra en paralelo
+            borrar = ids[::2]
+            en_paralelo(len(borrar), lambda i: ps.borrar_rutina(usuario, borrar[i]))
+            esperados -= {f"R{ronda}-{i}" for i in range(0, args.sesiones, 2)}
+
+            ps.CACHE_S3.limpiar()
+            nombres = {e["nombre"] for e in ps.listar_rutinas(usuario)}
+            if nombres != esperados:
+                fallas.append({"ronda": ronda, "faltan": sorted(esperados - nombres),
+                               "sobran": sorted(nombres - esperados)})
+
+        objetos = [k for _, k in s3.s3.objetos if k.startswith(f"{usuario}/rutinas/")]
+        resultado = {
+            "sesiones": args.sesiones,
+            "rondas": args.rondas,
+            "rutinas_esperadas": len(esperados),
+            "objetos_rutina": len(objetos) - 1,
+            "conflictos": ps.ESTADISTICAS_CONFLICTOS["conflictos"],
+            "agotados": ps.ESTADISTICAS_CONFLICTOS["agotados"],
+            "peticiones": s3.s3.conteo,
+            "fallas": fallas,
+        }
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    sys.exit(1 if fallas or resultado["objetos_rutina"] != len(esperados) else 0)
+
+
+if __name__ == "__main__":
+    main()
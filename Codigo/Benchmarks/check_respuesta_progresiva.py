@@ -0,0 +1,147 @@
+# Prueba de las respuestas progresivas contra S3 y el servicio de directivas locales
+#
+# Corre "ver rutinas", "ver rutina", "borrar rutina" y guardar una rutina
+# contra el lambda_handler real, con S3 lento y un servicio de directivas que
+# también tarda. Cada turno se corre dos veces con la cache vacía: sin
+# apiEndpoint (no se puede mandar nada) y con el servicio local. Revisa que:
+#   - llegue una directiva VoicePlayer.Speak por operación, con el requestId
+#     del turno y el token del sobre;
+#   - la directiva llegue mientras el handler todavía está trabajando y se
+#     conteste antes de que el handler regrese la respuesta;
+#   - se empalme con el almacén: el turno tarda menos que sin directiva más
+#     la mitad de lo que tarda el servicio (en serie tardaría todo);
+#   - si el servicio falla, la respuesta es la misma, y si la latencia
+#     esperada no pasa el umbral, no se manda nada.
+#
+# Uso: python check_respuesta_progresiva.py [--latencia-s3-ms 150] [--latencia-directiva-ms 200]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+import sobres  # noqa: E402
+from directivas_local import ServidorDirectivasLocal  # noqa: E402
+from s3_local import ServidorS3Local, configurar_entorno  # noqa: E402
+
+USUARIO = "amzn1.ask.account.progresiva"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latencia-s3-ms", type=float, default=150.0)
+    ap.add_argument("--latencia-directiva-ms", type=float, default=200.0)
+    args = ap.parse_args()
+    lat_directiva = args.latencia_directiva_ms / 1000
+
+    errores = []
+    filas = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            ServidorS3Local(args.latencia_s3_ms / 1000) as s3, \
+            ServidorDirectivasLocal(lat_directiva) as directivas:
+        configurar_entorno(s3.url)
+        os.environ["S3_CACHE_DIR"] = str(Path(tmp) / "cache_s3")
+        os.environ["RUTINAS_BACKEND"] = "s3"
+        # Cualquier operación contra este S3 tarda más que el umbral
+        os.environ["PROGRESIVA_UMBRAL_MS"] = str(args.latencia_s3_ms / 2)
+        import almacen_rutinas
+        import lambda_function as lf
+        from cache_s3 import CACHE_S3
+        from precarga_rutinas import PRECARGA
+        from respuesta_progresiva import PROGRESIVA
+
+        for i in range(5):
+            almacen_rutinas.agregar_rutina(USUARIO, {"nombre": f"piernas {i}", "texto": f"Rutina {i}."})
+        for nombre in ("borrar uno", "borrar dos"):
+            almacen_rutinas.agregar_rutina(USUARIO, {"nombre": nombre, "texto": "Rutina."})
+
+        def turno(nombre, slots=None, atributos=None, endpoint=None):
+            # (segundos del handler, respuesta, sobre, directivas recibidas)
+            CACHE_S3.limpiar()
+            PRECARGA.olvidar(USUARIO)
+            directivas.limpiar()
+            kw = {"api_endpoint": endpoint} if endpoint is not None else {}
+            ev = sobres.intent(nombre, slots, user_id=USUARIO, atributos=atributos, **kw)
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                resp = lf.lambda_handler(ev, None)
+                t1 = time.perf_counter()
+            return t0, t1, resp, ev, list(directivas.recibidas)
+
+        def atributos_para_guardar():
+            ev = sobres.intent("GenerarRutinaIntent", {"peso_kg": "70", "estatura_cm": "170",
+                                                      "modo": "manual", "tipo": "piernas", "nivel": "medio"},
+                               user_id=USUARIO)
+            with contextlib.redirect_stdout(io.StringIO()):
+                atributos = lf.lambda_handler(ev, None)["sessionAttributes"]
+            return dict(atributos, awaiting="ask_name")
+
+        casos = [
+            ("ver_rutinas", "VerRutinasIntent", {}, None, 1),
+            ("ver_rutina", "ElegirRutinaIntent", {"nombre": "piernas 3"}, None, 1),
+            # Borrar: buscar la rutina en el índice y borrarla son dos avisos
+            ("borrar_rutina", "BorrarRutinaIntent", {"nombre": "borrar uno"}, None, 2),
+            ("guardar_rutina", "AsignarNombreRutinaIntent", {"nombre": "nueva"}, "guardar", 1),
+        ]
+        for caso, intent, slots, extra, esperadas in casos:
+            sin_slots = dict(slots)
+            if caso == "borrar_rutina":
+                sin_slots["nombre"] = "borrar dos"
+            atributos = atributos_para_guardar() if extra == "guardar" else None
+            s0, s1, resp_sin, _, _ = turno(intent, sin_slots, atributos, endpoint="")
+            atributos = atributos_para_guardar() if extra == "guardar" else None
+            t0, t1, resp, ev, recibidas = turno(intent, slots, atributos, endpoint=directivas.url)
+
+            ms_sin, ms_con = (s1 - s0) * 1000, (t1 - t0) * 1000
+            filas.append({"caso": caso, "ms_sin_directiva": round(ms_sin, 1),
+                          "ms_con_directiva": round(ms_con, 1), "directivas": len(recibidas),
+                          "llegada_ms": [round((d["llegada"] - t0) * 1000, 1) for d in recibidas]})
+            if len(recibidas) != esperadas:
+                errores.append(f"{caso}: {len(recibidas)} directivas, se esperaban {esperadas}")
+            for d in recibidas:
+                c = d["cuerpo"]
+                if c.get("header", {}).get("requestId") != ev["request"]["requestId"]:
+                    errores.append(f"{caso}: requestId distinto en la directiva")
+                if c.get("directive", {}).get("type") != "VoicePlayer.Speak":
+                    errores.append(f"{caso}: tipo de directiva {c.get('directive')}")
+                if d["autorizacion"] != "Bearer bench-token":
+                    errores.append(f"{caso}: autorización {d['autorizacion']!r}")
+                if not (t0 < d["llegada"] < t1 and d["respuesta"] <= t1):
+                    errores.append(f"{caso}: la directiva no se empalmó con el handler")
+            if ms_con > ms_sin + lat_directiva * 1000 / 2:
+                errores.append(f"{caso}: {ms_con:.0f} ms con directiva contra {ms_sin:.0f} ms sin ella; "
+                               "parece que se mandó en serie")
+            if caso != "borrar_rutina" and (resp_sin["response"]["outputSpeech"]
+                                            != resp["response"]["outputSpeech"]):
+                errores.append(f"{caso}: la respuesta cambió con la directiva")
+
+        # Si el servicio falla, la respuesta es la misma
+        _, _, resp_ok, _, _ = turno("VerRutinasIntent", endpoint="")
+        directivas.status = 500
+        _, _, resp_falla, _, recibidas = turno("VerRutinasIntent", endpoint=directivas.url)
+        directivas.status = None
+        if resp_falla["response"]["outputSpeech"] != resp_ok["response"]["outputSpeech"] or not recibidas:
+            errores.append("con el servicio fallando cambió la respuesta o no se intentó mandar")
+
+        # Con un umbral más alto que la latencia esperada no se manda nada
+        PROGRESIVA.umbral_ms = 60_000
+        _, _, _, _, recibidas = turno("VerRutinasIntent", endpoint=directivas.url)
+        if recibidas:
+            errores.append("se mandó una directiva con la latencia esperada bajo el umbral")
+
+        salida = {"turnos": filas, "progresiva": dict(PROGRESIVA.stats), "errores": errores}
+    print(json.dumps(salida, ensure_ascii=False, indent=2))
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Servicio de directivas local para pruebas (sin Alexa)
+#
+# Servidor HTTP mínimo que recibe POST /v1/directives como el endpoint de
+# Alexa (https://api.amazonalexa.com) y guarda cada directiva con la hora en
+# que llegó y en que se contestó (time.perf_counter del mismo proceso), para
+# comparar contra lo que tarda el handler. Contesta 204 después de
+# latencia_s, o status si se le pide fallar.
+#
+#   with ServidorDirectivasLocal(latencia_s=0.2) as directivas:
+#       ev = sobres.intent("VerRutinasIntent", api_endpoint=directivas.url)
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        llegada = time.perf_counter()
+        srv = self.server.directivas
+        cuerpo = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if srv.latencia_s:
+            time.sleep(srv.latencia_s)
+        status = 204 if self.path == "/v1/directives" else 404
+        if srv.status is not None:
+            status = srv.status
+        # Se registra antes de contestar: cuando el cliente tiene la respuesta
+        # la directiva ya está en recibidas
+        srv.registrar({"ruta": self.path, "status": status,
+                       "autorizacion": self.headers.get("Authorization"),
+                       "cuerpo": json.loads(cuerpo or b"{}"),
+                       "llegada": llegada, "respuesta": time.perf_counter()})
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class ServidorDirectivasLocal:
+    def __init__(self, latencia_s=0.0, status=None):
+        self.latencia_s = latencia_s
+        # Si no es None, todas las directivas se contestan con este status
+        self.status = status
+        self.recibidas = []
+        self._lock = threading.Lock()
+        self._srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._srv.daemon_threads = True
+        self._srv.directivas = self
+        self.url = f"http://127.0.0.1:{self._srv.server_address[1]}"
+        self._hilo = None
+
+    def registrar(self, directiva):
+        with self._lock:
+            self.recibidas.append(directiva)
+
+    def limpiar(self):
+        with self._lock:
+            self.recibidas = []
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self._srv.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._srv.shutdown()
+        self._srv.server_close()
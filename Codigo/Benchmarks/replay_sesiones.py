@@ -0,0 +1,262 @@
+# Reproduce sesiones grabadas (grabador_sesiones) contra el lambda_handler real
+#
+# Lee las trazas JSONL (o el log de CloudWatch con las líneas "TRAZA "), las
+# agrupa por sesión y manda cada sesión turno por turno, llevando los
+# atributos de sesión de una respuesta al siguiente request como lo hace
+# Alexa. Varias sesiones van a la vez (--concurrencia) en hilos o en procesos:
+#   hilos     todas comparten un lambda_function (caches incluidas), como
+#             muchas invocaciones sobre pocos contenedores calientes
+#   procesos  cada proceso importa su propio lambda_function, como
+#             contenedores separados
+# El almacén es el S3 local en memoria y las respuestas progresivas van al
+# servicio de directivas local. Con --repetir N cada sesión se manda N veces
+# con otro usuario y otro sessionId, para subir la carga con la misma forma.
+#
+# Reporta turnos por segundo y latencia p50/p95/p99/max en total y por
+# intent, y cuántos turnos terminaron en CatchAllExceptionHandler.
+#
+# Con --ejemplo ARCHIVO graba sesiones sintéticas (crear rutina con cadenas
+# de "no, otra" de largo variable, aleatorio, ver/elegir/borrar) para probar
+# el grabador y tener algo que reproducir sin tráfico real.
+#
+# Uso: python replay_sesiones.py TRAZAS.jsonl [--concurrencia 8] [--modo hilos|procesos]
+#                                [--repetir 1] [--latencia-s3-ms 0] [--rutinas-por-usuario 0]
+#      python replay_sesiones.py --ejemplo TRAZAS.jsonl [--sesiones 40] [--usuarios 8]
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+AQUI = Path(__file__).resolve().parent
+ALEXA = AQUI.parent / "Alexa"
+sys.path.insert(0, str(ALEXA))
+
+import sobres  # noqa: E402
+from bench_intents import TEXTO_ERROR, percentiles  # noqa: E402
+
+# lambda_function de cada proceso (modo procesos)
+_lf = None
+
+
+def cargar_sesiones(ruta):
+    # {sesion: [sobre, ...]} en el orden en que llegaron los turnos
+    from grabador_sesiones import leer_trazas
+    por_sesion = {}
+    with open(ruta, encoding="utf-8") as f:
+        for t in leer_trazas(f):
+            por_sesion.setdefault(t["sesion"], []).append(t)
+    return {s: [t["sobre"] for t in sorted(ts, key=lambda t: (t.get("ts") or "", t.get("recibido") or 0))]
+            for s, ts in por_sesion.items()}
+
+
+def _preparar(sobre, atributos, copia, endpoint):
+    ev = copy.deepcopy(sobre)
+    sesion = ev.setdefault("session", {})
+    sistema = ev.setdefault("context", {}).setdefault("System", {})
+    if atributos is not None:
+        sesion["attributes"] = atributos
+    if copia:
+        for usuario in (sesion.get("user"), sistema.get("user")):
+            if usuario and usuario.get("userId"):
+                usuario["userId"] += f"-r{copia}"
+        if sesion.get("sessionId"):
+            sesion["sessionId"] += f"-r{copia}"
+    ev.setdefault("request", {})["requestId"] = f"amzn1.echo-api.request.{uuid.uuid4()}"
+    sistema["apiEndpoint"] = endpoint
+    sistema["apiAccessToken"] = "replay-token"
+    return ev
+
+
+def reproducir_sesion(handler, sesion, copia, endpoint):
+    # [(intent o tipo de request, ms, error)] de cada turno de la sesión.
+    # El stdout del skill lo tapa quien llama: redirect_stdout cambia
+    # sys.stdout de todo el proceso y no se puede usar desde varios hilos
+    out = []
+    atributos = None
+    for sobre in sesion:
+        ev = _preparar(sobre, atributos, copia, endpoint)
+        req = ev["request"]
+        nombre = (req.get("intent") or {}).get("name") or req.get("type")
+        t0 = time.perf_counter()
+        try:
+            resp = handler(ev, None)
+            voz = ((resp.get("response") or {}).get("outputSpeech") or {}).get("ssml") or ""
+            error = TEXTO_ERROR in voz
+            atributos = resp.get("sessionAttributes") or {}
+        except Exception:
+            error = True
+        out.append((nombre, (time.perf_counter() - t0) * 1000, error))
+    return out
+
+
+def _iniciar_proceso(entorno):
+    global _lf
+    os.environ.update(entorno)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import lambda_function
+    _lf = lambda_function
+
+
+def _tarea_proceso(sesion, copia, endpoint):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return reproducir_sesion(_lf.lambda_handler, sesion, copia, endpoint)
+
+
+@contextlib.contextmanager
+def entorno_local(latencia_s3_ms):
+    from directivas_local import ServidorDirectivasLocal
+    from s3_local import ServidorS3Local, configurar_entorno
+    with tempfile.TemporaryDirectory() as tmp, ServidorS3Local(latencia_s3_ms / 1000) as s3, \
+            ServidorDirectivasLocal() as directivas:
+        configurar_entorno(s3.url)
+        os.environ["S3_CACHE_DIR"] = str(Path(tmp) / "cache_s3")
+        os.environ["RUTINAS_BACKEND"] = "s3"
+        yield directivas.url
+
+
+def sembrar(sesiones, n):
+    # Biblioteca inicial de cada usuario (los de las trazas ya son hashes)
+    import almacen_rutinas
+    usuarios = {((s[0].get("session") or {}).get("user") or {}).get("userId") for s in sesiones.values()}
+    for u in filter(None, usuarios):
+        for i in range(n):
+            almacen_rutinas.agregar_rutina(u, {"nombre": f"rutina previa {i}", "texto": f"Rutina {i}."})
+
+
+def replay(args):
+    sesiones = cargar_sesiones(args.trazas)
+    trabajos = [(s, c) for c in range(args.repetir) for s in sesiones.values()]
+    with entorno_local(args.latencia_s3_ms) as endpoint:
+        if args.rutinas_por_usuario:
+            sembrar(sesiones, args.rutinas_por_usuario)
+        if args.modo == "procesos":
+            import multiprocessing
+            entorno = {k: v for k, v in os.environ.items() if k.startswith(("S3_", "RUTINAS_", "AWS_"))}
+            ejecutor = ProcessPoolExecutor(max_workers=args.concurrencia,
+                                           mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_iniciar_proceso, initargs=(entorno,))
+            # Que todos los procesos ya hayan importado antes de medir
+            list(ejecutor.map(_tarea_proceso, [[]] * args.concurrencia, [0] * args.concurrencia,
+                              [endpoint] * args.concurrencia))
+
+            def enviar(sesion, copia):
+                return ejecutor.submit(_tarea_proceso, sesion, copia, endpoint)
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                import lambda_function
+            ejecutor = ThreadPoolExecutor(max_workers=args.concurrencia)
+
+            def enviar(sesion, copia):
+                return ejecutor.submit(reproducir_sesion, lambda_function.lambda_handler,
+                                       sesion, copia, endpoint)
+
+        with ejecutor, contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            futuros = [enviar(s, c) for s, c in trabajos]
+            turnos = [t for f in futuros for t in f.result()]
+            segundos = time.perf_counter() - t0
+
+    por_intent = {}
+    for nombre, ms, _ in turnos:
+        por_intent.setdefault(nombre, []).append(ms)
+    largos = sorted(len(s) for s in sesiones.values())
+    return {
+        "config": {"modo": args.modo, "concurrencia": args.concurrencia, "repetir": args.repetir,
+                   "latencia_s3_ms": args.latencia_s3_ms},
+        "sesiones": len(trabajos),
+        "turnos": len(turnos),
+        "turnos_por_sesion": {"p50": largos[len(largos) // 2], "max": largos[-1]} if largos else {},
+        "segundos": round(segundos, 3),
+        "turnos_por_s": round(len(turnos) / segundos, 1) if segundos else None,
+        "sesiones_por_s": round(len(trabajos) / segundos, 1) if segundos else None,
+        "latencia_ms": percentiles([t[1] for t in turnos], con_max=True),
+        "errores": sum(1 for t in turnos if t[2]),
+        "por_intent": {k: dict(percentiles(v, con_max=True), n=len(v)) for k, v in sorted(por_intent.items())},
+    }
+
+
+# --- Sesiones sintéticas para --ejemplo ---
+def guion_ejemplo(rng):
+    peso = f"{rng.uniform(50, 110):.1f}"
+    estatura = rng.choice([f"{rng.uniform(1.5, 1.95):.2f}", str(rng.randint(150, 195))])
+    nombre = f"{rng.choice(['piernas', 'brazos', 'pecho', 'cardio'])} del {rng.choice(['lunes', 'martes', 'jueves'])}"
+    forma = rng.random()
+    if forma < 0.5:
+        # Crear, varios "no, otra" y guardar
+        slots = {"peso_kg": peso, "estatura_cm": estatura, "modo": "manual",
+                 "tipo": rng.choice(["piernas", "brazos"]), "nivel": rng.choice(["fácil", "medio", "difícil"])}
+        turnos = [("GenerarRutinaIntent", slots)]
+        turnos += [("AMAZON.NoIntent", {})] * rng.choice([0, 1, 2, 3, 5, 8, 12])
+        turnos += [("AMAZON.YesIntent", {}), ("AMAZON.YesIntent", {}),
+                   ("AsignarNombreRutinaIntent", {"nombre": nombre})]
+    elif forma < 0.75:
+        turnos = [("GenerarRutinaIntent", {"peso_kg": peso, "estatura_cm": estatura, "modo": "aleatorio"})]
+        turnos += [("AMAZON.NoIntent", {})] * rng.randint(0, 6)
+        turnos += [("AMAZON.YesIntent", {}), ("AMAZON.NoIntent", {})]
+    else:
+        turnos = [("VerRutinasIntent", {}), ("ElegirRutinaIntent", {"nombre": nombre})]
+        if rng.random() < 0.3:
+            turnos.append(("BorrarRutinaIntent", {"nombre": nombre}))
+    return [("launch", None)] + turnos + [("ended", None)]
+
+
+def ejemplo(args):
+    from grabador_sesiones import GrabadorSesiones
+    rng = random.Random(args.semilla)
+    Path(args.ejemplo).write_text("", encoding="utf-8")
+    grabador = GrabadorSesiones(archivo=args.ejemplo, sal="ejemplo")
+    with entorno_local(0):
+        with contextlib.redirect_stdout(io.StringIO()):
+            import lambda_function
+        handler = grabador.envolver(lambda_function.lambda_handler)
+        for _ in range(args.sesiones):
+            user_id = f"amzn1.ask.account.ejemplo{rng.randrange(args.usuarios)}"
+            session_id = f"amzn1.echo-api.session.{uuid.uuid4()}"
+            sesion = []
+            for tipo, slots in guion_ejemplo(rng):
+                kw = {"user_id": user_id, "session_id": session_id}
+                if tipo == "launch":
+                    sesion.append(sobres.launch(**kw))
+                elif tipo == "ended":
+                    sesion.append(sobres.session_ended(**kw))
+                else:
+                    sesion.append(sobres.intent(tipo, slots, **kw))
+            with contextlib.redirect_stdout(io.StringIO()):
+                reproducir_sesion(handler, sesion, 0, "")
+    print(json.dumps({"archivo": args.ejemplo, "sesiones": args.sesiones, "grabador": grabador.stats}))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("trazas", nargs="?")
+    ap.add_argument("--concurrencia", type=int, default=8)
+    ap.add_argument("--modo", choices=("hilos", "procesos"), default="hilos")
+    ap.add_argument("--repetir", type=int, default=1)
+    ap.add_argument("--latencia-s3-ms", type=float, default=0.0)
+    ap.add_argument("--rutinas-por-usuario", type=int, default=0)
+    ap.add_argument("--ejemplo", metavar="ARCHIVO")
+    ap.add_argument("--sesiones", type=int, default=40)
+    ap.add_argument("--usuarios", type=int, default=8)
+    ap.add_argument("--semilla", type=int, default=7)
+    args = ap.parse_args()
+
+    if args.ejemplo:
+        ejemplo(args)
+        return
+    if not args.trazas:
+        ap.error("falta el archivo de trazas (o --ejemplo ARCHIVO)")
+    print(json.dumps(replay(args), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
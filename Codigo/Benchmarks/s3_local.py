@@ -0,0 +1,206 @@
+# S3 local para benchmarks (sin AWS)
+#
+# Servidor HTTP mínimo que entiende lo que usa la skill: GetObject, PutObject,
+# HeadObject, DeleteObject y ListObjectsV2 con path-style
+# (http://127.0.0.1:PUERTO/bucket/key). Guarda todo en memoria, calcula ETag
+# como S3 (md5 entre comillas) y respeta If-None-Match / If-Match, tanto en
+# lecturas (304) como en escrituras condicionales (412).
+#
+#   with ServidorS3Local() as s3:
+#       os.environ["S3_ENDPOINT_URL"] = s3.url
+
+import hashlib
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Sin esto, con keep-alive cada respuesta espera el ACK retrasado (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # --- utilidades ---
+    def _ruta(self):
+        partes = urlsplit(self.path)
+        trozos = partes.path.lstrip("/").split("/", 1)
+        bucket = unquote(trozos[0])
+        key = unquote(trozos[1]) if len(trozos) > 1 else ""
+        return bucket, key, parse_qs(partes.query)
+
+    def _responder(self, status, cuerpo=b"", headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if cuerpo and self.command != "HEAD":
+            self.wfile.write(cuerpo)
+
+    def _error(self, status, codigo):
+        cuerpo = (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{codigo}</Code>"
+                  f"<Message>{codigo}</Message></Error>").encode()
+        self._responder(status, cuerpo, {"Content-Type": "application/xml"})
+
+    def _leer_cuerpo(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            datos = bytearray()
+            while True:
+                tam = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if tam == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                datos += self.rfile.read(tam)
+                self.rfile.readline()
+            datos = bytes(datos)
+        else:
+            datos = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if "aws-chunked" in self.headers.get("Content-Encoding", ""):
+            datos = _decodificar_aws_chunked(datos)
+        return datos
+
+    # --- verbos ---
+    def do_GET(self):
+        self.server.s3.contar("GET")
+        bucket, key, query = self._ruta()
+        if not key and "list-type" in query:
+            return self._listar(bucket, query)
+        obj = self.server.s3.leer(bucket, key)
+        if obj is None:
+            return self._error(404, "NoSuchKey")
+        cuerpo, etag, extra = obj
+        if self.headers.get("If-None-Match") == etag:
+            return self._responder(304, b"", {"ETag": etag})
+        headers = {"ETag": etag, "Content-Type": extra.get("Content-Type", "application/octet-stream"),
+                   "Last-Modified": formatdate(usegmt=True)}
+        if extra.get("Content-Encoding"):
+            headers["Content-Encoding"] = extra["Content-Encoding"]
+        self._responder(200, cuerpo, headers)
+
+    def do_HEAD(self):
+        self.server.s3.contar("HEAD")
+        bucket, key, _ = self._ruta()
+        obj = self.server.s3.leer(bucket, key)
+        if obj is None:
+            return self._responder(404)
+        self._responder(200, b"", {"ETag": obj[1]})
+
+    def do_PUT(self):
+        self.server.s3.contar("PUT")
+        bucket, key, _ = self._ruta()
+        cuerpo = self._leer_cuerpo()
+        extra = {k: self.headers[k] for k in ("Content-Type", "Content-Encoding") if self.headers.get(k)}
+        if extra.get("Content-Encoding"):
+            extra["Content-Encoding"] = ",".join(
+                e for e in extra["Content-Encoding"].split(",") if e.strip() != "aws-chunked") or None
+        ok, etag = self.server.s3.escribir(bucket, key, cuerpo, extra,
+                                           if_match=self.headers.get("If-Match"),
+                                           if_none_match=self.headers.get("If-None-Match"))
+        if not ok:
+            return self._error(412, "PreconditionFailed")
+        self._responder(200, b"", {"ETag": etag})
+
+    def do_DELETE(self):
+        self.server.s3.contar("DELETE")
+        bucket, key, _ = self._ruta()
+        self.server.s3.borrar(bucket, key)
+        self._responder(204)
+
+    def _listar(self, bucket, query):
+        prefijo = query.get("prefix", [""])[0]
+        claves = self.server.s3.listar(bucket, prefijo)
+        items = "".join(f"<Contents><Key>{escape(k)}</Key><ETag>{escape(e)}</ETag><Size>{n}</Size></Contents>"
+                        for k, e, n in claves)
+        cuerpo = (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><ListBucketResult>"
+                  f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefijo)}</Prefix>"
+                  f"<KeyCount>{len(claves)}</KeyCount><IsTruncated>false</IsTruncated>"
+                  f"{items}</ListBucketResult>").encode()
+        self._responder(200, cuerpo, {"Content-Type": "application/xml"})
+
+
+def _decodificar_aws_chunked(datos):
+    out = bytearray()
+    i = 0
+    while i < len(datos):
+        fin = datos.index(b"\r\n", i)
+        tam = int(datos[i:fin].split(b";")[0], 16)
+        if tam == 0:
+            break
+        out += datos[fin + 2:fin + 2 + tam]
+        i = fin + 2 + tam + 2
+    return bytes(out)
+
+
+class AlmacenS3Memoria:
+    # Estado del "bucket": key -> (cuerpo, etag, headers extra)
+    def __init__(self, latencia_s=0.0):
+        self.objetos = {}
+        self.lock = threading.Lock()
+        self.latencia_s = latencia_s
+        self.conteo = {}
+
+    def contar(self, verbo):
+        with self.lock:
+            self.conteo[verbo] = self.conteo.get(verbo, 0) + 1
+        if self.latencia_s:
+            time.sleep(self.latencia_s)
+
+    def leer(self, bucket, key):
+        with self.lock:
+            return self.objetos.get((bucket, key))
+
+    def escribir(self, bucket, key, cuerpo, extra, if_match=None, if_none_match=None):
+        etag = '"%s"' % hashlib.md5(cuerpo).hexdigest()
+        with self.lock:
+            actual = self.objetos.get((bucket, key))
+            if if_none_match == "*" and actual is not None:
+                return False, None
+            if if_match is not None and (actual is None or actual[1] != if_match):
+                return False, None
+            self.objetos[(bucket, key)] = (cuerpo, etag, extra)
+        return True, etag
+
+    def borrar(self, bucket, key):
+        with self.lock:
+            self.objetos.pop((bucket, key), None)
+
+    def listar(self, bucket, prefijo):
+        with self.lock:
+            return sorted((k, v[1], len(v[0])) for (b, k), v in self.objetos.items()
+                          if b == bucket and k.startswith(prefijo))
+
+
+class ServidorS3Local:
+    def __init__(self, latencia_s=0.0):
+        self.s3 = AlmacenS3Memoria(latencia_s)
+        self._srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._srv.daemon_threads = True
+        self._srv.s3 = self.s3
+        self.url = f"http://127.0.0.1:{self._srv.server_address[1]}"
+        self._hilo = None
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self._srv.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._srv.shutdown()
+        self._srv.server_close()
+
+
+def configurar_entorno(url, bucket="entrenador-fit-bench"):
+    # Variables que lee la skill para hablar con el S3 local
+    os.environ["S3_ENDPOINT_URL"] = url
+    os.environ["S3_PERSISTENCE_BUCKET"] = bucket
+    os.environ.setdefault("S3_PERSISTENCE_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
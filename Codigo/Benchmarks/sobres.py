@@ -0,0 +1,77 @@
+# Sobres (request envelopes) sintéticos de Alexa para los benchmarks
+#
+# Arman el mismo JSON que Alexa manda a la Lambda, para poder llamar al
+# lambda_handler real sin pasar por la consola de desarrollador.
+
+import uuid
+from datetime import datetime, timezone
+
+APP_ID = "amzn1.ask.skill.entrenador-fit-bench"
+API_ENDPOINT = "https://api.amazonalexa.com"
+
+
+def _ahora():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def sobre(request, user_id="amzn1.ask.account.BENCH", session_id=None,
+          atributos=None, nuevo=False, api_endpoint=API_ENDPOINT):
+    # Envuelve un request con session y context como lo haría Alexa
+    session_id = session_id or f"amzn1.echo-api.session.{uuid.uuid4()}"
+    return {
+        "version": "1.0",
+        "session": {
+            "new": nuevo,
+            "sessionId": session_id,
+            "application": {"applicationId": APP_ID},
+            "user": {"userId": user_id},
+            "attributes": dict(atributos or {}),
+        },
+        "context": {
+            "System": {
+                "application": {"applicationId": APP_ID},
+                "user": {"userId": user_id},
+                "device": {"deviceId": "bench-device", "supportedInterfaces": {}},
+                "apiEndpoint": api_endpoint,
+                "apiAccessToken": "bench-token",
+            }
+        },
+        "request": request,
+    }
+
+
+def launch(**kw):
+    return sobre({
+        "type": "LaunchRequest",
+        "requestId": f"amzn1.echo-api.request.{uuid.uuid4()}",
+        "timestamp": _ahora(),
+        "locale": "es-MX",
+    }, nuevo=True, **kw)
+
+
+def intent(nombre, slots=None, **kw):
+    # slots: {"peso_kg": "70", ...}; los None se mandan sin valor
+    slots_json = {}
+    for k, v in (slots or {}).items():
+        slot = {"name": k, "confirmationStatus": "NONE"}
+        if v is not None:
+            slot["value"] = str(v)
+        slots_json[k] = slot
+    return sobre({
+        "type": "IntentRequest",
+        "requestId": f"amzn1.echo-api.request.{uuid.uuid4()}",
+        "timestamp": _ahora(),
+        "locale": "es-MX",
+        "dialogState": "IN_PROGRESS",
+        "intent": {"name": nombre, "confirmationStatus": "NONE", "slots": slots_json},
+    }, **kw)
+
+
+def session_ended(**kw):
+    return sobre({
+        "type": "SessionEndedRequest",
+        "requestId": f"amzn1.echo-api.request.{uuid.uuid4()}",
+        "timestamp": _ahora(),
+        "locale": "es-MX",
+        "reason": "USER_INITIATED",
+    }, **kw)